@@ -0,0 +1,313 @@
+import hashlib
+import json
+import os
+import zlib
+from datetime import datetime
+from typing import Any, Dict, List, Mapping, Optional, Set, Tuple
+
+from metrics import METRICS
+from models import record_from_dict
+from storage import COLLECTIONS, Store, atomic_write
+
+# Average number of records per chunk; a collection's bucket count doubles or halves as it grows
+# or shrinks past four times or a quarter of this.
+CHUNK_RECORDS = 64
+# Marker kept in a snapshot for records that did not exist when it was taken.
+_ABSENT = object()
+
+
+def bucket_of(key: str, bits: int) -> int:
+    """Return the chunk a record key falls into when a collection is split into 2 ** bits chunks."""
+    return zlib.crc32(key.encode('utf-8')) >> (32 - bits) if bits else 0
+
+
+def bucket_bits(count: int, bits: Optional[int] = None) -> int:
+    """Return the bucket bits for a collection of count records, keeping the current bits while they still fit."""
+    if bits is not None:
+        average = count >> bits
+        if average <= CHUNK_RECORDS * 4 and (bits == 0 or average >= CHUNK_RECORDS // 4):
+            return bits
+    return (count // CHUNK_RECORDS).bit_length()
+
+
+def encode_chunk(items: Mapping[str, Any]) -> bytes:
+    """Encode records as canonical JSON, so the same records always give the same bytes."""
+    rows = [[key, items[key].to_dict()] for key in sorted(items)]
+    return json.dumps(rows, sort_keys=True, separators=(',', ':')).encode('utf-8')
+
+
+class Snapshot:
+    """A point-in-time view of the collections, kept by copy-on-write.
+
+    Taking a snapshot copies nothing. Until it is released, the first change to each record
+    saves the value the record had when the snapshot was taken, so the records of a chunk can
+    be read at any later time as they were then.
+    """
+
+    def __init__(self, snapshot_id: str, bits: Dict[str, int], dirty: Dict[str, Set[int]], counts: Dict[str, int]):
+        """Start a snapshot of collections split into 2 ** bits chunks, of which ``dirty`` changed."""
+        self.id = snapshot_id
+        self.bits = bits
+        self.dirty = dirty
+        self.counts = counts
+        # name -> bucket -> key -> value when the snapshot was taken, or _ABSENT
+        self._saved: Dict[str, Dict[int, Dict[str, Any]]] = {name: {} for name in bits}
+
+    def preserve(self, name: str, bucket: int, key: str, value: Any) -> None:
+        """Keep a record's value from before its first change since the snapshot."""
+        self._saved[name].setdefault(bucket, {}).setdefault(key, value)
+
+    def items(self, collection: Mapping[str, Any], members: Set[str], name: str, bucket: int) -> Dict[str, Any]:
+        """Return the records of a chunk as they were when the snapshot was taken."""
+        items = {key: collection[key] for key in members}
+        items.update(self._saved[name].get(bucket, {}))
+        return {key: value for key, value in items.items() if value is not _ABSENT}
+
+
+class Backups:
+    """Incremental, deduplicated backups of a data service into a backup repository.
+
+    Each collection is split into chunks by a hash of the record keys, so a change touches
+    only the chunk holding that record. A chunk is stored once under the SHA-256 of its
+    canonical JSON in ``objects``, and each backup writes a manifest listing its chunks in
+    ``snapshots``. Only the chunks changed since the last backup of this session are encoded,
+    and a chunk already in the repository is never written again, so a backup costs time and
+    space in proportion to what changed. The first backup of a session encodes every chunk
+    but still writes only the new ones.
+
+    ``start`` takes a copy-on-write snapshot on the caller's thread; ``write`` can then run on
+    any thread while the application keeps changing the data.
+    """
+
+    def __init__(self, service: Any, repository: str):
+        """Track the changes of a data service for backups into the repository directory."""
+        self.service = service
+        self.repository = repository
+        self._members: Dict[str, Dict[int, Set[str]]] = {}
+        self._bits: Dict[str, int] = {}
+        self._dirty: Dict[str, Set[int]] = {}
+        # Chunk hashes of the last backup written in this session, per collection and bucket.
+        self._hashes: Dict[str, List[Optional[str]]] = {}
+        self._snapshot: Optional[Snapshot] = None
+
+    def _track(self, name: str) -> None:
+        """Split a collection into buckets, again whenever its size calls for a different number."""
+        collection = getattr(self.service, name)
+        bits = bucket_bits(len(collection), self._bits.get(name))
+        if self._bits.get(name) == bits:
+            return
+        members: Dict[int, Set[str]] = {}
+        for key in collection:
+            members.setdefault(bucket_of(key, bits), set()).add(key)
+        self._members[name] = members
+        self._bits[name] = bits
+        self._dirty[name] = set(range(1 << bits))
+        self._hashes.pop(name, None)
+
+    def on_set(self, name: str, key: str, value: Any) -> None:
+        """Note that a record's chunk changed."""
+        if name in self._members:
+            bucket = bucket_of(key, self._bits[name])
+            self._members[name].setdefault(bucket, set()).add(key)
+            self._dirty[name].add(bucket)
+            if self._snapshot is not None:
+                self._snapshot.preserve(name, bucket, key, _ABSENT)
+
+    def on_delete(self, name: str, key: str, value: Any) -> None:
+        """Note that a record's chunk changed, keeping the record for a snapshot in progress."""
+        if name in self._members:
+            bucket = bucket_of(key, self._bits[name])
+            self._members[name].get(bucket, set()).discard(key)
+            self._dirty[name].add(bucket)
+            if self._snapshot is not None:
+                self._snapshot.preserve(name, bucket, key, value)
+
+    def start(self) -> Snapshot:
+        """Take a snapshot of every collection to back up with ``write``."""
+        if getattr(self.service.store, 'changes', None) is not None:
+            raise ValueError("Back up the shared data on the data server, which owns the files.")
+        with self.service.lock:
+            if self._snapshot is not None:
+                raise RuntimeError("A backup is already running.")
+            for name in COLLECTIONS:
+                self._track(name)
+            dirty, self._dirty = self._dirty, {name: set() for name in COLLECTIONS}
+            counts = {name: len(getattr(self.service, name)) for name in COLLECTIONS}
+            snapshot_id = datetime.now().strftime('%Y%m%d-%H%M%S-%f')
+            self._snapshot = Snapshot(snapshot_id, dict(self._bits), dirty, counts)
+        return self._snapshot
+
+    def write(self, snapshot: Snapshot) -> Dict[str, Any]:
+        """Write the chunks and manifest of a snapshot and return the manifest.
+
+        If the backup fails, the chunks it did not finish are backed up by the next one.
+        """
+        start = METRICS.start()
+        written = encoded = 0
+        hashes = {}
+        try:
+            for name in COLLECTIONS:
+                previous = self._hashes.get(name)
+                chunks = list(previous) if previous is not None else [None] * (1 << snapshot.bits[name])
+                for bucket in sorted(snapshot.dirty[name]):
+                    with self.service.lock:
+                        items = snapshot.items(getattr(self.service, name), self._members[name].get(bucket, set()),
+                                               name, bucket)
+                    chunks[bucket], size = self._store_chunk(items) if items else (None, 0)
+                    written += size
+                    encoded += 1
+                hashes[name] = chunks
+            manifest = {
+                'id': snapshot.id,
+                'created': datetime.now().isoformat(timespec='seconds'),
+                'collections': {name: {'bits': snapshot.bits[name], 'count': snapshot.counts[name],
+                                       'chunks': hashes[name]} for name in COLLECTIONS},
+                'chunks_encoded': encoded,
+                'bytes_written': written,
+            }
+            os.makedirs(os.path.join(self.repository, 'snapshots'), exist_ok=True)
+            atomic_write(os.path.join(self.repository, 'snapshots', f"{snapshot.id}.json"),
+                         json.dumps(manifest, indent=1).encode('utf-8'))
+        except BaseException:
+            with self.service.lock:
+                for name, buckets in snapshot.dirty.items():
+                    self._dirty[name] |= buckets
+                self._snapshot = None
+            raise
+        with self.service.lock:
+            self._hashes.update(hashes)
+            self._snapshot = None
+        METRICS.stop('backup', start)
+        METRICS.add('backup_bytes_written', written)
+        return manifest
+
+    def _store_chunk(self, items: Mapping[str, Any]) -> Tuple[str, int]:
+        """Add a chunk to the repository unless it is there already; return its hash and the bytes written."""
+        data = encode_chunk(items)
+        digest = hashlib.sha256(data).hexdigest()
+        path = object_path(self.repository, digest)
+        if os.path.exists(path):
+            return digest, 0
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        payload = zlib.compress(data, 6)
+        # A chunk's name is its hash, so a chunk cut short by a crash is caught when it is read
+        with open(path + '.tmp', 'wb') as f:
+            f.write(payload)
+        os.replace(path + '.tmp', path)
+        return digest, len(payload)
+
+    def backup(self) -> Dict[str, Any]:
+        """Take a snapshot and write it on the calling thread."""
+        return self.write(self.start())
+
+    def restore(self, snapshot_id: str) -> int:
+        """Bring the data service back to a snapshot in one transaction and return the records changed.
+
+        Only the records that differ from the snapshot are put or removed, so the observers
+        and the store see just those changes. Chunks that match the last backup of this session
+        and have not changed since are skipped without being read.
+        """
+        if self._snapshot is not None:
+            raise RuntimeError("A backup is running; restore once it has finished.")
+        manifest = read_manifest(self.repository, snapshot_id)
+        transaction = self.service.transaction()
+        for name, entry in manifest['collections'].items():
+            collection = getattr(self.service, name)
+            known = self._hashes.get(name) if self._bits.get(name) == entry['bits'] else None
+            if known is None:
+                records = {}
+                for digest in entry['chunks']:
+                    if digest is not None:
+                        records.update(decode_chunk(name, read_chunk(self.repository, digest)))
+                _stage_differences(transaction, name, collection, list(collection), records)
+                continue
+            for bucket, digest in enumerate(entry['chunks']):
+                if known[bucket] == digest and bucket not in self._dirty[name]:
+                    continue
+                records = decode_chunk(name, read_chunk(self.repository, digest)) if digest is not None else {}
+                _stage_differences(transaction, name, collection, list(self._members[name].get(bucket, ())),
+                                   records)
+        # The snapshot is restored as it was, even if it already held dangling references
+        return transaction.commit(validate=False)
+
+
+def _stage_differences(transaction: Any, name: str, collection: Mapping[str, Any], keys: List[str],
+                       records: Mapping[str, Any]) -> None:
+    """Stage the changes that turn the given keys of a collection into the given records."""
+    for key in keys:
+        if key not in records:
+            transaction.remove(name, key)
+    for key, value in records.items():
+        if collection.get(key) != value:
+            transaction.put(name, key, value)
+
+
+def object_path(repository: str, digest: str) -> str:
+    """Return the file a chunk is stored in."""
+    return os.path.join(repository, 'objects', digest[:2], digest[2:])
+
+
+def list_snapshots(repository: str) -> List[Dict[str, Any]]:
+    """Return the manifests of the snapshots in a repository, oldest first."""
+    directory = os.path.join(repository, 'snapshots')
+    try:
+        names = sorted(name for name in os.listdir(directory) if name.endswith('.json'))
+    except FileNotFoundError:
+        return []
+    manifests = []
+    for name in names:
+        with open(os.path.join(directory, name), encoding='utf-8') as f:
+            manifests.append(json.load(f))
+    return manifests
+
+
+def read_chunk(repository: str, digest: str) -> List[Tuple[str, Dict[str, Any]]]:
+    """Read and verify one chunk, returning its (key, fields) rows."""
+    with open(object_path(repository, digest), 'rb') as f:
+        data = zlib.decompress(f.read())
+    if hashlib.sha256(data).hexdigest() != digest:
+        raise ValueError(f"Backup chunk {digest} is damaged.")
+    METRICS.add('bytes_read', len(data))
+    return json.loads(data)
+
+
+def decode_chunk(name: str, rows: List[Tuple[str, Dict[str, Any]]]) -> Dict[str, Any]:
+    """Turn the rows of a chunk back into the records of a collection."""
+    return {key: record_from_dict(name, values) for key, values in rows}
+
+
+def read_manifest(repository: str, snapshot_id: str) -> Dict[str, Any]:
+    """Return the manifest of a snapshot."""
+    try:
+        with open(os.path.join(repository, 'snapshots', f"{snapshot_id}.json"), encoding='utf-8') as f:
+            return json.load(f)
+    except FileNotFoundError:
+        raise KeyError(f"No snapshot {snapshot_id} in {repository}") from None
+
+
+def read_snapshot(repository: str, snapshot_id: str) -> Dict[str, Dict[str, Any]]:
+    """Return the collections of a snapshot."""
+    collections: Dict[str, Dict[str, Any]] = {name: {} for name in COLLECTIONS}
+    for name, entry in read_manifest(repository, snapshot_id)['collections'].items():
+        for digest in entry['chunks']:
+            if digest is not None:
+                collections[name].update(decode_chunk(name, read_chunk(repository, digest)))
+    return collections
+
+
+def restore_store(repository: str, snapshot_id: str, store: Store) -> int:
+    """Make a store hold exactly the records of a snapshot and return the records changed."""
+    changed = 0
+    for name, records in read_snapshot(repository, snapshot_id).items():
+        collection = store.collection(name)
+        for key in [key for key in collection if key not in records]:
+            del collection[key]
+            store.record_delete(name, key)
+            changed += 1
+        for key, value in records.items():
+            if collection.get(key) != value:
+                collection[key] = value
+                store.record_set(name, key, value)
+                changed += 1
+    store.save()
+    return changed
@@ -0,0 +1,48 @@
+import argparse
+import pickle
+import tracemalloc
+from typing import Callable, Dict
+
+from models import Guest
+from storage import encode_records
+
+
+class DictGuest:
+    """Guest as it was defined before records used __slots__, for comparison."""
+
+    def __init__(self, guestID: str, name: str, address: str, contactDetails: str):
+        self.guestID = guestID
+        self.name = name
+        self.address = address
+        self.contactDetails = contactDetails
+
+
+def build_guests(factory: Callable[..., object], count: int) -> Dict[str, object]:
+    """Create a guest collection of the given size with repeated addresses."""
+    return {f"G{number}": factory(f"G{number}", f"Guest {number}", f"{number % 500} High Street",
+                                  f"guest{number}@example.com")
+            for number in range(count)}
+
+
+def measure(label: str, factory: Callable[..., object], count: int) -> None:
+    """Print the memory held per guest and the pickled size of the collection."""
+    tracemalloc.start()
+    guests = build_guests(factory, count)
+    held, _ = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    plain = len(pickle.dumps(guests, protocol=pickle.HIGHEST_PROTOCOL))
+    records = len(encode_records(guests))
+    print(f"{label}: {held / count:.1f} bytes/record in memory, "
+          f"{plain / count:.1f} bytes/record pickled, {records / count:.1f} bytes/record in a record file")
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Compare guest memory use before and after __slots__.")
+    parser.add_argument('--count', type=int, default=1_000_000, help="number of guests to create")
+    args = parser.parse_args()
+    measure("Before (__dict__)", DictGuest, args.count)
+    measure("After (__slots__)", Guest, args.count)
+
+
+if __name__ == '__main__':
+    main()
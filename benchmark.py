@@ -0,0 +1,193 @@
+import argparse
+import itertools
+import json
+import platform
+import random
+import shutil
+import statistics
+import tempfile
+import time
+from datetime import datetime, timedelta
+from typing import Any, Callable, Dict, List
+
+from models import Caterer, Client, Decorator, Employee, Entertainer, Event, Guest, Record, Venue
+from reports import REPORTS, Reports
+from storage import COLLECTIONS, Store, open_store
+
+DEPARTMENTS = ('Sales', 'Operations', 'Finance', 'Catering', 'Logistics')
+JOB_TITLES = ('Coordinator', 'Manager', 'Assistant', 'Director', 'Planner')
+EVENT_TYPES = ('Wedding', 'Conference', 'Birthday', 'Gala', 'Workshop')
+THEMES = ('Classic', 'Modern', 'Garden', 'Vintage', 'Beach')
+
+
+def scaled_counts(scale: int) -> Dict[str, int]:
+    """Return how many records of each collection make up a data set of the given scale."""
+    small = max(scale // 100, 10)
+    return {'guests': scale, 'events': max(scale // 10, 10), 'employees': small, 'clients': small,
+            'suppliers': small, 'venues': small}
+
+
+def generate_data(scale: int, seed: int = 1) -> Dict[str, Dict[str, Record]]:
+    """Create a reproducible data set; events reference existing clients, guests, suppliers and venues."""
+    rng = random.Random(seed)
+    counts = scaled_counts(scale)
+    data: Dict[str, Dict[str, Record]] = {}
+    data['employees'] = {
+        f"E{n}": Employee(f"Employee {n}", f"E{n}", rng.choice(DEPARTMENTS), rng.choice(JOB_TITLES),
+                          rng.randint(20000, 90000), rng.randint(18, 65), "1990-01-01", f"P{n}")
+        for n in range(counts['employees'])}
+    data['clients'] = {
+        f"C{n}": Client(f"C{n}", f"Client {n}", f"{n} Market Street", f"client{n}@example.com",
+                        rng.randint(1000, 100000))
+        for n in range(counts['clients'])}
+    data['guests'] = {
+        f"G{n}": Guest(f"G{n}", f"Guest {n}", f"{n % 1000} High Street", f"guest{n}@example.com")
+        for n in range(counts['guests'])}
+    data['venues'] = {
+        f"V{n}": Venue(f"V{n}", f"Venue {n}", f"{n} Park Road", f"venue{n}@example.com", rng.randint(0, 50),
+                       rng.randint(50, 1000))
+        for n in range(counts['venues'])}
+    suppliers: Dict[str, Record] = {}
+    for n in range(counts['suppliers']):
+        kind = rng.choice((Caterer, Decorator, Entertainer))
+        if kind is Caterer:
+            suppliers[f"S{n}"] = Caterer(f"S{n}", f"Supplier {n}", "", "", "Buffet", rng.randint(0, 50),
+                                         rng.randint(50, 500))
+        else:
+            suppliers[f"S{n}"] = kind(f"S{n}", f"Supplier {n}", "", "")
+    data['suppliers'] = suppliers
+    first_day = datetime(2024, 1, 1)
+    data['events'] = {
+        f"EV{n}": Event(f"EV{n}", rng.choice(EVENT_TYPES), rng.choice(THEMES),
+                        first_day + timedelta(days=rng.randrange(730)), f"{rng.randint(8, 20)}:00",
+                        rng.randint(1, 6), f"{rng.randrange(counts['venues'])} Park Road",
+                        f"C{rng.randrange(counts['clients'])}",
+                        [f"G{rng.randrange(counts['guests'])}" for _ in range(rng.randint(1, 20))],
+                        [f"S{rng.randrange(counts['suppliers'])}" for _ in range(rng.randint(1, 3))], f"INV{n}")
+        for n in range(counts['events'])}
+    return data
+
+
+def populate(store: Store, data: Dict[str, Dict[str, Record]]) -> int:
+    """Write a generated data set into a store and persist it."""
+    for name, records in data.items():
+        for key, value in records.items():
+            put(store, name, key, value)
+    return store.save()
+
+
+def put(store: Store, name: str, key: str, value: Any) -> None:
+    """Store one record the way the application does, without persisting it."""
+    store.collection(name)[key] = value
+    store.record_set(name, key, value)
+
+
+def remove(store: Store, name: str, key: str) -> None:
+    """Delete one record the way the application does, without persisting it."""
+    del store.collection(name)[key]
+    store.record_delete(name, key)
+
+
+def describe_event(store: Store, event_id: str) -> str:
+    """Build the text the event display shows, resolving the names of its guests."""
+    event = store.get_record('events', event_id)
+    guests = [store.get_record('guests', guest_id) for guest_id in event.guests]
+    return (f"Event ID: {event_id}\nType: {event.type}\nDate: {event.date:%Y-%m-%d}\n"
+            f"Guests: {', '.join(guest.name for guest in guests if guest is not None)}")
+
+
+def timed(function: Callable[[], Any], repeat: int = 1) -> List[float]:
+    """Return the wall-clock seconds of each of repeat calls."""
+    times = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        function()
+        times.append(time.perf_counter() - start)
+    return times
+
+
+def run_scale(kind: str, scale: int, seed: int, samples: int) -> List[Dict[str, Any]]:
+    """Benchmark every operation against one store kind at one scale."""
+    rng = random.Random(seed)
+    results = []
+
+    def record(operation: str, times: List[float], operations: int = 1) -> None:
+        results.append({'store': kind, 'scale': scale, 'operation': operation, 'operations': operations,
+                        'samples': len(times), 'median_seconds': statistics.median(times),
+                        'min_seconds': min(times), 'max_seconds': max(times)})
+
+    directory = tempfile.mkdtemp(prefix='ems-bench-')
+    try:
+        data = generate_data(scale, seed)
+        store = open_store(kind, directory)
+        record('populate', timed(lambda: populate(store, data)), sum(len(records) for records in data.values()))
+        store.close()
+
+        guest_ids = rng.sample(sorted(data['guests']), min(samples, len(data['guests'])))
+        event_ids = rng.sample(sorted(data['events']), min(samples, len(data['events'])))
+
+        store = open_store(kind, directory)
+        record('cold_lookup', timed(lambda: [store.get_record('guests', key) for key in guest_ids]), len(guest_ids))
+        store.close()
+
+        store = open_store(kind, directory)
+        record('startup_load', timed(lambda: store.load_all()), len(COLLECTIONS))
+        record('lookup', timed(lambda: [store.get_record('guests', key) for key in guest_ids]), len(guest_ids))
+        record('event_display', timed(lambda: [describe_event(store, key) for key in event_ids]), len(event_ids))
+
+        views = []
+        record('report_build', timed(lambda: views.append(Reports(*[store.collection(name) for name in
+                                                                    ('events', 'clients', 'employees', 'suppliers')]))))
+        for report in REPORTS:
+            record(f'report:{report}', timed(lambda: getattr(views[0], report)(), repeat=5))
+
+        counter = itertools.count()
+
+        def add_one() -> None:
+            number = next(counter)
+            put(store, 'guests', f"BENCH{number}", Guest(f"BENCH{number}", "Bench Guest", "", ""))
+            store.save()
+
+        record('single_add_persist', timed(add_one, repeat=20))
+        added = [f"BENCH{number}" for number in range(20)]
+        record('single_delete_persist', timed(lambda: (remove(store, 'guests', added.pop()), store.save()), repeat=20))
+
+        def bulk_insert() -> None:
+            for number in range(samples):
+                key = f"BULK{number}"
+                put(store, 'guests', key, Guest(key, "Bulk Guest", "", ""))
+            store.save()
+
+        record('bulk_insert', timed(bulk_insert), samples)
+        store.close()
+    finally:
+        shutil.rmtree(directory, ignore_errors=True)
+    return results
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Benchmark load, save, CRUD and query paths on generated data.")
+    parser.add_argument('--scales', type=int, nargs='+', default=[10_000, 100_000, 1_000_000],
+                        help="number of guests in each generated data set")
+    parser.add_argument('--stores', nargs='+', default=['pickle'], choices=['pickle', 'journal', 'sqlite'],
+                        help="store backends to benchmark")
+    parser.add_argument('--seed', type=int, default=1, help="random seed for the generated data")
+    parser.add_argument('--samples', type=int, default=1000, help="lookups, displays and bulk inserts per run")
+    parser.add_argument('--output', default='benchmark-results.json', help="file the JSON results are written to")
+    args = parser.parse_args()
+
+    results = []
+    for scale in args.scales:
+        for kind in args.stores:
+            for result in run_scale(kind, scale, args.seed, args.samples):
+                print(f"{kind:8} {scale:>9} {result['operation']:22} {result['median_seconds'] * 1000:10.2f} ms")
+                results.append(result)
+    report = {'python': platform.python_version(), 'platform': platform.platform(), 'seed': args.seed,
+              'created': datetime.now().isoformat(timespec='seconds'), 'results': results}
+    with open(args.output, 'w', encoding='utf-8') as f:
+        json.dump(report, f, indent=2)
+    print(f"Results written to {args.output}")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,179 @@
+import csv
+import json
+import os
+from typing import Any, Callable, Dict, Iterable, Iterator, List, Mapping, Optional, Tuple
+
+from models import KEY_FIELDS, LIST_SEPARATOR, RECORD_TYPES, Caterer, Record, record_from_dict
+
+
+def _columns(name: str) -> Tuple[str, ...]:
+    """Return a collection's file columns, ID first; suppliers carry the kind and caterer fields."""
+    key = KEY_FIELDS[name]
+    fields = Caterer.fields() + ('kind',) if name == 'suppliers' else RECORD_TYPES[name].fields()
+    return (key,) + tuple(field for field in fields if field != key)
+
+
+# Fields read and written for each collection; the first field is the record ID.
+FIELDS = {name: _columns(name) for name in RECORD_TYPES}
+
+
+class RowError(ValueError):
+    """Raised when an imported row cannot be turned into a record."""
+
+
+def file_format(path: str) -> str:
+    """Return 'csv' or 'jsonl' depending on a file's extension."""
+    extension = os.path.splitext(path)[1].lower()
+    if extension == '.csv':
+        return 'csv'
+    if extension in ('.jsonl', '.ndjson', '.json'):
+        return 'jsonl'
+    raise ValueError(f"Unsupported file type: {extension or path}")
+
+
+def read_rows(f, fmt: str) -> Iterator[Any]:
+    """Yield the rows of an open CSV or JSON Lines file one at a time.
+
+    A JSON line that cannot be parsed is yielded as a RowError so the caller can skip it
+    and carry on with the rest of the file.
+    """
+    if fmt == 'csv':
+        yield from csv.DictReader(f)
+    else:
+        for line in f:
+            line = line.strip()
+            if line:
+                try:
+                    yield json.loads(line)
+                except json.JSONDecodeError as exc:
+                    yield RowError(f"invalid JSON: {exc}")
+
+
+def row_to_record(name: str, row: Mapping[str, Any]) -> Tuple[str, Record]:
+    """Validate an imported row and convert it into a (key, record) pair."""
+    key_field = KEY_FIELDS[name]
+    key = str(row.get(key_field) or '').strip()
+    if not key:
+        raise RowError(f"missing {key_field}")
+    values = dict(row)
+    values[key_field] = key
+    try:
+        record = record_from_dict(name, values)
+    except (TypeError, ValueError) as exc:
+        raise RowError(str(exc)) from None
+    if name == 'events' and record.date is None:
+        raise RowError("missing date")
+    if name != 'events' and not str(record.name).strip():
+        raise RowError("missing name")
+    return key, record
+
+
+def record_to_row(name: str, key: str, value: Record, fmt: str) -> Dict[str, Any]:
+    """Convert a record into an exportable row."""
+    row = value.to_dict()
+    row[KEY_FIELDS[name]] = key
+    if fmt == 'csv':
+        for field in type(value)._lists:
+            row[field] = LIST_SEPARATOR.join(row[field])
+    return row
+
+
+class BulkImport:
+    """Imports a file into a collection in batches, one persist per batch.
+
+    The file is streamed and never held in memory. Call ``step`` repeatedly, for example
+    from a timer, until ``done`` is set; ``put`` stores one record without persisting it
+    and ``flush`` persists a finished batch.
+    """
+
+    def __init__(self, path: str, name: str, collection: Mapping[str, Any], put: Callable[[str, str, Any], None],
+                 flush: Callable[[], None], batch_size: int = 1000):
+        """Open a file for importing into the named collection."""
+        self.name = name
+        self.collection = collection
+        self.put = put
+        self.flush = flush
+        self.batch_size = batch_size
+        self.format = file_format(path)
+        self.total_bytes = os.path.getsize(path)
+        self._file = open(path, newline='' if self.format == 'csv' else None, encoding='utf-8')
+        self._rows = read_rows(self._file, self.format)
+        self.line = 0
+        self.imported = 0
+        self.errors: List[str] = []
+        self.error_count = 0
+        self.done = False
+
+    def _reject(self, message: str) -> None:
+        """Count a rejected row, keeping the first hundred messages."""
+        self.error_count += 1
+        if len(self.errors) < 100:
+            self.errors.append(f"Row {self.line}: {message}")
+
+    def step(self) -> int:
+        """Import the next batch and return how many records it added."""
+        if self.done:
+            return 0
+        added = 0
+        for row in self._rows:
+            self.line += 1
+            if isinstance(row, RowError):
+                self._reject(str(row))
+                continue
+            if not isinstance(row, dict):
+                self._reject("row is not an object")
+                continue
+            try:
+                key, value = row_to_record(self.name, row)
+            except RowError as exc:
+                self._reject(str(exc))
+                continue
+            if key in self.collection:
+                self._reject(f"duplicate ID {key}")
+                continue
+            self.put(self.name, key, value)
+            added += 1
+            if added >= self.batch_size:
+                break
+        else:
+            self.close()
+        if added:
+            self.flush()
+        self.imported += added
+        return added
+
+    def progress(self) -> float:
+        """Return the fraction of the file read so far."""
+        if self.done or not self.total_bytes:
+            return 1.0
+        return min(self._file.buffer.tell() / self.total_bytes, 1.0)
+
+    def close(self) -> None:
+        """Stop importing and close the file."""
+        self.done = True
+        self._file.close()
+
+
+def export_records(path: str, name: str, records: Iterable[Tuple[str, Any]],
+                   on_progress: Optional[Callable[[int], bool]] = None, every: int = 10000) -> int:
+    """Write records to a CSV or JSON Lines file as they are produced and return the count.
+
+    ``on_progress`` is called with the number of rows written every ``every`` rows and may
+    return False to stop the export early.
+    """
+    fmt = file_format(path)
+    count = 0
+    with open(path, 'w', newline='' if fmt == 'csv' else None, encoding='utf-8') as f:
+        writer = csv.DictWriter(f, fieldnames=FIELDS[name]) if fmt == 'csv' else None
+        if writer is not None:
+            writer.writeheader()
+        for key, value in records:
+            row = record_to_row(name, key, value, fmt)
+            if writer is not None:
+                writer.writerow(row)
+            else:
+                f.write(json.dumps(row) + '\n')
+            count += 1
+            if on_progress is not None and count % every == 0 and on_progress(count) is False:
+                break
+    return count
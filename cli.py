@@ -0,0 +1,282 @@
+import argparse
+import os
+import subprocess
+import sys
+from typing import Any, List, Optional
+
+from core import DataService
+from metrics import METRICS
+from reports import REPORTS
+from storage import COLLECTIONS, open_store
+
+
+def run_import(service: DataService, args: argparse.Namespace) -> int:
+    """Import a file into a collection, printing progress and rejected rows."""
+    def report(job) -> None:
+        if args.verbose:
+            print(f"{job.imported} imported, {job.error_count} rejected ({job.progress():.0%})", file=sys.stderr)
+
+    try:
+        job = service.import_file(args.path, args.collection, args.batch_size, report)
+    except (OSError, ValueError) as exc:
+        print(f"Cannot import file: {exc}", file=sys.stderr)
+        return 1
+    for error in job.errors:
+        print(error, file=sys.stderr)
+    print(f"{job.imported} {args.collection} imported, {job.error_count} rows rejected.")
+    return 0
+
+
+def run_export(service: DataService, args: argparse.Namespace) -> int:
+    """Export a collection to a file."""
+    try:
+        count = service.export_file(args.path, args.collection)
+    except (OSError, ValueError) as exc:
+        print(f"Export failed: {exc}", file=sys.stderr)
+        return 1
+    print(f"{count} {args.collection} exported to {args.path}.")
+    return 0
+
+
+def run_query(service: DataService, args: argparse.Namespace) -> int:
+    """Print the IDs of the events matching every given criterion."""
+    try:
+        event_ids = service.find_events(args.from_date, args.to_date, args.client, args.venue, args.guest,
+                                        args.supplier)
+    except ValueError:
+        print("Dates must be in YYYY-MM-DD format.", file=sys.stderr)
+        return 1
+    if event_ids is None:
+        print("Give at least one search criterion.", file=sys.stderr)
+        return 1
+    for event_id in event_ids:
+        print(event_id)
+    return 0
+
+
+def run_search(service: DataService, args: argparse.Namespace) -> int:
+    """Print the records whose names match a search."""
+    index = service.search_index
+    for name, key in index.search(args.text, args.limit):
+        print(f"{name}\t{key}\t{index.name_of(name, key)}")
+    return 0
+
+
+def run_report(service: DataService, args: argparse.Namespace) -> int:
+    """Print a report as tab-separated columns under a heading row."""
+    columns, rows = service.reports.run(args.report)
+    print('\t'.join(columns))
+    for row in rows:
+        print('\t'.join(str(value) for value in row))
+    return 0
+
+
+def run_invoice(service: DataService, args: argparse.Namespace) -> int:
+    """Write the invoices of the events in a date range, printing progress."""
+    def report(job) -> None:
+        if args.verbose:
+            print(f"{job.skipped + job.written} of {job.total} invoiced ({job.progress():.0%})", file=sys.stderr)
+
+    try:
+        job = service.generate_invoices(args.from_date, args.to_date, args.output, args.workers, args.chunk_size,
+                                        report, args.record_totals)
+    except ValueError:
+        print("Dates must be in YYYY-MM-DD format.", file=sys.stderr)
+        return 1
+    except OSError as exc:
+        print(f"Cannot write invoices: {exc}", file=sys.stderr)
+        return 1
+    for error in job.errors:
+        print(error, file=sys.stderr)
+    print(f"{job.written} invoices written to {args.output} totalling {job.invoiced:,.2f}, "
+          f"{job.skipped} already invoiced.")
+    return 1 if job.errors else 0
+
+
+def run_check(service: DataService, args: argparse.Namespace) -> int:
+    """Report events that refer to missing clients, guests or suppliers."""
+    problems = service.check_integrity()
+    for problem in problems:
+        print(problem)
+    if problems:
+        print(f"{len(problems)} missing record(s) are still referenced.", file=sys.stderr)
+        return 1
+    print("Every client, guest and supplier that events refer to exists.")
+    return 0
+
+
+def backups_of(service: DataService, args: argparse.Namespace) -> Any:
+    """Return the service's backups, in the repository given on the command line if there is one."""
+    if args.repository is None:
+        return service.backups
+    from backup import Backups
+    return Backups(service, args.repository)
+
+
+def run_backup(service: DataService, args: argparse.Namespace) -> int:
+    """Back up the store, writing only the chunks the repository does not have yet."""
+    backups = backups_of(service, args)
+    try:
+        manifest = backups.backup()
+    except (OSError, ValueError) as exc:
+        print(f"Backup failed: {exc}", file=sys.stderr)
+        return 1
+    records = sum(entry['count'] for entry in manifest['collections'].values())
+    print(f"Snapshot {manifest['id']}: {records} records, {manifest['chunks_encoded']} chunks encoded, "
+          f"{manifest['bytes_written']} bytes written to {backups.repository}.")
+    return 0
+
+
+def run_snapshots(service: DataService, args: argparse.Namespace) -> int:
+    """List the snapshots in the backup repository, oldest first."""
+    from backup import list_snapshots
+    for manifest in list_snapshots(backups_of(service, args).repository):
+        records = sum(entry['count'] for entry in manifest['collections'].values())
+        print(f"{manifest['id']}\t{manifest['created']}\t{records} records\t{manifest['bytes_written']} bytes")
+    return 0
+
+
+def run_restore(service: DataService, args: argparse.Namespace) -> int:
+    """Bring the store back to a snapshot."""
+    try:
+        changed = backups_of(service, args).restore(args.snapshot)
+    except KeyError as exc:
+        print(exc.args[0], file=sys.stderr)
+        return 1
+    except (OSError, ValueError) as exc:
+        print(f"Restore failed: {exc}", file=sys.stderr)
+        return 1
+    print(f"Restored snapshot {args.snapshot}: {changed} records changed.")
+    return 0
+
+
+def run_compact(service: DataService, args: argparse.Namespace) -> int:
+    """Fold the journal into the snapshots of a journal store."""
+    compact = getattr(service.store, 'compact', None)
+    if compact is None:
+        print("This store has no journal to compact.")
+        return 0
+    if not compact(wait=True):
+        print("Compaction could not start; a journal from a failed compaction is waiting for the next start.",
+              file=sys.stderr)
+        return 1
+    error = getattr(service.store, 'compaction_error', None)
+    if error is not None:
+        print(f"Compaction failed: {error}", file=sys.stderr)
+        return 1
+    print("Journal compacted.")
+    return 0
+
+
+def run_import_time(args: argparse.Namespace) -> int:
+    """Time importing a module in a fresh interpreter, in milliseconds."""
+    code = (f"import time; start = time.perf_counter(); import {args.module}; "
+            f"print(round((time.perf_counter() - start) * 1000, 1))")
+    times = []
+    for _ in range(args.repeat):
+        output = subprocess.run([sys.executable, '-c', code], capture_output=True, text=True, check=True,
+                                cwd=os.path.dirname(os.path.abspath(__file__)))
+        times.append(float(output.stdout))
+    print(f"import {args.module}: best {min(times)} ms, worst {max(times)} ms over {len(times)} runs")
+    return 0
+
+
+def build_parser() -> argparse.ArgumentParser:
+    """Create the command-line parser."""
+    parser = argparse.ArgumentParser(description="Batch operations on the event management data.")
+    parser.add_argument('--store', choices=['pickle', 'journal', 'sqlite', 'remote'],
+                        help="store backend (default: the EMS_STORE environment variable, else pickle; "
+                             "remote uses the data server at EMS_SERVER)")
+    parser.add_argument('--directory', default='.', help="directory holding the data files")
+    parser.add_argument('--metrics', metavar='PATH',
+                        help="profile the command and write its metrics to PATH (.json, otherwise Prometheus text)")
+    commands = parser.add_subparsers(dest='command', required=True)
+
+    command = commands.add_parser('import', help="import a CSV or JSON Lines file into a collection")
+    command.add_argument('collection', choices=COLLECTIONS)
+    command.add_argument('path')
+    command.add_argument('--batch-size', type=int, default=1000, help="records persisted per batch")
+    command.add_argument('--verbose', action='store_true', help="report progress after every batch")
+    command.set_defaults(run=run_import)
+
+    command = commands.add_parser('export', help="export a collection to a CSV or JSON Lines file")
+    command.add_argument('collection', choices=COLLECTIONS)
+    command.add_argument('path')
+    command.set_defaults(run=run_export)
+
+    command = commands.add_parser('query', help="list the events matching every given criterion")
+    command.add_argument('--from', dest='from_date', default='', help="first date, YYYY-MM-DD")
+    command.add_argument('--to', dest='to_date', default='', help="last date, YYYY-MM-DD")
+    command.add_argument('--client', default='', help="client ID")
+    command.add_argument('--venue', default='', help="venue address")
+    command.add_argument('--guest', default='', help="guest ID")
+    command.add_argument('--supplier', default='', help="supplier ID")
+    command.set_defaults(run=run_query)
+
+    command = commands.add_parser('search', help="find employees, clients, guests, suppliers and venues by name")
+    command.add_argument('text')
+    command.add_argument('--limit', type=int, default=20)
+    command.set_defaults(run=run_search)
+
+    command = commands.add_parser('report', help="print a budget, event volume, utilization or payroll report")
+    command.add_argument('report', choices=REPORTS)
+    command.set_defaults(run=run_report)
+
+    command = commands.add_parser('invoice', help="write the invoices of the events in a date range")
+    command.add_argument('--from', dest='from_date', default='0001-01-01', help="first date, YYYY-MM-DD")
+    command.add_argument('--to', dest='to_date', default='9999-12-31', help="last date, YYYY-MM-DD")
+    command.add_argument('--output', default='invoices', help="directory the invoice files are written to")
+    command.add_argument('--workers', type=int, help="worker processes (default: one per CPU)")
+    command.add_argument('--chunk-size', type=int, default=50, help="events sent to a worker at a time")
+    command.add_argument('--record-totals', action='store_true',
+                         help="append each invoice number and total to the event's invoice notes")
+    command.add_argument('--verbose', action='store_true', help="report progress after every chunk")
+    command.set_defaults(run=run_invoice)
+
+    command = commands.add_parser('check', help="find events that refer to missing clients, guests or suppliers")
+    command.set_defaults(run=run_check)
+
+    command = commands.add_parser('backup', help="take an incremental backup of the store")
+    command.add_argument('--repository', help="backup directory (default: EMS_BACKUPS, else backups in the data "
+                                              "directory)")
+    command.set_defaults(run=run_backup)
+
+    command = commands.add_parser('snapshots', help="list the backups in the backup repository")
+    command.add_argument('--repository', help="backup directory")
+    command.set_defaults(run=run_snapshots)
+
+    command = commands.add_parser('restore', help="bring the store back to a backed up snapshot")
+    command.add_argument('snapshot', help="snapshot ID, as listed by the snapshots command")
+    command.add_argument('--repository', help="backup directory")
+    command.set_defaults(run=run_restore)
+
+    command = commands.add_parser('compact', help="fold the journal of a journal store into its snapshots")
+    command.set_defaults(run=run_compact)
+
+    command = commands.add_parser('import-time', help="measure how long a module takes to import")
+    command.add_argument('module', nargs='?', default='core')
+    command.add_argument('--repeat', type=int, default=5)
+    command.set_defaults(run=run_import_time)
+    return parser
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    """Run one command and return its exit status."""
+    args = build_parser().parse_args(argv)
+    if args.command == 'import-time':
+        return args.run(args)
+    if args.metrics:
+        METRICS.enabled = True
+    service = DataService(open_store(args.store, args.directory), background_saves=False)
+    try:
+        return args.run(service, args)
+    finally:
+        if args.metrics:
+            export = METRICS.export_json if args.metrics.endswith('.json') else METRICS.export_prometheus
+            export(args.metrics)
+        for _, error in service.close():
+            print(f"Saving data failed: {error}", file=sys.stderr)
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,438 @@
+import os
+import threading
+from copy import copy
+from typing import Any, Callable, Dict, List, Optional, Tuple
+
+from metrics import METRICS
+from models import EARLIEST_DATE, EVENT_REFERENCES, LATEST_DATE, Event
+from storage import COLLECTIONS, BackgroundWriter, Store, open_store, timed_save
+
+# Indexes built on first use and then kept current through the observer hooks.
+LAZY_INDEXES = ('search_index', 'event_index', 'schedule', 'capacity_index', 'reports', 'backups')
+# What deleting a record that events refer to does to those events: 'cascade' deletes them,
+# 'nullify' removes the reference from them and 'restrict' refuses the delete.
+DELETE_RULES = {
+    'clients': 'restrict',
+    'guests': 'nullify',
+    'suppliers': 'nullify',
+}
+DELETE_ACTIONS = ('cascade', 'nullify', 'restrict')
+
+
+def references(event: Event, name: str) -> List[str]:
+    """Return the IDs of a referenced collection that an event refers to."""
+    ids = getattr(event, EVENT_REFERENCES[name])
+    return list(ids) if isinstance(ids, (list, tuple)) else [ids] if ids else []
+
+
+def event_list(event_ids: List[str], limit: int = 5) -> str:
+    """Describe a list of events by count and their first few IDs."""
+    more = " ..." if len(event_ids) > limit else ""
+    return f"{len(event_ids)} event(s): {', '.join(event_ids[:limit])}{more}"
+
+
+class TransactionError(ValueError):
+    """Raised when the changes of a transaction do not validate; ``problems`` lists why."""
+
+    def __init__(self, problems: List[str]):
+        super().__init__("\n".join(problems))
+        self.problems = problems
+
+
+class Transaction:
+    """A group of puts and removes across collections applied together.
+
+    Changes are only staged until ``commit``, which validates them as a whole, applies them
+    and persists once. If applying a change fails, the ones already applied are undone and
+    the error is raised, so either every change is made or none is. Used as a context
+    manager, the transaction commits when the block ends without an exception.
+    """
+
+    def __init__(self, service: 'DataService'):
+        """Start an empty transaction on a data service."""
+        self.service = service
+        # (name, key) -> new value, or None for a removal; later changes to a record replace earlier ones.
+        self.changes: Dict[Tuple[str, str], Any] = {}
+        self.done = False
+
+    def __enter__(self) -> 'Transaction':
+        return self
+
+    def __exit__(self, exc_type: Any, exc: Any, traceback: Any) -> None:
+        if exc_type is None:
+            self.commit()
+
+    def put(self, name: str, key: str, value: Any) -> None:
+        """Stage adding or replacing a record."""
+        self.changes[(name, key)] = value
+
+    def remove(self, name: str, key: str) -> None:
+        """Stage deleting a record."""
+        self.changes[(name, key)] = None
+
+    def delete(self, name: str, key: str, rule: Optional[str] = None) -> List[str]:
+        """Stage deleting a record together with what its delete rule does to the events using it.
+
+        ``rule`` overrides the service's rule for the collection. Returns the events affected;
+        with 'restrict' nothing but the delete is staged, so the commit fails if any event
+        still refers to the record.
+        """
+        self.remove(name, key)
+        if name not in EVENT_REFERENCES:
+            return []
+        rule = rule or self.service.delete_rules[name]
+        if rule not in DELETE_ACTIONS:
+            raise ValueError(f"Unknown delete rule: {rule}")
+        event_ids = [event_id for event_id in self.service.referencing_events(name, key)
+                     if self.get('events', event_id) is not None]
+        for event_id in event_ids:
+            if rule == 'cascade':
+                self.remove('events', event_id)
+            elif rule == 'nullify':
+                # A shallow copy with the one field replaced; the stored event is never modified in place
+                event = copy(self.get('events', event_id))
+                field = EVENT_REFERENCES[name]
+                setattr(event, field, [ref for ref in getattr(event, field) if ref != key] if name != 'clients' else '')
+                self.put('events', event_id, event)
+        return event_ids
+
+    def get(self, name: str, key: str) -> Any:
+        """Return a record as it will be once the transaction commits, or None."""
+        if (name, key) in self.changes:
+            return self.changes[(name, key)]
+        return getattr(self.service, name).get(key)
+
+    def exists(self, name: str, key: str) -> bool:
+        """Return whether a record will exist once the transaction commits."""
+        if (name, key) in self.changes:
+            return self.changes[(name, key)] is not None
+        return key in getattr(self.service, name)
+
+    def validate(self) -> List[str]:
+        """Return the problems that would stop the transaction from committing.
+
+        Records removed must exist and no event left afterwards may still refer to them. Every
+        event added or replaced must have a date, and the client, guest and supplier IDs it
+        gains must exist after the transaction; references it already had are left to
+        ``DataService.check_integrity``.
+        """
+        problems = []
+        for (name, key), value in self.changes.items():
+            if value is None:
+                if key not in getattr(self.service, name):
+                    problems.append(f"{key} not found in {name}")
+                elif name in EVENT_REFERENCES:
+                    users = []
+                    for event_id in self.service.referencing_events(name, key):
+                        event = self.get('events', event_id)
+                        if event is not None and key in references(event, name):
+                            users.append(event_id)
+                    if users:
+                        problems.append(f"{key} in {name} is used by {event_list(users)}")
+            elif name == 'events':
+                if value.date is None:
+                    problems.append(f"Event {key} has no date")
+                old_value = self.service.events.get(key)
+                for target in EVENT_REFERENCES:
+                    known = set(references(old_value, target)) if old_value is not None else set()
+                    for ref in references(value, target):
+                        if ref not in known and not self.exists(target, ref):
+                            problems.append(f"Event {key} refers to {ref}, which is not in {target}")
+        return problems
+
+    def commit(self, validate: bool = True) -> int:
+        """Validate and apply every change with a single save and return the number applied.
+
+        The service lock is held throughout, so other threads never see part of the
+        transaction, and the changes are recorded as one store batch, so no save persists
+        only some of them.
+        """
+        if self.done:
+            raise RuntimeError("The transaction has already finished.")
+        self.done = True
+        with self.service.lock:
+            problems = self.validate() if validate else []
+            if problems:
+                raise TransactionError(problems)
+            start = METRICS.start()
+            # Each record's value before the transaction, noted before it is changed so a change
+            # that fails halfway is undone too.
+            undo: List[Tuple[str, str, Any]] = []
+            self.service.store.begin_batch()
+            try:
+                for (name, key), value in self.changes.items():
+                    undo.append((name, key, getattr(self.service, name).get(key)))
+                    if value is None:
+                        self.service._delete(name, key)
+                    else:
+                        self.service._set(name, key, value)
+            except BaseException:
+                self._rollback(undo)
+                raise
+            finally:
+                self.service.store.end_batch()
+                METRICS.stop('transaction', start)
+            if undo:
+                self.service.save()
+        return len(undo)
+
+    def _rollback(self, undo: List[Tuple[str, str, Any]]) -> None:
+        """Put back the records changed so far, most recent first."""
+        for name, key, old_value in reversed(undo):
+            current = getattr(self.service, name).get(key)
+            if current == old_value:
+                continue
+            if old_value is None:
+                self.service._delete(name, key)
+            else:
+                self.service._set(name, key, old_value)
+
+
+def notify_set(observer: Any, name: str, key: str, value: Any, old_value: Any) -> None:
+    """Tell an observer a record was added or replaced.
+
+    A replacement goes to the observer's optional ``on_replace(name, key, old_value, value)``
+    so it can update only what changed; observers without one see a delete and then a set.
+    """
+    if old_value is None:
+        observer.on_set(name, key, value)
+    elif hasattr(observer, 'on_replace'):
+        observer.on_replace(name, key, old_value, value)
+    else:
+        observer.on_delete(name, key, old_value)
+        observer.on_set(name, key, value)
+
+
+class DataService:
+    """The application's data layer, usable without any user interface.
+
+    Holds the store, the lazily built indexes and the observers notified of every change.
+    Collections and indexes are attributes created on first access, so a script that only
+    exports guests never loads events or builds a search index. With ``background_saves``
+    each change is persisted by a writer thread; otherwise ``save`` writes synchronously.
+    Each change and its observer notifications happen under ``lock``, which other threads
+    hold to read the data consistently.
+    """
+
+    def __init__(self, store: Optional[Store] = None, background_saves: bool = True):
+        """Wrap a store, opening the configured one if none is given."""
+        self.store = store if store is not None else open_store()
+        self.observers: List[Any] = []
+        self.row_sources = {}
+        self.delete_rules = dict(DELETE_RULES)
+        self.lock = threading.RLock()
+        self.writer = BackgroundWriter(self.store) if background_saves else None
+        METRICS.gauge_sources.append(self.collection_sizes)
+
+    def __getattr__(self, name: str) -> Any:
+        if name in COLLECTIONS:
+            value = self.store.collection(name)
+        elif name == 'search_index':
+            value = self.store.search_index()
+        elif name == 'event_index':
+            value = self.store.event_index()
+        elif name == 'schedule':
+            from scheduling import Schedule
+            value = Schedule(self.events, self.venues, self.suppliers)
+        elif name == 'capacity_index':
+            from scheduling import CapacityIndex
+            value = CapacityIndex(self.venues, self.suppliers)
+        elif name == 'reports':
+            from reports import Reports
+            value = Reports(self.events, self.clients, self.employees, self.suppliers)
+        elif name == 'backups':
+            from backup import Backups
+            value = Backups(self, os.environ.get('EMS_BACKUPS') or
+                            os.path.join(getattr(self.store, 'directory', '.'), 'backups'))
+        else:
+            raise AttributeError(name)
+        if name in LAZY_INDEXES:
+            self.observers.append(value)
+        setattr(self, name, value)
+        return value
+
+    def is_built(self, name: str) -> bool:
+        """Return whether a collection or lazy index has been created yet."""
+        return name in self.__dict__
+
+    def collection_sizes(self) -> Dict[str, int]:
+        """Return the number of records in each loaded collection."""
+        return {name: len(self.store.collection(name)) for name in COLLECTIONS if self.store.is_loaded(name)}
+
+    def _set(self, name: str, key: str, value: Any) -> Any:
+        """Add or replace a record, notify the observers and return the value it replaced."""
+        start = METRICS.start()
+        collection = getattr(self, name)
+        with self.lock:
+            old_value = collection.get(key)
+            collection[key] = value
+            self.store.record_set(name, key, value)
+            for observer in self.observers:
+                notify_set(observer, name, key, value, old_value)
+        METRICS.stop(f'put:{name}', start)
+        return old_value
+
+    def _delete(self, name: str, key: str) -> Any:
+        """Delete a record, notify the observers and return its value."""
+        start = METRICS.start()
+        collection = getattr(self, name)
+        with self.lock:
+            old_value = collection.get(key)
+            if old_value is None:
+                raise KeyError(key)
+            del collection[key]
+            self.store.record_delete(name, key)
+            for observer in self.observers:
+                observer.on_delete(name, key, old_value)
+        METRICS.stop(f'remove:{name}', start)
+        return old_value
+
+    def put(self, name: str, key: str, value: Any, flush: bool = True) -> None:
+        """Add or replace a record, notify the observers and optionally persist."""
+        self._set(name, key, value)
+        if flush:
+            self.save()
+
+    def remove(self, name: str, key: str, flush: bool = True) -> None:
+        """Delete a record, notify the observers and optionally persist."""
+        self._delete(name, key)
+        if flush:
+            self.save()
+
+    def transaction(self) -> Transaction:
+        """Start a transaction that applies a group of changes together with one save."""
+        return Transaction(self)
+
+    def referencing_events(self, name: str, key: str) -> List[str]:
+        """Return the events that refer to a record, found through the event index."""
+        if name not in EVENT_REFERENCES:
+            return []
+        return self.event_index.referencing(name, key)
+
+    def delete(self, name: str, key: str, rule: Optional[str] = None) -> List[str]:
+        """Delete a record and apply its delete rule to the events using it, in one transaction.
+
+        Returns the events deleted or changed. Raises TransactionError if the record does not
+        exist or the rule is 'restrict' and events still use it.
+        """
+        with self.transaction() as transaction:
+            event_ids = transaction.delete(name, key, rule)
+        return event_ids
+
+    def check_integrity(self) -> List[str]:
+        """Return a line for every missing client, guest or supplier that events still refer to.
+
+        Only the IDs in the event index's reverse references are looked up, so the check is
+        linear in the number of distinct references rather than a scan of every event.
+        """
+        start = METRICS.start()
+        problems = []
+        for name in EVENT_REFERENCES:
+            collection = getattr(self, name)
+            for key in self.event_index.referenced_ids(name):
+                if key not in collection:
+                    problems.append(f"{name} {key} is missing but used by "
+                                    f"{event_list(self.event_index.referencing(name, key))}")
+        METRICS.stop('check_integrity', start)
+        return problems
+
+    def apply_remote_changes(self) -> int:
+        """Notify the observers of changes other users made through a shared store.
+
+        Returns the number of changes applied; stores that are not shared have none.
+        """
+        changes = getattr(self.store, 'changes', None)
+        applied = 0
+        while changes is not None and not changes.empty():
+            event, name, key, value, old_value = changes.get_nowait()
+            for observer in self.observers:
+                if event == 'set':
+                    notify_set(observer, name, key, value, old_value)
+                elif old_value is not None:
+                    observer.on_delete(name, key, old_value)
+            applied += 1
+        return applied
+
+    def save(self) -> int:
+        """Persist pending changes, on the writer thread when there is one.
+
+        Returns the bytes written by a synchronous save and 0 when the save was queued.
+        """
+        if self.writer is not None:
+            self.writer.request_flush()
+            return 0
+        return timed_save(self.store)
+
+    def row_source(self, name: str) -> Any:
+        """Return the shared, observer-maintained row source of a collection."""
+        source = self.row_sources.get(name)
+        if source is None:
+            source = self.row_sources[name] = self.store.row_source(name)
+            self.observers.append(source)
+        return source
+
+    def find_events(self, from_date: str = "", to_date: str = "", client_id: str = "", venue_address: str = "",
+                    guest_id: str = "", supplier_id: str = "") -> Optional[List[str]]:
+        """Return the events matching every given criterion, or None when none was given."""
+        from indexes import intersect
+        index = self.event_index
+        results = []
+        if from_date or to_date:
+            results.append(index.between(from_date or EARLIEST_DATE, to_date or LATEST_DATE))
+        if client_id:
+            results.append(index.for_client(client_id))
+        if venue_address:
+            results.append(index.at_venue(venue_address))
+        if guest_id:
+            results.append(index.for_guest(guest_id))
+        if supplier_id:
+            results.append(index.for_supplier(supplier_id))
+        if not results:
+            return None
+        return intersect(results)
+
+    def import_file(self, path: str, name: str, batch_size: int = 1000,
+                    on_batch: Optional[Callable[[Any], None]] = None) -> Any:
+        """Import a CSV or JSON Lines file into a collection and return the finished BulkImport."""
+        from bulk import BulkImport
+        job = BulkImport(path, name, getattr(self, name), lambda *record: self.put(*record, flush=False), self.save,
+                         batch_size)
+        while not job.done:
+            job.step()
+            if on_batch is not None:
+                on_batch(job)
+        return job
+
+    def export_file(self, path: str, name: str, on_progress: Optional[Callable[[int], bool]] = None) -> int:
+        """Export a collection to a CSV or JSON Lines file and return the number of records written."""
+        from bulk import export_records
+        return export_records(path, name, self.store.iter_records(name), on_progress)
+
+    def generate_invoices(self, from_date: str, to_date: str, directory: str, workers: Optional[int] = None,
+                          chunk_size: int = 50, on_chunk: Optional[Callable[[Any], None]] = None,
+                          record_totals: bool = False) -> Any:
+        """Write the invoices of the events in a date range and return the finished InvoiceRun.
+
+        The totals are kept in the directory's manifest; with ``record_totals`` each invoice
+        number and total is also appended to its event's ``invoice`` notes. Events a previous
+        run already invoiced into the same directory are skipped.
+        """
+        from invoicing import InvoiceRun
+        event_ids = self.find_events(from_date, to_date) or []
+        put = (lambda *record: self.put(*record, flush=False)) if record_totals else None
+        job = InvoiceRun(event_ids, directory, self.store.get_record, put, self.save if record_totals else None,
+                         workers, chunk_size)
+        try:
+            while not job.done:
+                if job.step() and on_chunk is not None:
+                    on_chunk(job)
+        finally:
+            job.close()
+        return job
+
+    def close(self) -> List[Tuple[int, Optional[BaseException]]]:
+        """Finish pending saves, close the store and return the writer's last results."""
+        results = self.writer.close() if self.writer is not None else []
+        self.store.close()
+        METRICS.gauge_sources.remove(self.collection_sizes)
+        return results
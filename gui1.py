@@ -1,156 +1,50 @@
 from datetime import datetime
-from typing import List, Any
-import tkinter as tk
-from tkinter import messagebox
-import pickle
-
-class Employee:
-    """Represents an employee with various personal and professional details."""
-
-    def __init__(self, name: str, employeeID: str, department: str, jobTitle: str, basicSalary: float, age: int,
-                 dateOfBirth: str, passportDetails: str):
-        """Initialize an employee with provided attributes."""
-        self.name = name
-        self.employeeID = employeeID
-        self.department = department
-        self.jobTitle = jobTitle
-        self.basicSalary = basicSalary
-        self.age = age
-        self.dateOfBirth = datetime.strptime(dateOfBirth, '%Y-%m-%d')
-        self.passportDetails = passportDetails
-
-    def manage_employee(self) -> str:
-        """Simulate managing subordinate employees."""
-        return f"Managing Employees under {self.name}"
-
-
-class Client:
-    """Represents a client who organizes events."""
-
-    def __init__(self, clientID: str, name: str, address: str, contactDetails: str, budget: float):
-        """Initialize a client with specified details."""
-        self.clientID = clientID
-        self.name = name
-        self.address = address
-        self.contactDetails = contactDetails
-        self.budget = budget
-
-    def update_client_info(self) -> str:
-        """Update information for the client."""
-        return f"Updated client info for {self.name}"
-
-
-class Guest:
-    """Represents a guest attending an event."""
-
-    def __init__(self, guestID: str, name: str, address: str, contactDetails: str):
-        """Initialize a guest with specified details."""
-        self.guestID = guestID
-        self.name = name
-        self.address = address
-        self.contactDetails = contactDetails
-
-    def update_guest_info(self) -> str:
-        """Update information for the guest."""
-        return f"Updated guest info for {self.name}"
-
-
-class Event:
-    """Represents an event managed by the company."""
-
-    def __init__(self, eventID: str, type: str, theme: str, date: str, time: str, duration: float, venueAddress: str,
-                 client: Client, guests: List[Guest], suppliers: List[Any], invoice: str):
-        """Initialize an event with all necessary details and associations."""
-        self.eventID = eventID
-        self.type = type
-        self.theme = theme
-        self.date = datetime.strptime(date, '%Y-%m-%d')
-        self.time = time
-        self.duration = duration
-        self.venueAddress = venueAddress
-        self.client = client
-        self.guests = guests
-        self.suppliers = suppliers
-        self.invoice = invoice
-
-    def schedule_event(self) -> str:
-        """Schedule the event according to given details."""
-        return f"Event {self.type} scheduled on {self.date}"
-
-    def update_event_details(self) -> str:
-        """Update the details of the event."""
-        return f"Updated event details for {self.eventID}"
-
-
-class Supplier:
-    """Abstract base class for suppliers providing various services for events."""
-
-    def __init__(self, supplierID: str, name: str, address: str, contactDetails: str):
-        """Initialize a supplier with common details."""
-        self.supplierID = supplierID
-        self.name = name
-        self.address = address
-        self.contactDetails = contactDetails
-
-    def update_supplier_info(self) -> str:
-        """Update information for the supplier."""
-        return f"Updated supplier info for {self.name}"
-
-
-class Venue:
-    """Represents a venue where events are held."""
-
-    def __init__(self, venueID: str, name: str, address: str, contact: str, minGuests: int, maxGuests: int):
-        """Initialize a venue with capacity details and location."""
-        self.venueID = venueID
-        self.name = name
-        self.address = address
-        self.contact = contact
-        self.minGuests = minGuests
-        self.maxGuests = maxGuests
-
-    def update_venue_info(self) -> str:
-        """Update details about the venue."""
-        return f"Venue updated: {self.name}"
-
-
-# Derived Supplier classes
-class Caterer(Supplier):
-    """Specific supplier type for catering services at events."""
+import os
+import queue
+import threading
+
+from bulk import FIELDS, BulkImport, export_records
+from core import LAZY_INDEXES, DataService, TransactionError
+from invoicing import InvoiceRun
+from metrics import METRICS
+from models import KEY_FIELDS, LIST_SEPARATOR, SUPPLIER_KINDS, Caterer, Event, Supplier, field_label, record_from_dict
+from scheduling import event_window
+from storage import COLLECTIONS, ConflictError
+
+# Extra label text for form fields that need a particular format
+FIELD_HINTS = {
+    'dateOfBirth': "YYYY-MM-DD",
+    'date': "YYYY-MM-DD",
+    'duration': "hours",
+    'guests': f"separated by {LIST_SEPARATOR}",
+    'suppliers': f"separated by {LIST_SEPARATOR}",
+}
+# Supplier form fields that only apply to caterers
+CATERER_FIELDS = set(Caterer.fields()) - set(Supplier.fields())
 
-    def __init__(self, supplierID: str, name: str, address: str, contactDetails: str, menu: str, minGuests: int,
-                 maxGuests: int):
-        """Initialize a caterer with menu and guest capacity details."""
-        super().__init__(supplierID, name, address, contactDetails)
-        self.menu = menu
-        self.minGuests = minGuests
-        self.maxGuests = maxGuests
-
-
-class Decorator(Supplier):
-    """Specific supplier type for decoration services at events."""
-    # Additional attributes or methods specific to decorators can be added here.
-
-class Cleaner(Supplier):
-    """Specific supplier type for cleaning services at events."""
-    # Additional attributes or methods specific to cleaners can be added here.
 
-class Entertainer(Supplier):
-    """Specific supplier type for entertainment services at events."""
-    # Additional attributes or methods specific to entertainers can be added here.
+def merge_codes():
+    # Tk is only imported when the window is opened, so the rest of the app runs headless
+    import tkinter as tk
+    from tkinter import filedialog, messagebox, ttk
 
-class FurnitureSupplier(Supplier):
-    """Specific supplier type for supplying furniture at events."""
-    # Additional attributes or methods specific to furniture suppliers can be added here.
+    from widgets import VirtualTable
 
-def merge_codes():
     class EventManagementApp:
-        def __init__(self, root):
+        def __init__(self, root, preload=True):
             self.root = root
             self.root.title("Event Management System")
 
-            # Load existing data from binary files
-            self.load_data()
+            # Collections and indexes live in the data service and are loaded on first access
+            self.service = DataService()
+            self.store = self.service.store
+            self.observers = self.service.observers
+            if preload:
+                self.root.after_idle(self.load_data)
+
+            # Saves run on the service's writer thread; results are picked up from the Tk loop
+            self.root.after(200, self.poll_writer)
+            self.root.protocol("WM_DELETE_WINDOW", self.on_close)
 
             # Create buttons to perform actions
             self.employee_button = tk.Button(root, text="Manage Employees", command=self.manage_employees)
@@ -171,102 +65,632 @@ def merge_codes():
             self.venue_button = tk.Button(root, text="Manage Venues", command=self.manage_venues)
             self.venue_button.pack()
 
+            self.transfer_button = tk.Button(root, text="Import / Export", command=self.manage_transfers)
+            self.transfer_button.pack()
+
+            self.performance_button = tk.Button(root, text="Performance", command=self.show_performance)
+            self.performance_button.pack()
+
+            self.reports_button = tk.Button(root, text="Reports", command=self.show_reports)
+            self.reports_button.pack()
+
+            self.invoice_button = tk.Button(root, text="Invoices", command=self.manage_invoices)
+            self.invoice_button.pack()
+
+            self.backup_button = tk.Button(root, text="Backups", command=self.manage_backups)
+            self.backup_button.pack()
+
+            # Name search across employees, clients, guests, suppliers and venues
+            tk.Label(root, text="Search by name:").pack()
+            self.search_entry = tk.Entry(root)
+            self.search_entry.pack(fill="x")
+            self.search_entry.bind("<KeyRelease>", self.schedule_search)
+            self.search_results = tk.Listbox(root, height=8)
+            self.search_results.pack(fill="both", expand=True)
+            self.search_results.bind("<Double-1>", self.open_search_result)
+            self.search_refs = []
+            self.pending_search = None
+
+            self.status_label = tk.Label(root, text="", anchor="w")
+            self.status_label.pack(fill="x")
+
+        def __getattr__(self, name):
+            if name not in COLLECTIONS and name not in LAZY_INDEXES:
+                raise AttributeError(name)
+            # Building the name search and the schedule can take a moment on large collections
+            building = name in ('search_index', 'schedule', 'reports') and not self.service.is_built(name)
+            if building:
+                self.status_label.config(text=f"Building {name.replace('_', ' ')}...")
+                self.root.update_idletasks()
+            value = getattr(self.service, name)
+            if building:
+                self.status_label.config(text=f"{name.replace('_', ' ').capitalize()} ready")
+            setattr(self, name, value)
+            return value
+
         def load_data(self):
-            try:
-                with open('employees.pkl', 'rb') as f:
-                    self.employees = pickle.load(f)
-            except FileNotFoundError:
-                self.employees = {}
+            # Warm up the collections in the background once the window is showing
+            self.store.preload()
 
+        def save_data(self):
+            self.service.save()
+
+        def report_saves(self, results):
+            for written, error in results:
+                if error is not None:
+                    messagebox.showerror("Error", f"Saving data failed: {error}")
+                else:
+                    self.status_label.config(text=f"Saved ({written} bytes written)")
+
+        def poll_writer(self):
+            self.report_saves(self.service.writer.poll())
+            if self.service.apply_remote_changes():
+                self.status_label.config(text="Updated with changes from other users")
+            self.root.after(200, self.poll_writer)
+
+        def on_close(self):
+            self.status_label.config(text="Saving...")
+            self.root.update_idletasks()
+            self.report_saves(self.service.close())
+            self.root.destroy()
+
+        def _put(self, name, key, value, flush=True):
+            # Another user may have changed the record on a shared data server
             try:
-                with open('events.pkl', 'rb') as f:
-                    self.events = pickle.load(f)
-            except FileNotFoundError:
-                self.events = {}
+                self.service.put(name, key, value, flush)
+            except ConflictError as exc:
+                messagebox.showerror("Conflict", str(exc))
+                return False
+            return True
 
+        def _remove(self, name, key):
             try:
-                with open('clients.pkl', 'rb') as f:
-                    self.clients = pickle.load(f)
-            except FileNotFoundError:
-                self.clients = {}
-
+                self.service.remove(name, key)
+            except ConflictError as exc:
+                messagebox.showerror("Conflict", str(exc))
+                return False
+            return True
+
+        def _commit(self, transaction):
+            # Every change of the transaction is made with one save, or none is and one message says why
             try:
-                with open('guests.pkl', 'rb') as f:
-                    self.guests = pickle.load(f)
-            except FileNotFoundError:
-                self.guests = {}
-
+                return transaction.commit()
+            except TransactionError as exc:
+                messagebox.showerror("Error", "Nothing was changed:\n" + "\n".join(exc.problems[:10]))
+            except ConflictError as exc:
+                messagebox.showerror("Conflict", f"Nothing was changed: {exc}")
+            return None
+
+        def _delete_referenced(self, name, key, label):
+            # Events using the record follow the collection's delete rule; a restricted delete may cascade if confirmed
+            if key not in getattr(self, name):
+                messagebox.showerror("Error", f"{label} not found.")
+                return
+            rule = self.service.delete_rules[name]
+            event_ids = self.service.referencing_events(name, key)
+            if event_ids and rule == 'restrict':
+                if not messagebox.askyesno(f"Delete {label}",
+                                           f"{label} {key} is used by {len(event_ids)} event(s). "
+                                           f"Delete the {label.lower()} and all of those events?"):
+                    return
+                rule = 'cascade'
+            transaction = self.service.transaction()
+            event_ids = transaction.delete(name, key, rule)
+            if self._commit(transaction) is None:
+                return
+            if not event_ids:
+                messagebox.showinfo("Success", f"{label} deleted successfully.")
+            elif rule == 'cascade':
+                messagebox.showinfo("Success", f"{label} deleted successfully, with {len(event_ids)} event(s).")
+            else:
+                messagebox.showinfo("Success", f"{label} deleted successfully and removed from "
+                                               f"{len(event_ids)} event(s).")
+
+        def browse(self, name, title, display):
+            # Row sources are kept so their sort orders survive between windows
+            source = self.service.row_source(name)
+            browse_window = tk.Toplevel(self.root)
+            browse_window.title(title)
+            table = VirtualTable(browse_window, source, name, on_open=display)
+            table.pack(fill="both", expand=True)
+            self.observers.append(table)
+            table.bind("<Destroy>", lambda event: self._forget_table(event, table))
+
+        def _forget_table(self, event, table):
+            if event.widget is table and table in self.observers:
+                self.observers.remove(table)
+
+        def show_performance(self):
+            performance_window = tk.Toplevel(self.root)
+            performance_window.title("Performance")
+
+            enabled = tk.BooleanVar(value=METRICS.enabled)
+            toggle = tk.Checkbutton(performance_window, text="Profiling enabled", variable=enabled,
+                                    command=lambda: setattr(METRICS, 'enabled', enabled.get()))
+            toggle.grid(row=0, column=0, sticky="w")
+
+            columns = ("Operation", "Calls", "p50 (ms)", "p90 (ms)", "p99 (ms)", "Max (ms)")
+            table = ttk.Treeview(performance_window, columns=columns, show="headings", height=15)
+            for column in columns:
+                table.heading(column, text=column)
+                table.column(column, width=150 if column == "Operation" else 80, anchor="w" if column == "Operation" else "e")
+            table.grid(row=1, column=0, columnspan=3, sticky="nsew")
+
+            totals = tk.Label(performance_window, anchor="w", justify="left")
+            totals.grid(row=2, column=0, columnspan=3, sticky="we")
+
+            json_button = tk.Button(performance_window, text="Export JSON",
+                                    command=lambda: self.export_metrics(".json", METRICS.export_json))
+            json_button.grid(row=3, column=0)
+
+            prometheus_button = tk.Button(performance_window, text="Export Prometheus",
+                                          command=lambda: self.export_metrics(".prom", METRICS.export_prometheus))
+            prometheus_button.grid(row=3, column=1)
+
+            reset_button = tk.Button(performance_window, text="Reset", command=METRICS.reset)
+            reset_button.grid(row=3, column=2)
+
+            performance_window.grid_rowconfigure(1, weight=1)
+            performance_window.grid_columnconfigure(0, weight=1)
+            self.refresh_performance(performance_window, table, totals)
+
+        def refresh_performance(self, window, table, totals):
+            # Redraws once a second for as long as the window is open
+            if not window.winfo_exists():
+                return
+            snapshot = METRICS.snapshot()
+            table.delete(*table.get_children())
+            for operation, stats in snapshot['operations'].items():
+                table.insert("", "end", values=(operation, stats['count'],
+                                                *(f"{stats[key] * 1000:.2f}" for key in ('p50', 'p90', 'p99', 'max'))))
+            counters = snapshot['counters']
+            sizes = ", ".join(f"{name} {count}" for name, count in snapshot['gauges'].items()) or "none loaded"
+            totals.config(text=f"Bytes read: {int(counters.get('bytes_read', 0))}    "
+                               f"Bytes written: {int(counters.get('bytes_written', 0))}\n"
+                               f"Records: {sizes}")
+            self.root.after(1000, self.refresh_performance, window, table, totals)
+
+        def export_metrics(self, extension, export):
+            path = filedialog.asksaveasfilename(defaultextension=extension)
+            if not path:
+                return
             try:
-                with open('suppliers.pkl', 'rb') as f:
-                    self.suppliers = pickle.load(f)
-            except FileNotFoundError:
-                self.suppliers = {}
-
+                export(path)
+            except OSError as exc:
+                messagebox.showerror("Error", f"Cannot export metrics: {exc}")
+
+        def show_reports(self):
+            from reports import REPORTS
+            reports_window = tk.Toplevel(self.root)
+            reports_window.title("Reports")
+
+            titles = {title: report for report, (title, _, _) in REPORTS.items()}
+            tk.Label(reports_window, text="Report:").grid(row=0, column=0)
+            report_choice = ttk.Combobox(reports_window, values=list(titles), state="readonly", width=40)
+            report_choice.set(next(iter(titles)))
+            report_choice.grid(row=0, column=1, sticky="w")
+
+            table = ttk.Treeview(reports_window, show="headings", height=20)
+            table.grid(row=1, column=0, columnspan=3, sticky="nsew")
+            scrollbar = ttk.Scrollbar(reports_window, orient="vertical", command=table.yview)
+            scrollbar.grid(row=1, column=3, sticky="ns")
+            table.configure(yscrollcommand=scrollbar.set)
+
+            status = tk.Label(reports_window, text="", anchor="w")
+            status.grid(row=2, column=0, columnspan=3, sticky="we")
+
+            show = lambda *_: self.run_report(titles[report_choice.get()], table, status)
+            report_choice.bind("<<ComboboxSelected>>", show)
+            refresh_button = tk.Button(reports_window, text="Refresh", command=show)
+            refresh_button.grid(row=0, column=2)
+
+            reports_window.grid_rowconfigure(1, weight=1)
+            reports_window.grid_columnconfigure(1, weight=1)
+            show()
+
+        def run_report(self, report, table, status):
+            # Results are cached by the reports view until the data they read changes
+            started = datetime.now()
+            columns, rows = self.reports.run(report)
+            elapsed = (datetime.now() - started).total_seconds() * 1000
+            table.delete(*table.get_children())
+            table.configure(columns=columns)
+            numeric = [isinstance(value, (int, float)) for value in rows[0]] if rows else [False] * len(columns)
+            for column, is_number in zip(columns, numeric):
+                table.heading(column, text=column)
+                table.column(column, width=110 if is_number else 160, anchor="e" if is_number else "w")
+            for row in rows:
+                table.insert("", "end", values=row)
+            status.config(text=f"{len(rows)} rows in {elapsed:.1f} ms")
+
+        def manage_invoices(self):
+            invoice_window = tk.Toplevel(self.root)
+            invoice_window.title("Invoices")
+
+            tk.Label(invoice_window, text="From Date (YYYY-MM-DD):").grid(row=0, column=0)
+            from_entry = tk.Entry(invoice_window)
+            from_entry.grid(row=0, column=1)
+
+            tk.Label(invoice_window, text="To Date (YYYY-MM-DD):").grid(row=1, column=0)
+            to_entry = tk.Entry(invoice_window)
+            to_entry.grid(row=1, column=1)
+
+            tk.Label(invoice_window, text="Worker Processes:").grid(row=2, column=0)
+            workers_entry = tk.Entry(invoice_window)
+            workers_entry.insert(0, str(os.cpu_count() or 1))
+            workers_entry.grid(row=2, column=1)
+
+            record_totals = tk.BooleanVar(value=False)
+            tk.Checkbutton(invoice_window, text="Add totals to the events' invoice notes",
+                           variable=record_totals).grid(row=3, column=0, columnspan=2, sticky="w")
+
+            progress = ttk.Progressbar(invoice_window, length=300, maximum=1.0)
+            progress.grid(row=4, column=0, columnspan=3)
+            status = tk.Label(invoice_window, text="", anchor="w")
+            status.grid(row=5, column=0, columnspan=3, sticky="we")
+            cancelled = threading.Event()
+
+            start_button = tk.Button(invoice_window, text="Generate Invoices...",
+                                     command=lambda: self.start_invoices(from_entry.get(), to_entry.get(),
+                                                                         workers_entry.get(), record_totals.get(),
+                                                                         progress, status, cancelled))
+            start_button.grid(row=6, column=0)
+
+            cancel_button = tk.Button(invoice_window, text="Cancel", command=cancelled.set)
+            cancel_button.grid(row=6, column=1)
+
+        def start_invoices(self, from_date, to_date, workers, record_totals, progress, status, cancelled):
+            if not from_date or not to_date or not self._valid_date(from_date) or not self._valid_date(to_date):
+                messagebox.showerror("Error", "Enter both dates in YYYY-MM-DD format.")
+                return
             try:
-                with open('venues.pkl', 'rb') as f:
-                    self.venues = pickle.load(f)
-            except FileNotFoundError:
-                self.venues = {}
-
-        def save_data(self):
-            with open('employees.pkl', 'wb') as f:
-                pickle.dump(self.employees, f)
-
-            with open('events.pkl', 'wb') as f:
-                pickle.dump(self.events, f)
-
-            with open('clients.pkl', 'wb') as f:
-                pickle.dump(self.clients, f)
-
-            with open('guests.pkl', 'wb') as f:
-                pickle.dump(self.guests, f)
-
-            with open('suppliers.pkl', 'wb') as f:
-                pickle.dump(self.suppliers, f)
-
-            with open('venues.pkl', 'wb') as f:
-                pickle.dump(self.venues, f)
+                workers = int(workers)
+            except ValueError:
+                messagebox.showerror("Error", "Worker processes must be a whole number.")
+                return
+            # Choosing a directory that already holds part of a run carries on where it stopped
+            directory = filedialog.askdirectory(title="Folder for the invoice files")
+            if not directory:
+                return
+            try:
+                put = (lambda *record: self._put(*record, flush=False)) if record_totals else None
+                job = InvoiceRun(self.service.find_events(from_date, to_date), directory, self.store.get_record,
+                                 put, self.save_data if record_totals else None, max(workers, 1))
+            except OSError as exc:
+                messagebox.showerror("Error", f"Cannot write invoices: {exc}")
+                return
+            cancelled.clear()
+            self.root.after_idle(self.poll_invoices, job, progress, status, cancelled)
+
+        def poll_invoices(self, job, progress, status, cancelled):
+            # Workers render in their own processes; only finished chunks are collected here, and
+            # a cancelled run keeps being polled until the chunks already running drain
+            if cancelled.is_set():
+                job.cancel()
+            job.step(timeout=0)
+            progress["value"] = job.progress()
+            status.config(text=f"{job.skipped + job.written} of {job.total} invoiced")
+            if not job.done:
+                self.root.after(100, self.poll_invoices, job, progress, status, cancelled)
+                return
+            summary = (f"{job.written} invoices written totalling {job.invoiced:,.2f}, "
+                       f"{job.skipped} already invoiced.")
+            if cancelled.is_set():
+                summary = "Invoicing cancelled; run it again on the same folder to finish. " + summary
+            if job.errors:
+                summary += "\n\n" + "\n".join(job.errors[:10])
+            messagebox.showinfo("Invoices Finished", summary)
+
+        def manage_backups(self):
+            from backup import list_snapshots
+            backup_window = tk.Toplevel(self.root)
+            backup_window.title("Backups")
+
+            columns = ("Snapshot", "Created", "Records", "Bytes Written")
+            table = ttk.Treeview(backup_window, columns=columns, show="headings", height=12)
+            for column in columns:
+                table.heading(column, text=column)
+                table.column(column, width=170 if column in ("Snapshot", "Created") else 100,
+                             anchor="w" if column in ("Snapshot", "Created") else "e")
+            table.grid(row=0, column=0, columnspan=2, sticky="nsew")
+            status = tk.Label(backup_window, text="", anchor="w")
+            status.grid(row=2, column=0, columnspan=2, sticky="we")
+
+            def refresh():
+                table.delete(*table.get_children())
+                for manifest in reversed(list_snapshots(self.backups.repository)):
+                    records = sum(entry['count'] for entry in manifest['collections'].values())
+                    table.insert("", "end", iid=manifest['id'],
+                                 values=(manifest['id'], manifest['created'], records, manifest['bytes_written']))
+
+            backup_button = tk.Button(backup_window, text="Back Up Now",
+                                      command=lambda: self.start_backup(status, refresh))
+            backup_button.grid(row=1, column=0)
+            restore_button = tk.Button(backup_window, text="Restore Selected",
+                                       command=lambda: self.restore_backup(table.selection(), status))
+            restore_button.grid(row=1, column=1)
+
+            backup_window.grid_rowconfigure(0, weight=1)
+            backup_window.grid_columnconfigure(0, weight=1)
+            refresh()
+
+        def start_backup(self, status, refresh):
+            # The snapshot is taken here in an instant; chunks are written on a thread while editing goes on
+            try:
+                snapshot = self.backups.start()
+            except (RuntimeError, ValueError) as exc:
+                messagebox.showerror("Error", str(exc))
+                return
+            results = queue.Queue()
+
+            def run():
+                try:
+                    results.put(("done", self.backups.write(snapshot)))
+                except (OSError, ValueError) as exc:
+                    results.put(("error", exc))
+
+            status.config(text="Backing up...")
+            threading.Thread(target=run, name="backup", daemon=True).start()
+            self.root.after(100, self.poll_backup, results, status, refresh)
+
+        def poll_backup(self, results, status, refresh):
+            try:
+                kind, value = results.get_nowait()
+            except queue.Empty:
+                self.root.after(100, self.poll_backup, results, status, refresh)
+                return
+            if kind == "error":
+                status.config(text="")
+                messagebox.showerror("Error", f"Backup failed: {value}")
+                return
+            status.config(text=f"Snapshot {value['id']}: {value['chunks_encoded']} chunks checked, "
+                               f"{value['bytes_written']} bytes written")
+            refresh()
+
+        def restore_backup(self, selection, status):
+            if not selection:
+                messagebox.showerror("Error", "Select a snapshot to restore.")
+                return
+            snapshot_id = selection[0]
+            if not messagebox.askyesno("Restore Backup", f"Replace the current data with snapshot {snapshot_id}? "
+                                                         f"Changes made since then will be lost."):
+                return
+            try:
+                changed = self.backups.restore(snapshot_id)
+            except (KeyError, OSError, RuntimeError, ValueError) as exc:
+                messagebox.showerror("Error", f"Restore failed: {exc}")
+                return
+            except ConflictError as exc:
+                messagebox.showerror("Conflict", f"Nothing was changed: {exc}")
+                return
+            status.config(text=f"Restored snapshot {snapshot_id}")
+            messagebox.showinfo("Restore Finished", f"Snapshot {snapshot_id} restored: {changed} records changed.")
+
+        def manage_transfers(self):
+            transfer_window = tk.Toplevel(self.root)
+            transfer_window.title("Import / Export")
+
+            tk.Label(transfer_window, text="Collection:").grid(row=0, column=0)
+            collection_choice = ttk.Combobox(transfer_window, values=COLLECTIONS, state="readonly")
+            collection_choice.set("guests")
+            collection_choice.grid(row=0, column=1)
+
+            tk.Label(transfer_window, text="Batch Size:").grid(row=1, column=0)
+            batch_entry = tk.Entry(transfer_window)
+            batch_entry.insert(0, "1000")
+            batch_entry.grid(row=1, column=1)
+
+            progress = ttk.Progressbar(transfer_window, length=300, maximum=1.0)
+            progress.grid(row=2, column=0, columnspan=3)
+            status = tk.Label(transfer_window, text="", anchor="w")
+            status.grid(row=3, column=0, columnspan=3, sticky="we")
+            cancelled = threading.Event()
+
+            import_button = tk.Button(transfer_window, text="Import File...",
+                                      command=lambda: self.start_import(collection_choice.get(), batch_entry.get(),
+                                                                        progress, status, cancelled))
+            import_button.grid(row=4, column=0)
+
+            export_button = tk.Button(transfer_window, text="Export File...",
+                                      command=lambda: self.start_export(collection_choice.get(), progress, status,
+                                                                        cancelled))
+            export_button.grid(row=4, column=1)
+
+            cancel_button = tk.Button(transfer_window, text="Cancel", command=cancelled.set)
+            cancel_button.grid(row=4, column=2)
+
+        def start_import(self, name, batch_size, progress, status, cancelled):
+            try:
+                batch_size = int(batch_size)
+            except ValueError:
+                messagebox.showerror("Error", "Batch size must be a whole number.")
+                return
+            path = filedialog.askopenfilename(filetypes=[("CSV or JSON Lines", "*.csv *.jsonl *.ndjson *.json")])
+            if not path:
+                return
+            try:
+                job = BulkImport(path, name, getattr(self, name), lambda *record: self._put(*record, flush=False),
+                                 self.save_data, max(batch_size, 1))
+            except (OSError, ValueError) as exc:
+                messagebox.showerror("Error", f"Cannot import file: {exc}")
+                return
+            cancelled.clear()
+            self.root.after_idle(self.import_batch, job, progress, status, cancelled)
+
+        def import_batch(self, job, progress, status, cancelled):
+            # One batch per turn of the event loop keeps the window responsive
+            if cancelled.is_set():
+                job.close()
+            else:
+                try:
+                    job.step()
+                except (OSError, UnicodeDecodeError) as exc:
+                    job.close()
+                    job.errors.append(f"Import stopped: {exc}")
+            progress["value"] = job.progress()
+            status.config(text=f"{job.imported} imported, {job.error_count} rejected")
+            if not job.done:
+                self.root.after(1, self.import_batch, job, progress, status, cancelled)
+                return
+            summary = f"{job.imported} {job.name} imported, {job.error_count} rows rejected."
+            if cancelled.is_set():
+                summary = "Import cancelled. " + summary
+            if job.errors:
+                summary += "\n\n" + "\n".join(job.errors[:10])
+            messagebox.showinfo("Import Finished", summary)
+
+        def start_export(self, name, progress, status, cancelled):
+            path = filedialog.asksaveasfilename(defaultextension=".csv",
+                                                filetypes=[("CSV", "*.csv"), ("JSON Lines", "*.jsonl")])
+            if not path:
+                return
+            total = len(getattr(self, name)) or 1
+            results = queue.Queue()
+            cancelled.clear()
+
+            def report(count):
+                results.put(("progress", count))
+                return not cancelled.is_set()
+
+            def run():
+                try:
+                    results.put(("done", export_records(path, name, self.store.iter_records(name), report)))
+                except (OSError, ValueError) as exc:
+                    results.put(("error", exc))
+
+            threading.Thread(target=run, name="export", daemon=True).start()
+            self.root.after(100, self.poll_export, results, total, progress, status, cancelled)
+
+        def poll_export(self, results, total, progress, status, cancelled):
+            while True:
+                try:
+                    kind, value = results.get_nowait()
+                except queue.Empty:
+                    self.root.after(100, self.poll_export, results, total, progress, status, cancelled)
+                    return
+                if kind == "progress":
+                    progress["value"] = min(value / total, 1.0)
+                    status.config(text=f"{value} exported")
+                elif kind == "error":
+                    messagebox.showerror("Error", f"Export failed: {value}")
+                    return
+                else:
+                    progress["value"] = 1.0
+                    status.config(text=f"{value} exported")
+                    state = "cancelled" if cancelled.is_set() else "finished"
+                    messagebox.showinfo("Export Finished", f"Export {state}: {value} records written.")
+                    return
+
+        def schedule_search(self, event=None):
+            # Debounce keystrokes so fast typing runs a single search
+            if self.pending_search is not None:
+                self.root.after_cancel(self.pending_search)
+            self.pending_search = self.root.after(150, self.run_search)
+
+        def run_search(self):
+            self.pending_search = None
+            query = self.search_entry.get().strip()
+            self.search_results.delete(0, tk.END)
+            self.search_refs = self.search_index.search(query) if query else []
+            for name, key in self.search_refs:
+                label = name[:-1].capitalize()
+                self.search_results.insert(tk.END, f"{label} {key}: {self.search_index.name_of(name, key).title()}")
+
+        def open_search_result(self, event=None):
+            selection = self.search_results.curselection()
+            if selection:
+                name, key = self.search_refs[selection[0]]
+                display = {
+                    'employees': self.display_employee,
+                    'clients': self.display_client,
+                    'guests': self.display_guest,
+                    'suppliers': self.display_supplier,
+                    'venues': self.display_venue,
+                }[name]
+                display(key)
+
+        def _record_form(self, window, name):
+            # One labelled entry per field, ID first; suppliers pick their kind from a list
+            entries = {}
+            for row, field in enumerate(FIELDS[name]):
+                label = field_label(field)
+                if name == 'suppliers' and field in CATERER_FIELDS:
+                    label += " (caterers)"
+                elif field in FIELD_HINTS:
+                    label += f" ({FIELD_HINTS[field]})"
+                tk.Label(window, text=f"{label}:").grid(row=row, column=0)
+                if field == 'kind':
+                    entry = ttk.Combobox(window, values=list(SUPPLIER_KINDS), state="readonly")
+                    entry.set("Supplier")
+                else:
+                    entry = tk.Entry(window)
+                entry.grid(row=row, column=1)
+                entries[field] = entry
+            return entries
+
+        def _submit(self, name, entries, add):
+            values = {field: entry.get().strip() for field, entry in entries.items()}
+            key_field = KEY_FIELDS[name]
+            if not values[key_field]:
+                messagebox.showerror("Error", f"{field_label(key_field)} is required.")
+                return
+            try:
+                record = record_from_dict(name, values)
+            except ValueError as exc:
+                messagebox.showerror("Error", f"Invalid details: {exc}")
+                return
+            add(record)
+
+        @staticmethod
+        def _describe(name, record):
+            values = record.to_dict()
+            key_field = KEY_FIELDS[name]
+            lines = [f"{field_label(key_field)}: {values.pop(key_field)}"]
+            for field, value in values.items():
+                if isinstance(value, list):
+                    value = ", ".join(value)
+                lines.append(f"{field_label(field)}: {value}")
+            return "\n".join(lines)
 
         def manage_employees(self):
             employee_window = tk.Toplevel(self.root)
             employee_window.title("Manage Employees")
 
-            tk.Label(employee_window, text="Employee ID:").grid(row=0, column=0)
-            employee_id_entry = tk.Entry(employee_window)
-            employee_id_entry.grid(row=0, column=1)
-
-            tk.Label(employee_window, text="Name:").grid(row=1, column=0)
-            name_entry = tk.Entry(employee_window)
-            name_entry.grid(row=1, column=1)
+            entries = self._record_form(employee_window, 'employees')
+            employee_id_entry = entries['employeeID']
+            row = len(entries)
 
-            add_button = tk.Button(employee_window, text="Add Employee", command=lambda: self.add_employee(employee_id_entry.get(), name_entry.get()))
-            add_button.grid(row=2, column=0)
+            add_button = tk.Button(employee_window, text="Add Employee", command=lambda: self._submit('employees', entries, self.add_employee))
+            add_button.grid(row=row, column=0)
 
             delete_button = tk.Button(employee_window, text="Delete Employee", command=lambda: self.delete_employee(employee_id_entry.get()))
-            delete_button.grid(row=2, column=1)
+            delete_button.grid(row=row, column=1)
 
             display_button = tk.Button(employee_window, text="Display Employee", command=lambda: self.display_employee(employee_id_entry.get()))
-            display_button.grid(row=2, column=2)
+            display_button.grid(row=row, column=2)
 
-        def add_employee(self, emp_id, name):
-            if emp_id in self.employees:
+            browse_button = tk.Button(employee_window, text="Browse Employees",
+                                      command=lambda: self.browse('employees', "Employees", self.display_employee))
+            browse_button.grid(row=row, column=3)
+
+        def add_employee(self, employee):
+            if employee.employeeID in self.employees:
                 messagebox.showerror("Error", "Employee with ID already exists.")
             else:
-                self.employees[emp_id] = name
-                self.save_data()
-                messagebox.showinfo("Success", "Employee added successfully.")
+                if self._put('employees', employee.employeeID, employee):
+                    messagebox.showinfo("Success", "Employee added successfully.")
 
         def delete_employee(self, emp_id):
             if emp_id in self.employees:
-                del self.employees[emp_id]
-                self.save_data()
-                messagebox.showinfo("Success", "Employee deleted successfully.")
+                if self._remove('employees', emp_id):
+                    messagebox.showinfo("Success", "Employee deleted successfully.")
             else:
                 messagebox.showerror("Error", "Employee not found.")
 
         def display_employee(self, emp_id):
-            if emp_id in self.employees:
-                messagebox.showinfo("Employee Details", f"Employee ID: {emp_id}\nName: {self.employees[emp_id]}")
+            employee = self.store.get_record('employees', emp_id)
+            if employee is not None:
+                messagebox.showinfo("Employee Details", self._describe('employees', employee))
             else:
                 messagebox.showerror("Error", "Employee not found.")
 
@@ -274,67 +698,160 @@ def merge_codes():
             event_window = tk.Toplevel(self.root)
             event_window.title("Manage Events")
 
-            tk.Label(event_window, text="Event ID:").grid(row=0, column=0)
-            event_id_entry = tk.Entry(event_window)
-            event_id_entry.grid(row=0, column=1)
+            entries = self._record_form(event_window, 'events')
+            event_id_entry = entries['eventID']
 
-            tk.Label(event_window, text="Type:").grid(row=1, column=0)
-            type_entry = tk.Entry(event_window)
-            type_entry.grid(row=1, column=1)
-
-            add_button = tk.Button(event_window, text="Add Event", command=lambda: self.add_event(event_id_entry.get(), type_entry.get()))
-            add_button.grid(row=2, column=0)
+            add_button = tk.Button(event_window, text="Add Event", command=lambda: self._submit('events', entries, self.add_event))
+            add_button.grid(row=11, column=0)
 
             delete_button = tk.Button(event_window, text="Delete Event", command=lambda: self.delete_event(event_id_entry.get()))
-            delete_button.grid(row=2, column=1)
+            delete_button.grid(row=11, column=1)
 
             display_button = tk.Button(event_window, text="Display Event", command=lambda: self.display_event(event_id_entry.get()))
-            display_button.grid(row=2, column=2)
-
-        def add_event(self, event_id, type, theme, date, time, duration, venue_address, client_id, guest_ids, supplier_ids,
-                      invoice):
-            if event_id in self.events:
+            display_button.grid(row=11, column=2)
+
+            browse_button = tk.Button(event_window, text="Browse Events",
+                                      command=lambda: self.browse('events', "Events", self.display_event))
+            browse_button.grid(row=11, column=3)
+
+            free_slot_button = tk.Button(event_window, text="Next Free Slot", command=lambda: self.fill_free_slot(entries))
+            free_slot_button.grid(row=11, column=4)
+
+            # Query section: every filled-in criterion narrows the result
+            tk.Label(event_window, text="Find events matching:").grid(row=12, column=0, columnspan=2)
+            criteria = ["From Date", "To Date", "Client ID", "Venue Address", "Guest ID", "Supplier ID"]
+            query_entries = {}
+            for row, criterion in enumerate(criteria, start=13):
+                tk.Label(event_window, text=f"{criterion}:").grid(row=row, column=0)
+                entry = tk.Entry(event_window)
+                entry.grid(row=row, column=1)
+                query_entries[criterion] = entry
+
+            find_button = tk.Button(event_window, text="Find Events",
+                                    command=lambda: self.find_events(**{criterion.lower().replace(" ", "_"): entry.get().strip()
+                                                                        for criterion, entry in query_entries.items()}))
+            find_button.grid(row=19, column=0)
+
+            # Suggestions: venues and caterers whose capacity fits, free at the form's date and time if given
+            tk.Label(event_window, text="Guest Count:").grid(row=20, column=0)
+            guest_count_entry = tk.Entry(event_window)
+            guest_count_entry.grid(row=20, column=1)
+
+            suggest_button = tk.Button(event_window, text="Suggest Venues/Caterers",
+                                       command=lambda: self.suggest_bookings(guest_count_entry.get().strip(), entries))
+            suggest_button.grid(row=21, column=0)
+
+        def add_event(self, event):
+            if event.eventID in self.events:
                 messagebox.showerror("Error", "Event with ID already exists.")
+            elif event.date is None:
+                messagebox.showerror("Error", "Date must be in YYYY-MM-DD format.")
             else:
-                self.events[event_id] = {
-                    "type": type,
-                    "theme": theme,
-                    "date": date,
-                    "time": time,
-                    "duration": duration,
-                    "venue_address": venue_address,
-                    "client_id": client_id,
-                    "guest_ids": guest_ids,
-                    "supplier_ids": supplier_ids,
-                    "invoice": invoice
-                }
-                self.save_data()
-                messagebox.showinfo("Success", "Event added successfully.")
+                problems = self.schedule.check(event)
+                if problems and not messagebox.askyesno("Scheduling Problems",
+                                                        "\n".join(problems) + "\n\nAdd the event anyway?"):
+                    return
+                if self._put('events', event.eventID, event):
+                    messagebox.showinfo("Success", "Event added successfully.")
+
+        def fill_free_slot(self, entries):
+            # Moves the form's date and time to the venue's next free slot of the given duration
+            venue_address = entries['venueAddress'].get().strip()
+            if not venue_address:
+                messagebox.showerror("Error", "Enter a venue address.")
+                return
+            try:
+                hours = float(entries['duration'].get().strip())
+            except ValueError:
+                hours = 0
+            if hours <= 0:
+                messagebox.showerror("Error", "Duration must be a positive number of hours.")
+                return
+            date = entries['date'].get().strip()
+            if date and not self._valid_date(date):
+                messagebox.showerror("Error", "Date must be in YYYY-MM-DD format.")
+                return
+            probe = Event("", "", "", date or datetime.now().strftime('%Y-%m-%d'), entries['time'].get().strip(), hours,
+                          venue_address, "", [], [], "")
+            start = self.schedule.next_free_slot(venue_address, hours, event_window(probe)[0])
+            for field, value in (('date', start.strftime('%Y-%m-%d')), ('time', start.strftime('%H:%M'))):
+                entries[field].delete(0, tk.END)
+                entries[field].insert(0, value)
+
+        def suggest_bookings(self, guest_count, entries):
+            if not guest_count:
+                guest_count = str(len([guest_id for guest_id in entries['guests'].get().split(LIST_SEPARATOR) if guest_id.strip()]))
+            try:
+                guests = int(guest_count)
+            except ValueError:
+                messagebox.showerror("Error", "Guest count must be a whole number.")
+                return
+            window = None
+            date = entries['date'].get().strip()
+            if date:
+                if not self._valid_date(date):
+                    messagebox.showerror("Error", "Date must be in YYYY-MM-DD format.")
+                    return
+                try:
+                    duration = float(entries['duration'].get().strip())
+                except ValueError:
+                    duration = 0
+                probe = Event("", "", "", date, entries['time'].get().strip(), duration, "", "", [], [], "")
+                window = event_window(probe)
+            limit = 10
+            venue_ids = self.capacity_index.venues_for(guests, limit, window, self.schedule)
+            caterer_ids = self.capacity_index.caterers_for(guests, limit, window, self.schedule)
+            venues = [f"{venue_id}: {self.venues[venue_id].name} ({self.venues[venue_id].address})" for venue_id in venue_ids]
+            caterers = [f"{supplier_id}: {self.suppliers[supplier_id].name}" for supplier_id in caterer_ids]
+            when = f" free on {date}" if window is not None else ""
+            messagebox.showinfo("Suggestions", f"Best fits for {guests} guests{when}, tightest first.\n\n"
+                                               f"Venues:\n" + ("\n".join(venues) or "None") + "\n\n"
+                                               f"Caterers:\n" + ("\n".join(caterers) or "None"))
 
         def delete_event(self, event_id):
             if event_id in self.events:
-                del self.events[event_id]
-                self.save_data()
-                messagebox.showinfo("Success", "Event deleted successfully.")
+                if self._remove('events', event_id):
+                    messagebox.showinfo("Success", "Event deleted successfully.")
             else:
                 messagebox.showerror("Error", "Event not found.")
 
+        @staticmethod
+        def _valid_date(date):
+            try:
+                datetime.strptime(date, '%Y-%m-%d')
+            except ValueError:
+                return False
+            return True
+
+        def find_events(self, from_date="", to_date="", client_id="", venue_address="", guest_id="", supplier_id=""):
+            if (from_date and not self._valid_date(from_date)) or (to_date and not self._valid_date(to_date)):
+                messagebox.showerror("Error", "Dates must be in YYYY-MM-DD format.")
+                return
+            event_ids = self.service.find_events(from_date, to_date, client_id, venue_address, guest_id, supplier_id)
+            if event_ids is None:
+                messagebox.showerror("Error", "Enter at least one search criterion.")
+                return
+            shown = ", ".join(event_ids[:50])
+            more = f"\n... and {len(event_ids) - 50} more" if len(event_ids) > 50 else ""
+            messagebox.showinfo("Matching Events", f"{len(event_ids)} event(s) found.\n{shown}{more}")
+
         def display_event(self, event_id):
             # Implement display event functionality here
 
-            if event_id in self.events:
-                event_details = self.events[event_id]
+            event = self.store.get_record('events', event_id)
+            if event is not None:
+                date = event.date.strftime('%Y-%m-%d') if event.date is not None else ""
                 messagebox.showinfo("Event Details", f"Event ID: {event_id}\n"
-                                                  f"Type: {event_details['type']}\n"
-                                                  f"Theme: {event_details['theme']}\n"
-                                                  f"Date: {event_details['date']}\n"
-                                                  f"Time: {event_details['time']}\n"
-                                                  f"Duration: {event_details['duration']} hours\n"
-                                                  f"Venue Address: {event_details['venue_address']}\n"
-                                                  f"Client ID: {event_details['client_id']}\n"
-                                                  f"Guest IDs: {', '.join(event_details['guest_ids'])}\n"
-                                                  f"Supplier IDs: {', '.join(event_details['supplier_ids'])}\n"
-                                                  f"Invoice: {event_details['invoice']}")
+                                                  f"Type: {event.type}\n"
+                                                  f"Theme: {event.theme}\n"
+                                                  f"Date: {date}\n"
+                                                  f"Time: {event.time}\n"
+                                                  f"Duration: {event.duration} hours\n"
+                                                  f"Venue Address: {event.venueAddress}\n"
+                                                  f"Client ID: {event.client}\n"
+                                                  f"Guest IDs: {', '.join(event.guests)}\n"
+                                                  f"Supplier IDs: {', '.join(event.suppliers)}\n"
+                                                  f"Invoice: {event.invoice}")
             else:
                 messagebox.showerror("Error", "Event not found.")
 
@@ -342,45 +859,40 @@ def merge_codes():
             client_window = tk.Toplevel(self.root)
             client_window.title("Manage Clients")
 
-            tk.Label(client_window, text="Client ID:").grid(row=0, column=0)
-            client_id_entry = tk.Entry(client_window)
-            client_id_entry.grid(row=0, column=1)
-
-            tk.Label(client_window, text="Name:").grid(row=1, column=0)
-            name_entry = tk.Entry(client_window)
-            name_entry.grid(row=1, column=1)
+            entries = self._record_form(client_window, 'clients')
+            client_id_entry = entries['clientID']
+            row = len(entries)
 
             add_button = tk.Button(client_window, text="Add Client",
-                                   command=lambda: self.add_client(client_id_entry.get(), name_entry.get()))
-            add_button.grid(row=2, column=0)
+                                   command=lambda: self._submit('clients', entries, self.add_client))
+            add_button.grid(row=row, column=0)
 
             delete_button = tk.Button(client_window, text="Delete Client",
                                       command=lambda: self.delete_client(client_id_entry.get()))
-            delete_button.grid(row=2, column=1)
+            delete_button.grid(row=row, column=1)
 
             display_button = tk.Button(client_window, text="Display Client",
                                        command=lambda: self.display_client(client_id_entry.get()))
-            display_button.grid(row=2, column=2)
+            display_button.grid(row=row, column=2)
 
-        def add_client(self, client_id, name):
-            if client_id in self.clients:
+            browse_button = tk.Button(client_window, text="Browse Clients",
+                                      command=lambda: self.browse('clients', "Clients", self.display_client))
+            browse_button.grid(row=row, column=3)
+
+        def add_client(self, client):
+            if client.clientID in self.clients:
                 messagebox.showerror("Error", "Client with ID already exists.")
             else:
-                self.clients[client_id] = name
-                self.save_data()
-                messagebox.showinfo("Success", "Client added successfully.")
+                if self._put('clients', client.clientID, client):
+                    messagebox.showinfo("Success", "Client added successfully.")
 
         def delete_client(self, client_id):
-            if client_id in self.clients:
-                del self.clients[client_id]
-                self.save_data()
-                messagebox.showinfo("Success", "Client deleted successfully.")
-            else:
-                messagebox.showerror("Error", "Client not found.")
+            self._delete_referenced('clients', client_id, "Client")
 
         def display_client(self, client_id):
-            if client_id in self.clients:
-                messagebox.showinfo("Client Details", f"Client ID: {client_id}\nName: {self.clients[client_id]}")
+            client = self.store.get_record('clients', client_id)
+            if client is not None:
+                messagebox.showinfo("Client Details", self._describe('clients', client))
             else:
                 messagebox.showerror("Error", "Client not found.")
 
@@ -388,45 +900,40 @@ def merge_codes():
             guest_window = tk.Toplevel(self.root)
             guest_window.title("Manage Guests")
 
-            tk.Label(guest_window, text="Guest ID:").grid(row=0, column=0)
-            guest_id_entry = tk.Entry(guest_window)
-            guest_id_entry.grid(row=0, column=1)
-
-            tk.Label(guest_window, text="Name:").grid(row=1, column=0)
-            name_entry = tk.Entry(guest_window)
-            name_entry.grid(row=1, column=1)
+            entries = self._record_form(guest_window, 'guests')
+            guest_id_entry = entries['guestID']
+            row = len(entries)
 
             add_button = tk.Button(guest_window, text="Add Guest",
-                                   command=lambda: self.add_guest(guest_id_entry.get(), name_entry.get()))
-            add_button.grid(row=2, column=0)
+                                   command=lambda: self._submit('guests', entries, self.add_guest))
+            add_button.grid(row=row, column=0)
 
             delete_button = tk.Button(guest_window, text="Delete Guest",
                                       command=lambda: self.delete_guest(guest_id_entry.get()))
-            delete_button.grid(row=2, column=1)
+            delete_button.grid(row=row, column=1)
 
             display_button = tk.Button(guest_window, text="Display Guest",
                                        command=lambda: self.display_guest(guest_id_entry.get()))
-            display_button.grid(row=2, column=2)
+            display_button.grid(row=row, column=2)
+
+            browse_button = tk.Button(guest_window, text="Browse Guests",
+                                      command=lambda: self.browse('guests', "Guests", self.display_guest))
+            browse_button.grid(row=row, column=3)
 
-        def add_guest(self, guest_id, name):
-            if guest_id in self.guests:
+        def add_guest(self, guest):
+            if guest.guestID in self.guests:
                 messagebox.showerror("Error", "Guest with ID already exists.")
             else:
-                self.guests[guest_id] = name
-                self.save_data()
-                messagebox.showinfo("Success", "Guest added successfully.")
+                if self._put('guests', guest.guestID, guest):
+                    messagebox.showinfo("Success", "Guest added successfully.")
 
         def delete_guest(self, guest_id):
-            if guest_id in self.guests:
-                del self.guests[guest_id]
-                self.save_data()
-                messagebox.showinfo("Success", "Guest deleted successfully.")
-            else:
-                messagebox.showerror("Error", "Guest not found.")
+            self._delete_referenced('guests', guest_id, "Guest")
 
         def display_guest(self, guest_id):
-            if guest_id in self.guests:
-                messagebox.showinfo("Guest Details", f"Guest ID: {guest_id}\nName: {self.guests[guest_id]}")
+            guest = self.store.get_record('guests', guest_id)
+            if guest is not None:
+                messagebox.showinfo("Guest Details", self._describe('guests', guest))
             else:
                 messagebox.showerror("Error", "Guest not found.")
 
@@ -434,45 +941,40 @@ def merge_codes():
             supplier_window = tk.Toplevel(self.root)
             supplier_window.title("Manage Suppliers")
 
-            tk.Label(supplier_window, text="Supplier ID:").grid(row=0, column=0)
-            supplier_id_entry = tk.Entry(supplier_window)
-            supplier_id_entry.grid(row=0, column=1)
-
-            tk.Label(supplier_window, text="Name:").grid(row=1, column=0)
-            name_entry = tk.Entry(supplier_window)
-            name_entry.grid(row=1, column=1)
+            entries = self._record_form(supplier_window, 'suppliers')
+            supplier_id_entry = entries['supplierID']
+            row = len(entries)
 
             add_button = tk.Button(supplier_window, text="Add Supplier",
-                                   command=lambda: self.add_supplier(supplier_id_entry.get(), name_entry.get()))
-            add_button.grid(row=2, column=0)
+                                   command=lambda: self._submit('suppliers', entries, self.add_supplier))
+            add_button.grid(row=row, column=0)
 
             delete_button = tk.Button(supplier_window, text="Delete Supplier",
                                       command=lambda: self.delete_supplier(supplier_id_entry.get()))
-            delete_button.grid(row=2, column=1)
+            delete_button.grid(row=row, column=1)
 
             display_button = tk.Button(supplier_window, text="Display Supplier",
                                        command=lambda: self.display_supplier(supplier_id_entry.get()))
-            display_button.grid(row=2, column=2)
+            display_button.grid(row=row, column=2)
+
+            browse_button = tk.Button(supplier_window, text="Browse Suppliers",
+                                      command=lambda: self.browse('suppliers', "Suppliers", self.display_supplier))
+            browse_button.grid(row=row, column=3)
 
-        def add_supplier(self, supplier_id, name):
-            if supplier_id in self.suppliers:
+        def add_supplier(self, supplier):
+            if supplier.supplierID in self.suppliers:
                 messagebox.showerror("Error", "Supplier with ID already exists.")
             else:
-                self.suppliers[supplier_id] = name
-                self.save_data()
-                messagebox.showinfo("Success", "Supplier added successfully.")
+                if self._put('suppliers', supplier.supplierID, supplier):
+                    messagebox.showinfo("Success", "Supplier added successfully.")
 
         def delete_supplier(self, supplier_id):
-            if supplier_id in self.suppliers:
-                del self.suppliers[supplier_id]
-                self.save_data()
-                messagebox.showinfo("Success", "Supplier deleted successfully.")
-            else:
-                messagebox.showerror("Error", "Supplier not found.")
+            self._delete_referenced('suppliers', supplier_id, "Supplier")
 
         def display_supplier(self, supplier_id):
-            if supplier_id in self.suppliers:
-                messagebox.showinfo("Supplier Details", f"Supplier ID: {supplier_id}\nName: {self.suppliers[supplier_id]}")
+            supplier = self.store.get_record('suppliers', supplier_id)
+            if supplier is not None:
+                messagebox.showinfo("Supplier Details", self._describe('suppliers', supplier))
             else:
                 messagebox.showerror("Error", "Supplier not found.")
 
@@ -480,49 +982,49 @@ def merge_codes():
             venue_window = tk.Toplevel(self.root)
             venue_window.title("Manage Venues")
 
-            # Labels and entry fields for Venue ID and Name
-            tk.Label(venue_window, text="Venue ID:").grid(row=0, column=0)
-            venue_id_entry = tk.Entry(venue_window)
-            venue_id_entry.grid(row=0, column=1)
-
-            tk.Label(venue_window, text="Name:").grid(row=1, column=0)
-            name_entry = tk.Entry(venue_window)
-            name_entry.grid(row=1, column=1)
+            # Labels and entry fields for every venue detail
+            entries = self._record_form(venue_window, 'venues')
+            venue_id_entry = entries['venueID']
+            row = len(entries)
 
             # Add Venue button
             add_button = tk.Button(venue_window, text="Add Venue",
-                                   command=lambda: self.add_venue(venue_id_entry.get(), name_entry.get()))
-            add_button.grid(row=2, column=0)
+                                   command=lambda: self._submit('venues', entries, self.add_venue))
+            add_button.grid(row=row, column=0)
 
             # Delete Venue button
             delete_button = tk.Button(venue_window, text="Delete Venue",
                                       command=lambda: self.delete_venue(venue_id_entry.get()))
-            delete_button.grid(row=2, column=1)
+            delete_button.grid(row=row, column=1)
 
             # Display Venue button
             display_button = tk.Button(venue_window, text="Display Venue",
                                        command=lambda: self.display_venue(venue_id_entry.get()))
-            display_button.grid(row=2, column=2)
+            display_button.grid(row=row, column=2)
 
-        def add_venue(self, venue_id, name):
-            if venue_id in self.venues:
+            # Browse Venues button
+            browse_button = tk.Button(venue_window, text="Browse Venues",
+                                      command=lambda: self.browse('venues', "Venues", self.display_venue))
+            browse_button.grid(row=row, column=3)
+
+        def add_venue(self, venue):
+            if venue.venueID in self.venues:
                 messagebox.showerror("Error", "Venue with ID already exists.")
             else:
-                self.venues[venue_id] = name
-                self.save_data()  # Save the updated data to the binary file
-                messagebox.showinfo("Success", "Venue added successfully.")
+                if self._put('venues', venue.venueID, venue):
+                    messagebox.showinfo("Success", "Venue added successfully.")
 
         def delete_venue(self, venue_id):
             if venue_id in self.venues:
-                del self.venues[venue_id]
-                self.save_data()  # Save the updated data to the binary file
-                messagebox.showinfo("Success", "Venue deleted successfully.")
+                if self._remove('venues', venue_id):
+                    messagebox.showinfo("Success", "Venue deleted successfully.")
             else:
                 messagebox.showerror("Error", "Venue not found.")
 
         def display_venue(self, venue_id):
-            if venue_id in self.venues:
-                messagebox.showinfo("Venue Details", f"Venue ID: {venue_id}\nName: {self.venues[venue_id]}")
+            venue = self.store.get_record('venues', venue_id)
+            if venue is not None:
+                messagebox.showinfo("Venue Details", self._describe('venues', venue))
             else:
                 messagebox.showerror("Error", "Venue not found.")
 
@@ -533,5 +1035,5 @@ def merge_codes():
     root.mainloop()
 
 
-
-merge_codes()
+if __name__ == '__main__':
+    merge_codes()
@@ -0,0 +1,479 @@
+import heapq
+from bisect import bisect_left, bisect_right, insort
+from collections import Counter
+from difflib import SequenceMatcher
+from datetime import datetime
+from numbers import Number
+from operator import itemgetter
+from typing import Any, Dict, Iterable, List, Mapping, Set, Tuple, Union
+
+from models import EVENT_REFERENCES, Event, parse_date
+
+# Columns shown when browsing each collection; the first one is always the record ID.
+BROWSE_COLUMNS = {
+    'employees': ('ID', 'Name', 'Department', 'Job Title'),
+    'events': ('ID', 'Type', 'Date', 'Client ID', 'Venue Address'),
+    'clients': ('ID', 'Name', 'Budget'),
+    'guests': ('ID', 'Name', 'Contact Details'),
+    'suppliers': ('ID', 'Name', 'Kind'),
+    'venues': ('ID', 'Name', 'Address', 'Max Guests'),
+}
+
+
+def browse_row(name: str, key: str, value: Any) -> tuple:
+    """Return the values shown for a record when browsing its collection."""
+    if name == 'events':
+        date = value.date.strftime('%Y-%m-%d') if value.date else ''
+        return key, value.type, date, value.client, value.venueAddress
+    if name == 'employees':
+        return key, value.name, value.department, value.jobTitle
+    if name == 'clients':
+        return key, value.name, value.budget
+    if name == 'guests':
+        return key, value.name, value.contactDetails
+    if name == 'suppliers':
+        return key, value.name, type(value).__name__
+    return key, value.name, value.address, value.maxGuests
+
+
+def sort_key(value: Any) -> tuple:
+    """Return a key that orders numbers numerically and everything else as text."""
+    if isinstance(value, Number):
+        return 0, value, ''
+    return 1, 0, str(value).lower()
+
+
+class EventIndex:
+    """Secondary indexes over the events collection, kept up to date as events change.
+
+    Dates are kept in a sorted list for range queries; clients, venues, guests and suppliers
+    each map to the set of events that reference them. The client, guest and supplier maps
+    double as the reverse references used to keep deletes from leaving dangling IDs.
+    """
+
+    def __init__(self, events: Mapping[str, Event] = None):
+        """Build the indexes from an existing collection of events."""
+        self._dates: List[Tuple[datetime, str]] = []
+        self._by_client: Dict[str, Set[str]] = {}
+        self._by_venue: Dict[str, Set[str]] = {}
+        self._by_guest: Dict[str, Set[str]] = {}
+        self._by_supplier: Dict[str, Set[str]] = {}
+        for event_id, event in (events or {}).items():
+            self._link(event_id, event)
+            if event.date is not None:
+                self._dates.append((event.date, event_id))
+        self._dates.sort()
+
+    @staticmethod
+    def _add_to(index: Dict[str, Set[str]], key: str, event_id: str) -> None:
+        """Add an event to one hash index entry."""
+        index.setdefault(key, set()).add(event_id)
+
+    @staticmethod
+    def _remove_from(index: Dict[str, Set[str]], key: str, event_id: str) -> None:
+        """Remove an event from one hash index entry, dropping the entry once it is empty."""
+        events = index.get(key)
+        if events is not None:
+            events.discard(event_id)
+            if not events:
+                del index[key]
+
+    def _link(self, event_id: str, event: Event) -> None:
+        """Add an event to the hash indexes."""
+        self._add_to(self._by_client, event.client, event_id)
+        self._add_to(self._by_venue, event.venueAddress, event_id)
+        for guest_id in event.guests:
+            self._add_to(self._by_guest, guest_id, event_id)
+        for supplier_id in event.suppliers:
+            self._add_to(self._by_supplier, supplier_id, event_id)
+
+    def _relink(self, index: Dict[str, Set[str]], old_keys: Iterable[str], new_keys: Iterable[str],
+                event_id: str) -> None:
+        """Move an event between hash index entries, touching only the keys that changed."""
+        old_keys, new_keys = set(old_keys), set(new_keys)
+        for key in old_keys - new_keys:
+            self._remove_from(index, key, event_id)
+        for key in new_keys - old_keys:
+            self._add_to(index, key, event_id)
+
+    def _drop_date(self, event_id: str, event: Event) -> None:
+        """Remove an event from the sorted dates."""
+        if event.date is not None:
+            position = bisect_left(self._dates, (event.date, event_id))
+            if position < len(self._dates) and self._dates[position] == (event.date, event_id):
+                del self._dates[position]
+
+    def on_set(self, name: str, key: str, value: Any) -> None:
+        """Index an event that was added to the store."""
+        if name == 'events':
+            self._link(key, value)
+            if value.date is not None:
+                insort(self._dates, (value.date, key))
+
+    def on_replace(self, name: str, key: str, old_value: Any, value: Any) -> None:
+        """Re-index a replaced event, updating only the entries whose references changed."""
+        if name != 'events':
+            return
+        self._relink(self._by_client, (old_value.client,), (value.client,), key)
+        self._relink(self._by_venue, (old_value.venueAddress,), (value.venueAddress,), key)
+        self._relink(self._by_guest, old_value.guests, value.guests, key)
+        self._relink(self._by_supplier, old_value.suppliers, value.suppliers, key)
+        if old_value.date != value.date:
+            self._drop_date(key, old_value)
+            if value.date is not None:
+                insort(self._dates, (value.date, key))
+
+    def on_delete(self, name: str, key: str, value: Any) -> None:
+        """Drop an event that was removed from the store."""
+        if name != 'events':
+            return
+        self._remove_from(self._by_client, value.client, key)
+        self._remove_from(self._by_venue, value.venueAddress, key)
+        for guest_id in value.guests:
+            self._remove_from(self._by_guest, guest_id, key)
+        for supplier_id in value.suppliers:
+            self._remove_from(self._by_supplier, supplier_id, key)
+        self._drop_date(key, value)
+
+    def between(self, start: Union[str, datetime], end: Union[str, datetime]) -> List[str]:
+        """Return the events dated from start to end inclusive, in date order."""
+        low = bisect_left(self._dates, (parse_date(start),))
+        high = bisect_right(self._dates, (parse_date(end), chr(0x10FFFF)))
+        return [event_id for _, event_id in self._dates[low:high]]
+
+    def for_client(self, client_id: str) -> List[str]:
+        """Return the events booked by a client."""
+        return sorted(self._by_client.get(client_id, ()))
+
+    def at_venue(self, venue_address: str) -> List[str]:
+        """Return the events held at a venue address."""
+        return sorted(self._by_venue.get(venue_address, ()))
+
+    def for_guest(self, guest_id: str) -> List[str]:
+        """Return the events a guest is invited to."""
+        return sorted(self._by_guest.get(guest_id, ()))
+
+    def for_supplier(self, supplier_id: str) -> List[str]:
+        """Return the events a supplier is booked for."""
+        return sorted(self._by_supplier.get(supplier_id, ()))
+
+    def _references(self, name: str) -> Dict[str, Set[str]]:
+        """Return the map from the IDs of a referenced collection to the events using them."""
+        if name not in EVENT_REFERENCES:
+            raise KeyError(name)
+        return {'clients': self._by_client, 'guests': self._by_guest, 'suppliers': self._by_supplier}[name]
+
+    def referencing(self, name: str, key: str) -> List[str]:
+        """Return the events that refer to a client, guest or supplier."""
+        return sorted(self._references(name).get(key, ()))
+
+    def referenced_ids(self, name: str) -> List[str]:
+        """Return the client, guest or supplier IDs that at least one event refers to."""
+        return sorted(key for key in self._references(name) if key)
+
+
+def intersect(results: Iterable[List[str]]) -> List[str]:
+    """Return the IDs present in every result list, keeping the order of the first."""
+    results = list(results)
+    if not results:
+        return []
+    common = set(results[0]).intersection(*results[1:])
+    return [event_id for event_id in results[0] if event_id in common]
+
+
+class CollectionRows:
+    """Serves pages of an in-memory collection sorted by any browse column.
+
+    Each column's sort order is built the first time it is requested and then maintained
+    with binary search on every change, so paging never re-sorts the collection.
+    """
+
+    def __init__(self, name: str, collection: Mapping[str, Any]):
+        """Initialize a row source over a collection."""
+        self.name = name
+        self.collection = collection
+        self.columns = BROWSE_COLUMNS[name]
+        self._orders: Dict[int, List[Tuple[tuple, str]]] = {}
+
+    def count(self) -> int:
+        """Return the number of rows."""
+        return len(self.collection)
+
+    def _entry(self, column: int, key: str, value: Any) -> Tuple[tuple, str]:
+        """Return the sort entry of a record for a column."""
+        return sort_key(browse_row(self.name, key, value)[column]), key
+
+    def _order(self, column: int) -> List[Tuple[tuple, str]]:
+        """Return the maintained sort order for a column, building it on first use."""
+        order = self._orders.get(column)
+        if order is None:
+            order = sorted(self._entry(column, key, value) for key, value in self.collection.items())
+            self._orders[column] = order
+        return order
+
+    def rows(self, offset: int, limit: int, column: int = 0, descending: bool = False) -> List[tuple]:
+        """Return up to limit rows starting at offset in the requested order."""
+        order = self._order(column)
+        if descending:
+            stop = max(len(order) - offset, 0)
+            page = reversed(order[max(stop - limit, 0):stop])
+        else:
+            page = order[offset:offset + limit]
+        return [browse_row(self.name, key, self.collection[key]) for _, key in page]
+
+    def on_set(self, name: str, key: str, value: Any) -> None:
+        """Insert a new record into every built sort order."""
+        if name == self.name:
+            for column, order in self._orders.items():
+                insort(order, self._entry(column, key, value))
+
+    def on_delete(self, name: str, key: str, value: Any) -> None:
+        """Remove a record from every built sort order."""
+        if name == self.name:
+            for column, order in self._orders.items():
+                entry = self._entry(column, key, value)
+                position = bisect_left(order, entry)
+                if position < len(order) and order[position] == entry:
+                    del order[position]
+
+
+# Collections whose records are found by name in the search box.
+SEARCHABLE = ('employees', 'clients', 'guests', 'suppliers', 'venues')
+
+
+def record_name(value: Any) -> str:
+    """Return the display name of a record."""
+    return value if isinstance(value, str) else getattr(value, 'name', '')
+
+
+def trigrams(text: str) -> Set[str]:
+    """Return the padded character trigrams of a normalized string."""
+    padded = f'  {text} '
+    return {padded[position:position + 3] for position in range(len(padded) - 2)}
+
+
+class SearchIndex:
+    """Incremental name index answering prefix and fuzzy searches across collections.
+
+    Names are split into words; each distinct word maps to the records using it, and the
+    sorted vocabulary answers prefix queries by binary search. Fuzzy queries match each
+    query word against a trigram index of the vocabulary, which is far smaller than the
+    number of records, and score the records of the closest words.
+    """
+
+    # Records scored at most by one fuzzy query.
+    max_candidates = 2000
+    # Vocabulary words compared by edit similarity at most per query word.
+    max_word_candidates = 50
+    # Vocabulary words counted at most per query word, taken from its rarest trigrams.
+    max_trigram_words = 10000
+
+    def __init__(self, collections: Mapping[str, Mapping[str, Any]] = None):
+        """Build the index over the searchable collections."""
+        self._ids: Dict[Tuple[str, str], int] = {}
+        self._refs: Dict[int, Tuple[str, str]] = {}
+        self._names: Dict[int, str] = {}
+        self._postings: Dict[str, Set[int]] = {}
+        self._vocabulary: List[str] = []
+        self._word_trigrams: Dict[str, Set[str]] = {}
+        self._next_id = 0
+        for name, collection in (collections or {}).items():
+            if name in SEARCHABLE:
+                for key, value in collection.items():
+                    self._add(name, key, record_name(value), sort=False)
+        self._vocabulary.sort()
+        self._index_trigrams(self._vocabulary)
+
+    @staticmethod
+    def _normalize(text: str) -> str:
+        """Lower-case a name and collapse its whitespace."""
+        return ' '.join(str(text).lower().split())
+
+    def _index_trigrams(self, words: Iterable[str]) -> None:
+        """Add new vocabulary words to the trigram index."""
+        word_trigrams = self._word_trigrams
+        for word in words:
+            for trigram in trigrams(word):
+                postings = word_trigrams.get(trigram)
+                if postings is None:
+                    word_trigrams[trigram] = {word}
+                else:
+                    postings.add(word)
+
+    def _add(self, name: str, key: str, text: str, sort: bool = True) -> None:
+        """Index one record's name; a bulk build (``sort`` False) indexes the trigrams afterwards."""
+        record_id = self._next_id
+        self._next_id += 1
+        normalized = self._normalize(text)
+        self._ids[(name, key)] = record_id
+        self._refs[record_id] = (name, key)
+        self._names[record_id] = normalized
+        for word in set(normalized.split()):
+            postings = self._postings.get(word)
+            if postings is None:
+                postings = self._postings[word] = set()
+                if sort:
+                    insort(self._vocabulary, word)
+                    self._index_trigrams((word,))
+                else:
+                    self._vocabulary.append(word)
+            postings.add(record_id)
+
+    def on_set(self, name: str, key: str, value: Any) -> None:
+        """Index a record that was added to the store."""
+        if name in SEARCHABLE:
+            self._add(name, key, record_name(value))
+
+    def on_delete(self, name: str, key: str, value: Any) -> None:
+        """Drop a record that was removed from the store."""
+        record_id = self._ids.pop((name, key), None) if name in SEARCHABLE else None
+        if record_id is None:
+            return
+        del self._refs[record_id]
+        for word in set(self._names.pop(record_id).split()):
+            postings = self._postings[word]
+            postings.discard(record_id)
+            if postings:
+                continue
+            # Last record using this word: retire it from the vocabulary.
+            del self._postings[word]
+            del self._vocabulary[bisect_left(self._vocabulary, word)]
+            for trigram in trigrams(word):
+                words = self._word_trigrams[trigram]
+                words.discard(word)
+                if not words:
+                    del self._word_trigrams[trigram]
+
+    def __len__(self) -> int:
+        return len(self._names)
+
+    def _words_with_prefix(self, prefix: str) -> List[str]:
+        """Return the vocabulary words starting with prefix."""
+        low = bisect_left(self._vocabulary, prefix)
+        high = bisect_left(self._vocabulary, prefix + chr(0x10FFFF))
+        return self._vocabulary[low:high]
+
+    def _matches_all(self, record_id: int, words: List[str]) -> bool:
+        """Return whether every query word starts some word of a record's name."""
+        name_words = self._names[record_id].split()
+        return all(any(part.startswith(word) for part in name_words) for word in words)
+
+    def _rarest(self, expansions: List[List[str]]) -> int:
+        """Return the position of the list of vocabulary words whose records are fewest in total.
+
+        Totals are summed only until they pass the best so far, so a common word such as
+        a shared surname costs no more than the rarest one.
+        """
+        best = 0
+        best_count = None
+        for position, words in enumerate(expansions):
+            count = 0
+            for word in words:
+                count += len(self._postings[word])
+                if best_count is not None and count >= best_count:
+                    break
+            else:
+                best, best_count = position, count
+        return best
+
+    def prefix(self, query: str, limit: int = 20) -> List[Tuple[str, str]]:
+        """Return records having a name word that starts with each word of the query."""
+        words = self._normalize(query).split()
+        if not words:
+            return []
+        # Walk the records of the query word matching the fewest; check the rest per record.
+        expansions = [self._words_with_prefix(word) for word in words]
+        expansions = expansions[self._rarest(expansions)]
+        results = []
+        seen = set()
+        for word in expansions:
+            for record_id in self._postings[word]:
+                if record_id not in seen and self._matches_all(record_id, words):
+                    seen.add(record_id)
+                    results.append(self._refs[record_id])
+                    if len(results) >= limit:
+                        return results
+        return results
+
+    def similar_words(self, word: str, limit: int = 5, threshold: float = 0.6) -> List[Tuple[float, str]]:
+        """Return the vocabulary words closest to word.
+
+        Words sharing the query's rarer trigrams are the candidates; the ``max_word_candidates``
+        sharing the most are ranked by edit similarity, which tolerates the transpositions
+        trigrams alone score poorly.
+        """
+        needed = 2 if len(word) > 3 else 1
+        lists = sorted((self._word_trigrams.get(trigram, ()) for trigram in trigrams(word)), key=len)
+        # Candidates come from the rarest trigrams, up to ``max_trigram_words`` words in all;
+        # common trigrams such as a shared first letter only complete the check.
+        split = 1
+        total = len(lists[0]) if lists else 0
+        while split < len(lists) and total + len(lists[split]) <= self.max_trigram_words:
+            total += len(lists[split])
+            split += 1
+        counts: Counter = Counter()
+        for words in lists[:split]:
+            counts.update(words)
+        best = heapq.nlargest(self.max_word_candidates * 2, counts.items(), key=itemgetter(1))
+        candidates = [candidate for candidate, shared in best
+                      if abs(len(candidate) - len(word)) <= 2
+                      and shared + sum(candidate in words for words in lists[split:]) >= needed]
+        candidates = candidates[:self.max_word_candidates]
+        scored = []
+        for candidate in candidates:
+            score = SequenceMatcher(None, word, candidate).ratio()
+            if score >= threshold:
+                scored.append((score, candidate))
+        scored.sort(key=lambda item: (-item[0], item[1]))
+        return scored[:limit]
+
+    def fuzzy(self, query: str, limit: int = 20) -> List[Tuple[str, str]]:
+        """Return records whose name words resemble every word of the query.
+
+        Candidates come from the query word whose similar words have the fewest records,
+        best match first, and at most ``max_candidates`` of them are scored; each is checked
+        against the other query words through its own name.
+        """
+        words = self._normalize(query).split()
+        if not words:
+            return []
+        similar = []
+        for word in words:
+            scores = {candidate: score for score, candidate in self.similar_words(word)}
+            if not scores:
+                return []
+            similar.append(scores)
+        # similar_words lists each word's candidates best first, and the dicts keep that order
+        position = self._rarest([list(scores) for scores in similar])
+        first = similar.pop(position)
+        totals: Dict[int, float] = {}
+        scored = 0
+        for candidate in first:
+            for record_id in self._postings[candidate]:
+                if record_id in totals:
+                    continue
+                scored += 1
+                total = first[candidate]
+                name_words = self._names[record_id].split()
+                for scores in similar:
+                    best = max(scores.get(part, 0.0) for part in name_words)
+                    if not best:
+                        break
+                    total += best
+                else:
+                    totals[record_id] = total
+                if scored >= self.max_candidates:
+                    break
+            if scored >= self.max_candidates:
+                break
+        best = sorted(totals.items(), key=lambda item: (-item[1], self._names[item[0]]))[:limit]
+        return [self._refs[record_id] for record_id, _ in best]
+
+    def search(self, query: str, limit: int = 20) -> List[Tuple[str, str]]:
+        """Return prefix matches, or fuzzy matches when no name starts with the query."""
+        return self.prefix(query, limit) or self.fuzzy(query, limit)
+
+    def name_of(self, name: str, key: str) -> str:
+        """Return the normalized name indexed for a record."""
+        record_id = self._ids.get((name, key))
+        return self._names.get(record_id, '')
@@ -0,0 +1,236 @@
+import json
+import os
+from concurrent.futures import FIRST_COMPLETED, Future, ProcessPoolExecutor, wait
+from typing import Any, Callable, Dict, Iterator, List, Optional, Set, Tuple
+
+from models import Event
+
+# Hourly rate charged for each kind of supplier booked on an event.
+SUPPLIER_RATES = {
+    'Caterer': 120.0,
+    'Decorator': 60.0,
+    'Cleaner': 35.0,
+    'Entertainer': 90.0,
+    'FurnitureSupplier': 45.0,
+    'Supplier': 50.0,
+}
+# Hourly rate for planning and running the event itself.
+COORDINATION_RATE = 75.0
+# File in the output directory listing the invoices already written, one JSON object per line.
+MANIFEST = 'invoices.jsonl'
+
+# (event fields, client fields or None, [(supplier kind, supplier fields or None)]) sent to a worker.
+Job = Tuple[Dict[str, Any], Optional[Dict[str, Any]], List[Tuple[str, Optional[Dict[str, Any]]]]]
+
+
+def invoice_number(event_id: str) -> str:
+    """Return the invoice number of an event."""
+    return f"INV-{event_id}"
+
+
+def line_items(job: Job) -> List[Tuple[str, float, float]]:
+    """Return the (description, hours, amount) lines of an event's invoice."""
+    event, _, suppliers = job
+    hours = float(event['duration'] or 0)
+    lines = [("Event coordination", hours, hours * COORDINATION_RATE)]
+    for supplier_id, (kind, supplier) in zip(event['suppliers'], suppliers):
+        name = supplier['name'] if supplier is not None else "(missing supplier)"
+        rate = SUPPLIER_RATES.get(kind, SUPPLIER_RATES['Supplier'])
+        lines.append((f"{kind} {supplier_id}: {name}", hours, hours * rate))
+    return lines
+
+
+def render_invoice(job: Job) -> Tuple[str, float]:
+    """Return the text of an event's invoice and its total."""
+    event, client, _ = job
+    lines = line_items(job)
+    total = round(sum(amount for _, _, amount in lines), 2)
+    if client is not None:
+        bill_to = [client['name'], client['address'], client['contactDetails']]
+    else:
+        bill_to = [f"Client {event['client']} (missing)"]
+    text = [f"Invoice {invoice_number(event['eventID'])}", "",
+            "Bill to:", *(f"  {line}" for line in bill_to if line), "",
+            f"Event {event['eventID']}: {event['type']} ({event['theme']})",
+            f"Date: {event['date'] or 'unknown'} {event['time']}".rstrip(),
+            f"Venue: {event['venueAddress']}", ""]
+    text += [f"{description:<50} {hours:>7.1f} h {amount:>12,.2f}" for description, hours, amount in lines]
+    text += ["", f"{'Total':<61} {total:>12,.2f}", ""]
+    return "\n".join(text), total
+
+
+def render_chunk(directory: str, jobs: List[Job]) -> List[Tuple[str, str, float]]:
+    """Write the invoice files of a chunk of events and return (event ID, invoice number, total) for each.
+
+    Runs in a worker process. Each file is written to a temporary name and renamed, so an
+    interrupted run never leaves a half-written invoice behind.
+    """
+    results = []
+    for job in jobs:
+        event_id = job[0]['eventID']
+        number = invoice_number(event_id)
+        text, total = render_invoice(job)
+        path = os.path.join(directory, f"{number}.txt")
+        with open(path + '.tmp', 'w', encoding='utf-8') as f:
+            f.write(text)
+        os.replace(path + '.tmp', path)
+        results.append((event_id, number, total))
+    return results
+
+
+def read_manifest(directory: str) -> Set[str]:
+    """Return the IDs of the events whose invoices a previous run finished in a directory."""
+    finished = set()
+    try:
+        with open(os.path.join(directory, MANIFEST), encoding='utf-8') as f:
+            for line in f:
+                try:
+                    entry = json.loads(line)
+                except json.JSONDecodeError:
+                    # The last line of an interrupted run may be cut short
+                    continue
+                if os.path.exists(os.path.join(directory, f"{entry['invoice']}.txt")):
+                    finished.add(entry['event'])
+    except FileNotFoundError:
+        pass
+    return finished
+
+
+class InvoiceRun:
+    """Generates the invoice files of a list of events on a pool of worker processes.
+
+    Events are sent to the workers in chunks, with only a few chunks in flight per worker so
+    memory stays flat however many events there are. Call ``step`` repeatedly, for example
+    from a timer, until ``done`` is set. Each finished chunk is appended to the manifest in
+    the output directory, so a run started again on the same directory skips the invoices
+    that are already written; the manifest also keeps each invoice's total. When ``put`` is
+    given, each event's free-text ``invoice`` field gets the invoice number and total appended
+    through it and ``flush`` is called once per chunk. ``cancel`` returns at once and lets
+    ``step`` collect the chunks already running until ``done`` is set.
+    """
+
+    def __init__(self, event_ids: List[str], directory: str, get_record: Callable[[str, str], Any],
+                 put: Optional[Callable[[str, str, Any], None]] = None, flush: Optional[Callable[[], None]] = None,
+                 workers: Optional[int] = None, chunk_size: int = 50):
+        """Prepare a run over the given events, skipping those already invoiced in the directory."""
+        os.makedirs(directory, exist_ok=True)
+        self.directory = directory
+        self.get_record = get_record
+        self.put = put
+        self.flush = flush
+        self.workers = workers or os.cpu_count() or 1
+        self.chunk_size = max(chunk_size, 1)
+        finished = read_manifest(directory)
+        self.total = len(event_ids)
+        self.skipped = sum(1 for event_id in event_ids if event_id in finished)
+        self.written = 0
+        self.invoiced = 0.0
+        self.errors: List[str] = []
+        self.cancelled = False
+        self._pending = iter([event_id for event_id in event_ids if event_id not in finished])
+        self._chunk_source = self._chunks()
+        self._running: Dict[Future, List[str]] = {}
+        self._manifest = open(os.path.join(directory, MANIFEST), 'a', encoding='utf-8')
+        self._pool = ProcessPoolExecutor(self.workers)
+        self.done = False
+        self._submit()
+
+    def _job(self, event_id: str) -> Optional[Job]:
+        """Gather the fields a worker needs to invoice one event, or None if it no longer exists."""
+        event = self.get_record('events', event_id)
+        if event is None:
+            return None
+        client = self.get_record('clients', event.client)
+        suppliers = []
+        for supplier_id in event.suppliers:
+            supplier = self.get_record('suppliers', supplier_id)
+            suppliers.append((type(supplier).__name__, supplier.to_dict()) if supplier is not None
+                             else ('Supplier', None))
+        return event.to_dict(), client.to_dict() if client is not None else None, suppliers
+
+    def _chunks(self) -> Iterator[List[Job]]:
+        """Yield the jobs of the remaining events, a chunk at a time."""
+        chunk = []
+        for event_id in self._pending:
+            job = self._job(event_id)
+            if job is None:
+                self.errors.append(f"Event {event_id}: not found")
+                continue
+            chunk.append(job)
+            if len(chunk) >= self.chunk_size:
+                yield chunk
+                chunk = []
+        if chunk:
+            yield chunk
+
+    def _submit(self) -> None:
+        """Keep two chunks per worker in flight while events remain."""
+        while not self.cancelled and len(self._running) < self.workers * 2:
+            chunk = next(self._chunk_source, None)
+            if chunk is None:
+                break
+            future = self._pool.submit(render_chunk, self.directory, chunk)
+            self._running[future] = [job[0]['eventID'] for job in chunk]
+        if not self._running:
+            self.close()
+
+    def step(self, timeout: Optional[float] = 0.1) -> int:
+        """Collect the chunks that finished within ``timeout`` seconds and return how many invoices they wrote."""
+        if self.done:
+            return 0
+        finished, _ = wait(self._running, timeout, return_when=FIRST_COMPLETED)
+        written = 0
+        for future in finished:
+            event_ids = self._running.pop(future)
+            if future.cancelled():
+                continue
+            try:
+                results = future.result()
+            except Exception as exc:
+                self.errors.append(f"Events {event_ids[0]} to {event_ids[-1]}: {exc}")
+                continue
+            for event_id, number, total in results:
+                self._manifest.write(json.dumps({'event': event_id, 'invoice': number, 'total': total}) + '\n')
+                self.invoiced += total
+                if self.put is not None:
+                    self._record(event_id, total)
+            self._manifest.flush()
+            if self.put is not None and self.flush is not None:
+                self.flush()
+            written += len(results)
+        self.written += written
+        self._submit()
+        return written
+
+    def _record(self, event_id: str, total: float) -> None:
+        """Append an invoice number and total to its event's ``invoice`` notes, keeping what is there."""
+        event = self.get_record('events', event_id)
+        if event is not None:
+            values = event.to_dict()
+            entry = f"{invoice_number(event_id)}: {total:.2f}"
+            if entry not in (values['invoice'] or ''):
+                values['invoice'] = f"{values['invoice']}; {entry}" if values['invoice'] else entry
+                self.put('events', event_id, Event.from_dict(values))
+
+    def progress(self) -> float:
+        """Return the fraction of the events invoiced, counting those a previous run finished."""
+        if self.done or not self.total:
+            return 1.0
+        return (self.skipped + self.written) / self.total
+
+    def cancel(self) -> None:
+        """Drop the chunks not yet started without waiting; keep calling ``step`` until ``done``."""
+        if self.done or self.cancelled:
+            return
+        self.cancelled = True
+        # The pool is shut down by close once the chunks already running have drained
+        for future in self._running:
+            future.cancel()
+
+    def close(self) -> None:
+        """Stop the run, waiting for the chunks already started; finished invoices stay in the manifest."""
+        if self.done:
+            return
+        self.done = True
+        self._pool.shutdown(wait=True, cancel_futures=True)
+        self._manifest.close()
@@ -0,0 +1,148 @@
+import os
+import threading
+import time
+from bisect import bisect_left
+from typing import Any, Callable, Dict, List, Optional
+
+# Upper bounds of the latency buckets in seconds: 10 microseconds doubling up to about 84 seconds.
+BUCKETS = tuple(0.00001 * 2 ** power for power in range(24))
+
+
+class Histogram:
+    """Latency histogram over fixed exponential buckets.
+
+    Percentiles are interpolated inside the bucket they fall in, which keeps recording
+    O(log buckets) and memory constant however many calls are observed.
+    """
+
+    __slots__ = ('counts', 'count', 'total', 'maximum')
+
+    def __init__(self):
+        """Create an empty histogram."""
+        self.counts = [0] * (len(BUCKETS) + 1)
+        self.count = 0
+        self.total = 0.0
+        self.maximum = 0.0
+
+    def observe(self, seconds: float) -> None:
+        """Record one duration."""
+        self.counts[bisect_left(BUCKETS, seconds)] += 1
+        self.count += 1
+        self.total += seconds
+        if seconds > self.maximum:
+            self.maximum = seconds
+
+    def percentile(self, fraction: float) -> float:
+        """Return the estimated duration below which the given fraction of calls fell."""
+        if not self.count:
+            return 0.0
+        rank = fraction * self.count
+        seen = 0
+        for index, bucket_count in enumerate(self.counts):
+            if bucket_count and seen + bucket_count >= rank:
+                lower = BUCKETS[index - 1] if index else 0.0
+                upper = BUCKETS[index] if index < len(BUCKETS) else self.maximum
+                estimate = lower + (upper - lower) * (rank - seen) / bucket_count
+                return min(estimate, self.maximum)
+            seen += bucket_count
+        return self.maximum
+
+
+class Metrics:
+    """Operation latencies, byte counters and gauges for the data paths.
+
+    Instrumented code calls ``start`` before an operation and ``stop`` after it. While
+    profiling is off ``start`` returns None and ``stop`` returns at once, so the cost is a
+    flag check per call. Profiling can be switched on and off at any time.
+    """
+
+    def __init__(self, enabled: bool = False):
+        """Create an empty registry."""
+        self.enabled = enabled
+        self.histograms: Dict[str, Histogram] = {}
+        self.counters: Dict[str, float] = {}
+        self.gauge_sources: List[Callable[[], Dict[str, float]]] = []
+        self.started = time.time()
+        self._lock = threading.Lock()
+
+    def start(self) -> Optional[float]:
+        """Return a start time for ``stop``, or None while profiling is off."""
+        return time.perf_counter() if self.enabled else None
+
+    def stop(self, operation: str, start: Optional[float]) -> None:
+        """Record the time since ``start`` against an operation."""
+        if start is None:
+            return
+        elapsed = time.perf_counter() - start
+        with self._lock:
+            histogram = self.histograms.get(operation)
+            if histogram is None:
+                histogram = self.histograms[operation] = Histogram()
+            histogram.observe(elapsed)
+
+    def add(self, counter: str, amount: float = 1) -> None:
+        """Increase a counter such as bytes_read while profiling is on."""
+        if self.enabled:
+            with self._lock:
+                self.counters[counter] = self.counters.get(counter, 0) + amount
+
+    def reset(self) -> None:
+        """Forget everything recorded so far."""
+        with self._lock:
+            self.histograms = {}
+            self.counters = {}
+            self.started = time.time()
+
+    def gauges(self) -> Dict[str, float]:
+        """Collect the current values of every registered gauge."""
+        values = {}
+        for source in self.gauge_sources:
+            values.update(source())
+        return values
+
+    def snapshot(self) -> Dict[str, Any]:
+        """Return everything recorded so far as plain values, latencies in seconds."""
+        with self._lock:
+            operations = {
+                operation: {'count': histogram.count, 'total': histogram.total, 'max': histogram.maximum,
+                            'p50': histogram.percentile(0.5), 'p90': histogram.percentile(0.9),
+                            'p99': histogram.percentile(0.99), 'buckets': list(histogram.counts)}
+                for operation, histogram in sorted(self.histograms.items())}
+            counters = dict(self.counters)
+        return {'enabled': self.enabled, 'since': self.started, 'operations': operations, 'counters': counters,
+                'gauges': self.gauges()}
+
+    def export_json(self, path: str) -> None:
+        """Write a snapshot to a JSON file."""
+        import json
+        snapshot = self.snapshot()
+        snapshot['bucket_bounds'] = list(BUCKETS)
+        with open(path, 'w', encoding='utf-8') as f:
+            json.dump(snapshot, f, indent=2)
+
+    def export_prometheus(self, path: str) -> None:
+        """Write a snapshot in the Prometheus text exposition format."""
+        snapshot = self.snapshot()
+        lines = ["# HELP ems_operation_seconds Latency of data operations.",
+                 "# TYPE ems_operation_seconds histogram"]
+        for operation, stats in snapshot['operations'].items():
+            label = f'operation="{operation}"'
+            cumulative = 0
+            for bound, bucket_count in zip(BUCKETS + (float('inf'),), stats['buckets']):
+                cumulative += bucket_count
+                le = '+Inf' if bound == float('inf') else f'{bound:g}'
+                lines.append(f'ems_operation_seconds_bucket{{{label},le="{le}"}} {cumulative}')
+            lines.append(f"ems_operation_seconds_sum{{{label}}} {stats['total']}")
+            lines.append(f"ems_operation_seconds_count{{{label}}} {stats['count']}")
+        for counter, value in sorted(snapshot['counters'].items()):
+            lines.append(f"# TYPE ems_{counter}_total counter")
+            lines.append(f"ems_{counter}_total {value}")
+        lines.append("# TYPE ems_collection_records gauge")
+        for gauge, value in sorted(snapshot['gauges'].items()):
+            lines.append(f'ems_collection_records{{collection="{gauge}"}} {value}')
+        with open(path, 'w', encoding='utf-8') as f:
+            f.write("\n".join(lines) + "\n")
+
+
+# Registry shared by the stores, the data service and the GUI; EMS_PROFILE=1 starts with profiling on.
+METRICS = Metrics(enabled=os.environ.get('EMS_PROFILE') == '1')
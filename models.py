@@ -0,0 +1,343 @@
+import re
+from datetime import datetime
+from sys import intern
+from typing import List, Any, Dict, Optional, Tuple, Union
+
+
+# Separator between the IDs of a list held in a single text field.
+LIST_SEPARATOR = ';'
+
+
+def parse_date(value: Union[str, datetime, None]) -> Optional[datetime]:
+    """Parse a YYYY-MM-DD date, passing datetimes through and treating blanks as unknown."""
+    if isinstance(value, datetime):
+        return value
+    if not value:
+        return None
+    return datetime.strptime(value, '%Y-%m-%d')
+
+
+# Bounds of an open-ended date range; strptime has no year 0, so the earliest date is in year 1.
+EARLIEST_DATE = '0001-01-01'
+LATEST_DATE = '9999-12-31'
+
+
+class Record:
+    """Base class for the domain records, giving them compact pickles and dict conversion.
+
+    Records use ``__slots__`` instead of a per-instance ``__dict__``. They pickle as a plain
+    tuple of field values, so per-record pickles do not repeat the attribute names, and
+    fields listed in ``_interned`` share one string object per distinct value.
+    """
+
+    __slots__ = ()
+    # Fields whose values repeat across records and are interned.
+    _interned: Tuple[str, ...] = ()
+    # Numeric fields and the type they are converted to when built from text.
+    _numbers: Dict[str, type] = {}
+    # Fields holding lists of IDs.
+    _lists: Tuple[str, ...] = ()
+    _field_cache: Dict[type, Tuple[str, ...]] = {}
+
+    @classmethod
+    def fields(cls) -> Tuple[str, ...]:
+        """Return the names of all slots, base classes first."""
+        names = cls._field_cache.get(cls)
+        if names is None:
+            names = tuple(name for klass in reversed(cls.__mro__) for name in klass.__dict__.get('__slots__', ()))
+            cls._field_cache[cls] = names
+        return names
+
+    def _intern_fields(self) -> None:
+        """Replace repeated string values with their interned copies."""
+        for name in self._interned:
+            value = getattr(self, name)
+            if isinstance(value, str):
+                setattr(self, name, intern(value))
+
+    def __getstate__(self) -> tuple:
+        return tuple(getattr(self, name) for name in self.fields())
+
+    def __setstate__(self, state: tuple) -> None:
+        for name, value in zip(self.fields(), state):
+            setattr(self, name, value)
+        self._intern_fields()
+
+    def __eq__(self, other: object) -> bool:
+        return type(self) is type(other) and self.__getstate__() == other.__getstate__()
+
+    def __repr__(self) -> str:
+        return f"{type(self).__name__}({', '.join(f'{name}={getattr(self, name)!r}' for name in self.fields())})"
+
+    def to_dict(self) -> Dict[str, Any]:
+        """Return the record's fields as plain values, with dates in YYYY-MM-DD form."""
+        values = {}
+        for name in self.fields():
+            value = getattr(self, name)
+            if isinstance(value, datetime):
+                value = value.strftime('%Y-%m-%d')
+            elif isinstance(value, tuple):
+                value = list(value)
+            values[name] = value
+        return values
+
+    @classmethod
+    def from_dict(cls, values: Dict[str, Any]) -> 'Record':
+        """Build a record from field values, converting text to numbers and ID lists as needed."""
+        arguments = {}
+        for name in cls.fields():
+            value = values.get(name, '')
+            if name in cls._numbers:
+                value = cls._numbers[name](value) if value not in ('', None) else 0
+            elif name in cls._lists:
+                if isinstance(value, str):
+                    value = value.split(LIST_SEPARATOR)
+                value = [str(item).strip() for item in value or () if str(item).strip()]
+            elif value is None:
+                value = ''
+            arguments[name] = value
+        return cls(**arguments)
+
+
+class Employee(Record):
+    """Represents an employee with various personal and professional details."""
+
+    __slots__ = ('name', 'employeeID', 'department', 'jobTitle', 'basicSalary', 'age', 'dateOfBirth',
+                 'passportDetails')
+    _interned = ('department', 'jobTitle')
+    _numbers = {'basicSalary': float, 'age': int}
+
+    def __init__(self, name: str, employeeID: str, department: str, jobTitle: str, basicSalary: float, age: int,
+                 dateOfBirth: str, passportDetails: str):
+        """Initialize an employee with provided attributes."""
+        self.name = name
+        self.employeeID = employeeID
+        self.department = department
+        self.jobTitle = jobTitle
+        self.basicSalary = basicSalary
+        self.age = age
+        self.dateOfBirth = parse_date(dateOfBirth)
+        self.passportDetails = passportDetails
+        self._intern_fields()
+
+    def manage_employee(self) -> str:
+        """Simulate managing subordinate employees."""
+        return f"Managing Employees under {self.name}"
+
+
+class Client(Record):
+    """Represents a client who organizes events."""
+
+    __slots__ = ('clientID', 'name', 'address', 'contactDetails', 'budget')
+    _numbers = {'budget': float}
+
+    def __init__(self, clientID: str, name: str, address: str, contactDetails: str, budget: float):
+        """Initialize a client with specified details."""
+        self.clientID = clientID
+        self.name = name
+        self.address = address
+        self.contactDetails = contactDetails
+        self.budget = budget
+
+    def update_client_info(self) -> str:
+        """Update information for the client."""
+        return f"Updated client info for {self.name}"
+
+
+class Guest(Record):
+    """Represents a guest attending an event."""
+
+    __slots__ = ('guestID', 'name', 'address', 'contactDetails')
+
+    def __init__(self, guestID: str, name: str, address: str, contactDetails: str):
+        """Initialize a guest with specified details."""
+        self.guestID = guestID
+        self.name = name
+        self.address = address
+        self.contactDetails = contactDetails
+
+    def update_guest_info(self) -> str:
+        """Update information for the guest."""
+        return f"Updated guest info for {self.name}"
+
+
+class Event(Record):
+    """Represents an event managed by the company.
+
+    The application store keeps the IDs of the client, guests and suppliers rather than the
+    records themselves, so each event pickles on its own.
+    """
+
+    __slots__ = ('eventID', 'type', 'theme', 'date', 'time', 'duration', 'venueAddress', 'client', 'guests',
+                 'suppliers', 'invoice')
+    _interned = ('type', 'theme', 'time', 'venueAddress')
+    _numbers = {'duration': float}
+    _lists = ('guests', 'suppliers')
+
+    def __init__(self, eventID: str, type: str, theme: str, date: str, time: str, duration: float, venueAddress: str,
+                 client: Union[Client, str], guests: List[Union[Guest, str]], suppliers: List[Any], invoice: str):
+        """Initialize an event with all necessary details and associations."""
+        self.eventID = eventID
+        self.type = type
+        self.theme = theme
+        self.date = parse_date(date)
+        self.time = time
+        self.duration = duration
+        self.venueAddress = venueAddress
+        self.client = client
+        self.guests = guests
+        self.suppliers = suppliers
+        self.invoice = invoice
+        self._intern_fields()
+
+    def schedule_event(self) -> str:
+        """Schedule the event according to given details."""
+        return f"Event {self.type} scheduled on {self.date}"
+
+    def update_event_details(self) -> str:
+        """Update the details of the event."""
+        return f"Updated event details for {self.eventID}"
+
+
+class Supplier(Record):
+    """Abstract base class for suppliers providing various services for events."""
+
+    __slots__ = ('supplierID', 'name', 'address', 'contactDetails')
+
+    def __init__(self, supplierID: str, name: str, address: str, contactDetails: str):
+        """Initialize a supplier with common details."""
+        self.supplierID = supplierID
+        self.name = name
+        self.address = address
+        self.contactDetails = contactDetails
+
+    def update_supplier_info(self) -> str:
+        """Update information for the supplier."""
+        return f"Updated supplier info for {self.name}"
+
+    def to_dict(self) -> Dict[str, Any]:
+        """Return the supplier's fields, including which kind of supplier it is."""
+        values = super().to_dict()
+        values['kind'] = type(self).__name__
+        return values
+
+
+class Venue(Record):
+    """Represents a venue where events are held."""
+
+    __slots__ = ('venueID', 'name', 'address', 'contact', 'minGuests', 'maxGuests')
+    _numbers = {'minGuests': int, 'maxGuests': int}
+
+    def __init__(self, venueID: str, name: str, address: str, contact: str, minGuests: int, maxGuests: int):
+        """Initialize a venue with capacity details and location."""
+        self.venueID = venueID
+        self.name = name
+        self.address = address
+        self.contact = contact
+        self.minGuests = minGuests
+        self.maxGuests = maxGuests
+
+    def update_venue_info(self) -> str:
+        """Update details about the venue."""
+        return f"Venue updated: {self.name}"
+
+
+# Derived Supplier classes
+class Caterer(Supplier):
+    """Specific supplier type for catering services at events."""
+
+    __slots__ = ('menu', 'minGuests', 'maxGuests')
+    _numbers = {'minGuests': int, 'maxGuests': int}
+
+    def __init__(self, supplierID: str, name: str, address: str, contactDetails: str, menu: str, minGuests: int,
+                 maxGuests: int):
+        """Initialize a caterer with menu and guest capacity details."""
+        super().__init__(supplierID, name, address, contactDetails)
+        self.menu = menu
+        self.minGuests = minGuests
+        self.maxGuests = maxGuests
+
+
+class Decorator(Supplier):
+    """Specific supplier type for decoration services at events."""
+    # Additional attributes or methods specific to decorators can be added here.
+    __slots__ = ()
+
+class Cleaner(Supplier):
+    """Specific supplier type for cleaning services at events."""
+    # Additional attributes or methods specific to cleaners can be added here.
+    __slots__ = ()
+
+class Entertainer(Supplier):
+    """Specific supplier type for entertainment services at events."""
+    # Additional attributes or methods specific to entertainers can be added here.
+    __slots__ = ()
+
+class FurnitureSupplier(Supplier):
+    """Specific supplier type for supplying furniture at events."""
+    # Additional attributes or methods specific to furniture suppliers can be added here.
+    __slots__ = ()
+
+
+# Record class stored in each collection and the field holding its ID.
+RECORD_TYPES = {
+    'employees': Employee,
+    'events': Event,
+    'clients': Client,
+    'guests': Guest,
+    'suppliers': Supplier,
+    'venues': Venue,
+}
+KEY_FIELDS = {
+    'employees': 'employeeID',
+    'events': 'eventID',
+    'clients': 'clientID',
+    'guests': 'guestID',
+    'suppliers': 'supplierID',
+    'venues': 'venueID',
+}
+# Collections whose records events refer to, and the event field holding the ID or IDs.
+EVENT_REFERENCES = {
+    'clients': 'client',
+    'guests': 'guests',
+    'suppliers': 'suppliers',
+}
+SUPPLIER_KINDS = {cls.__name__: cls for cls in (Supplier, Caterer, Decorator, Cleaner, Entertainer, FurnitureSupplier)}
+
+# Labels that do not follow from splitting the field name.
+_LABELS = {'client': 'Client ID', 'guests': 'Guest IDs', 'suppliers': 'Supplier IDs'}
+
+
+def field_label(field: str) -> str:
+    """Turn a field name such as 'basicSalary' into a label such as 'Basic Salary'."""
+    if field in _LABELS:
+        return _LABELS[field]
+    words = re.sub(r'(?<=[a-z])(?=[A-Z])', ' ', field)
+    return words[0].upper() + words[1:]
+
+
+def record_class(name: str, values: Dict[str, Any] = None) -> type:
+    """Return the record class for a collection, taking the supplier kind into account."""
+    if name == 'suppliers' and values is not None:
+        kind = values.get('kind') or 'Supplier'
+        if kind not in SUPPLIER_KINDS:
+            raise ValueError(f"Unknown supplier kind: {kind}")
+        return SUPPLIER_KINDS[kind]
+    return RECORD_TYPES[name]
+
+
+def record_from_dict(name: str, values: Dict[str, Any]) -> Record:
+    """Build the record stored in a collection from its field values."""
+    return record_class(name, values).from_dict(values)
+
+
+def upgrade_record(name: str, key: str, value: Any) -> Record:
+    """Convert a value saved by older versions (a bare name or an event dict) into a record."""
+    if isinstance(value, Record):
+        return value
+    if name == 'events' and isinstance(value, dict):
+        return Event(key, value.get('type', ''), value.get('theme', ''), value.get('date') or None,
+                     value.get('time', ''), value.get('duration', 0), value.get('venue_address', ''),
+                     value.get('client_id', ''), list(value.get('guest_ids', [])),
+                     list(value.get('supplier_ids', [])), value.get('invoice', ''))
+    return record_from_dict(name, {KEY_FIELDS[name]: key, 'name': str(value)})
@@ -0,0 +1,322 @@
+import itertools
+import queue
+import socket
+import threading
+import uuid
+from collections.abc import ItemsView, MutableMapping, ValuesView
+from typing import Any, Dict, Iterator, List, Optional, Tuple
+
+from indexes import BROWSE_COLUMNS
+from metrics import METRICS
+from server import REMOTE_METHODS, decode_record, read_message, send_message
+from storage import ConflictError, Store
+
+
+class ConnectionPool:
+    """Thread-safe pool of persistent connections to the data server.
+
+    Connections are opened on demand up to ``size`` and then reused, so requests from the
+    GUI, the writer thread and background loads never pay for a new TCP handshake.
+    """
+
+    def __init__(self, address: Tuple[str, int], size: int = 4, timeout: float = 30.0):
+        """Create a pool for the server at address."""
+        self.address = address
+        self.timeout = timeout
+        self._idle: 'queue.LifoQueue[Tuple[socket.socket, Any]]' = queue.LifoQueue()
+        self._slots = threading.BoundedSemaphore(size)
+        self._ids = itertools.count(1)
+        self._open: List[socket.socket] = []
+        self._lock = threading.Lock()
+
+    def _connect(self) -> Tuple[socket.socket, Any]:
+        sock = socket.create_connection(self.address, timeout=self.timeout)
+        sock.setsockopt(socket.IPPROTO_TCP, socket.TCP_NODELAY, 1)
+        with self._lock:
+            self._open.append(sock)
+        return sock, sock.makefile('rb')
+
+    def _discard(self, sock: socket.socket) -> None:
+        with self._lock:
+            if sock in self._open:
+                self._open.remove(sock)
+        sock.close()
+
+    def request(self, message: Dict[str, Any]) -> Dict[str, Any]:
+        """Send one request and wait for its reply.
+
+        A pooled connection the server has since closed is replaced once; a request that may
+        have reached the server, such as one that timed out, is never sent twice.
+        """
+        message = dict(message, id=next(self._ids))
+        with self._slots:
+            while True:
+                try:
+                    sock, reader = self._idle.get_nowait()
+                    pooled = True
+                except queue.Empty:
+                    sock, reader = self._connect()
+                    pooled = False
+                try:
+                    send_message(sock, message)
+                    reply = read_message(reader)
+                    if reply is None:
+                        raise ConnectionResetError("The data server closed the connection.")
+                except (BrokenPipeError, ConnectionResetError):
+                    self._discard(sock)
+                    if pooled:
+                        continue
+                    raise
+                except OSError:
+                    self._discard(sock)
+                    raise
+                self._idle.put((sock, reader))
+                return reply
+
+    def close(self) -> None:
+        """Close every connection."""
+        with self._lock:
+            sockets, self._open = self._open, []
+        for sock in sockets:
+            sock.close()
+
+
+class RemoteCollection(MutableMapping):
+    """Mapping view of a collection held by the data server.
+
+    Reads and writes are requests to the server; nothing is cached except the version of
+    each record last read, which is sent back with a put or delete so the server can refuse
+    it if another user changed the record meanwhile.
+    """
+
+    page_size = 1000
+
+    def __init__(self, store: 'RemoteStore', name: str):
+        """Initialize a view of the named collection."""
+        self.store = store
+        self.name = name
+        self.versions: Dict[str, int] = {}
+
+    def __getitem__(self, key: str) -> Any:
+        reply = self.store.request({'op': 'get', 'name': self.name, 'key': key})
+        self.versions[key] = reply['version']
+        if reply['value'] is None:
+            raise KeyError(key)
+        return decode_record(self.name, reply['value'])
+
+    def get(self, key: str, default: Any = None) -> Any:
+        """Return a record, or default, without replacing the version already read.
+
+        Lookups such as the old value read before a put keep the version the caller last
+        read, including one marked stale by a pushed change, so the put still conflicts.
+        Only a key read for the first time has its version noted.
+        """
+        reply = self.store.request({'op': 'get', 'name': self.name, 'key': key})
+        self.versions.setdefault(key, reply['version'])
+        if reply['value'] is None:
+            return default
+        return decode_record(self.name, reply['value'])
+
+    def __setitem__(self, key: str, value: Any) -> None:
+        reply = self.store.request({'op': 'put', 'name': self.name, 'key': key, 'value': value.to_dict(),
+                                    'expected': self.versions.get(key, 0)})
+        self.versions[key] = reply['version']
+
+    def __delitem__(self, key: str) -> None:
+        self.store.request({'op': 'delete', 'name': self.name, 'key': key, 'expected': self.versions.get(key)})
+        self.versions.pop(key, None)
+
+    def __contains__(self, key: object) -> bool:
+        return self.store.request({'op': 'contains', 'name': self.name, 'key': key})['value']
+
+    def __len__(self) -> int:
+        return self.store.request({'op': 'count', 'name': self.name})['value']
+
+    def __iter__(self) -> Iterator[str]:
+        return (key for key, _ in self.pages())
+
+    def pages(self) -> Iterator[Tuple[str, Any]]:
+        """Yield every (key, record) in key order, fetching a page of records per request."""
+        offset = 0
+        while True:
+            items = self.store.request({'op': 'page', 'name': self.name, 'offset': offset,
+                                        'limit': self.page_size})['items']
+            for key, values, version in items:
+                self.versions[key] = version
+                yield key, decode_record(self.name, values)
+            if len(items) < self.page_size:
+                return
+            offset += self.page_size
+
+    def items(self) -> ItemsView:
+        return _PagedItems(self)
+
+    def values(self) -> ValuesView:
+        return _PagedValues(self)
+
+    def update(self, other: Any = (), **kwargs: Any) -> None:
+        """Put many records in a single batched request."""
+        records = dict(other, **kwargs)
+        requests = [{'op': 'put', 'name': self.name, 'key': key, 'value': value.to_dict(),
+                     'expected': self.versions.get(key, 0)} for key, value in records.items()]
+        conflicts = []
+        for key, reply in zip(records, self.store.batch(requests)):
+            if reply.get('ok'):
+                self.versions[key] = reply['version']
+            else:
+                conflicts.append(reply['error'])
+        if conflicts:
+            raise ConflictError("\n".join(conflicts))
+
+
+class _PagedItems(ItemsView):
+    def __iter__(self) -> Iterator[Tuple[str, Any]]:
+        return self._mapping.pages()
+
+
+class _PagedValues(ValuesView):
+    def __iter__(self) -> Iterator[Any]:
+        return (value for _, value in self._mapping.pages())
+
+
+class RemoteIndex:
+    """Runs the queries of a server-side index, such as the event index or name search."""
+
+    def __init__(self, store: 'RemoteStore', target: str, name: Optional[str] = None):
+        """Initialize a proxy for one of the server's indexes."""
+        self.store = store
+        self.target = target
+        self.name = name
+
+    def __getattr__(self, method: str) -> Any:
+        if method not in REMOTE_METHODS.get(self.target, ()):
+            raise AttributeError(method)
+        return lambda *args: self.store.request({'op': 'call', 'target': self.target, 'name': self.name,
+                                                 'method': method, 'args': list(args)})['value']
+
+    def on_set(self, name: str, key: str, value: Any) -> None:
+        """The server keeps its own indexes current."""
+
+    def on_delete(self, name: str, key: str, value: Any) -> None:
+        """The server keeps its own indexes current."""
+
+
+class RemoteRows(RemoteIndex):
+    """Row source that pages through a collection browsed on the server."""
+
+    def __init__(self, store: 'RemoteStore', name: str):
+        """Initialize a row source over a server-side collection."""
+        super().__init__(store, 'rows', name)
+        self.columns = BROWSE_COLUMNS[name]
+
+    def rows(self, offset: int, limit: int, column: int = 0, descending: bool = False) -> List[tuple]:
+        """Return up to limit rows starting at offset in the requested order."""
+        return [tuple(row) for row in self.__getattr__('rows')(offset, limit, column, descending)]
+
+
+class RemoteStore(Store):
+    """Store backed by a data server shared with other app instances.
+
+    The server owns the files and persists every change itself, so ``save`` has nothing to
+    do. Changes made by other users are pushed over a dedicated connection and queued in
+    ``changes`` as (event, name, key, value, old value) for the owner to apply.
+    """
+
+    def __init__(self, host: str = '127.0.0.1', port: int = 8765, pool_size: int = 4, subscribe: bool = True):
+        """Connect to a data server."""
+        super().__init__()
+        self.client_id = uuid.uuid4().hex
+        self.pool = ConnectionPool((host, port), pool_size)
+        self.changes: 'queue.Queue[Tuple[str, str, str, Any, Any]]' = queue.Queue()
+        self._listener: Optional[socket.socket] = None
+        self.request({'op': 'hello'})
+        if subscribe:
+            self._subscribe(host, port)
+
+    def request(self, message: Dict[str, Any]) -> Dict[str, Any]:
+        """Send a request, raising ConflictError or ValueError if the server refused it."""
+        reply = self.pool.request(dict(message, client=self.client_id))
+        if not reply.get('ok'):
+            if reply.get('conflict'):
+                raise ConflictError(reply['error'])
+            raise ValueError(reply.get('error', "The data server rejected the request."))
+        return reply
+
+    def batch(self, requests: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
+        """Send several requests in one round trip and return each one's reply."""
+        return self.request({'op': 'batch', 'requests': requests})['results']
+
+    def _subscribe(self, host: str, port: int) -> None:
+        """Open the notification connection and start reading it on a daemon thread."""
+        sock = socket.create_connection((host, port))
+        reader = sock.makefile('rb')
+        send_message(sock, {'op': 'subscribe', 'client': self.client_id})
+        read_message(reader)
+        self._listener = sock
+        threading.Thread(target=self._listen, args=(reader,), name='remote-changes', daemon=True).start()
+
+    def _listen(self, reader: Any) -> None:
+        """Queue every pushed change until the connection closes."""
+        while True:
+            try:
+                message = read_message(reader)
+            except (OSError, ValueError):
+                return
+            if message is None:
+                return
+            name, key = message['name'], message['key']
+            collection = self._collections.get(name)
+            if isinstance(collection, RemoteCollection) and key in collection.versions:
+                # Our version is stale now; a later write must re-read the record first.
+                collection.versions[key] = -1
+            self.changes.put((message['event'], name, key, decode_record(name, message.get('value')),
+                              decode_record(name, message.get('old'))))
+
+    def load(self, name: str) -> RemoteCollection:
+        """Return a view of a collection on the server."""
+        return RemoteCollection(self, name)
+
+    def read_record(self, name: str, key: str) -> Any:
+        """Fetch one record from the server, noting its current version."""
+        try:
+            return self.collection(name)[key]
+        except KeyError:
+            return None
+
+    def get_record(self, name: str, key: str) -> Any:
+        """Fetch one record to show or edit; a later put expects the version read here."""
+        start = METRICS.start()
+        value = self.read_record(name, key)
+        METRICS.stop(f'get:{name}', start)
+        return value
+
+    def save(self) -> int:
+        """The server persists every change as it is made."""
+        self.dirty.clear()
+        return 0
+
+    def iter_records(self, name: str) -> Iterator[Tuple[str, Any]]:
+        """Yield the (key, value) pairs of a collection a page at a time."""
+        return self.collection(name).pages()
+
+    def event_index(self) -> RemoteIndex:
+        """Query events through the server's indexes."""
+        return RemoteIndex(self, 'event_index')
+
+    def search_index(self) -> RemoteIndex:
+        """Search names through the server's index."""
+        return RemoteIndex(self, 'search_index')
+
+    def row_source(self, name: str) -> RemoteRows:
+        """Browse a collection through the server's sort orders."""
+        return RemoteRows(self, name)
+
+    def close(self) -> None:
+        """Close the notification connection and the pool."""
+        if self._listener is not None:
+            try:
+                self._listener.shutdown(socket.SHUT_RDWR)
+            except OSError:
+                pass
+            self._listener.close()
+        self.pool.close()
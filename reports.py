@@ -0,0 +1,375 @@
+from array import array
+from datetime import datetime
+from itertools import chain, count, repeat
+from operator import attrgetter
+from typing import Any, Callable, Dict, Iterable, List, Mapping, Optional, Sequence, Tuple, Union
+
+from models import Client, Employee, Event
+
+# Report name -> (title, column headings, collections whose changes invalidate the cached result).
+REPORTS = {
+    'events_per_month': ("Events per month", ("Month", "Events", "Booked Hours"), ('events',)),
+    'venue_hours': ("Booked hours per venue", ("Venue", "Events", "Booked Hours"), ('events',)),
+    'supplier_utilization': ("Supplier utilization", ("Supplier", "Name", "Events", "Booked Hours", "Share of Events"),
+                             ('events', 'suppliers')),
+    'client_budgets': ("Budget vs. invoiced per client", ("Client", "Name", "Budget", "Invoiced", "Remaining"),
+                       ('events', 'clients')),
+    'payroll': ("Payroll by department", ("Department", "Employees", "Total Salary", "Average Salary"),
+                ('employees',)),
+}
+
+
+def _numpy() -> Any:
+    """Return the numpy module, or None when it is not installed."""
+    try:
+        import numpy
+    except ImportError:
+        return None
+    return numpy
+
+
+def invoice_amount(invoice: Any) -> float:
+    """Return the amount of an invoice written as a number such as '1,250.00' or '$300', else 0."""
+    text = str(invoice or '').strip().lstrip('$£€').replace(',', '')
+    try:
+        return float(text)
+    except ValueError:
+        return 0.0
+
+
+def month_code(date: Optional[datetime]) -> int:
+    """Turn a date into its month code (year * 12 + month - 1), or -1 when it is unknown."""
+    return date.year * 12 + date.month - 1 if date is not None else -1
+
+
+def month_label(code: int) -> str:
+    """Turn a month code (year * 12 + month - 1) into 'YYYY-MM'."""
+    return f"{code // 12:04d}-{code % 12 + 1:02d}"
+
+
+class Codes:
+    """Dictionary encoding of a text column: each distinct value gets a small integer code."""
+
+    __slots__ = ('values', '_codes')
+
+    def __init__(self):
+        """Create an empty encoding."""
+        self.values: List[Any] = []
+        self._codes: Dict[Any, int] = {}
+
+    def code(self, value: Any) -> int:
+        """Return the code of a value, assigning the next one if it is new."""
+        code = self._codes.get(value)
+        if code is None:
+            code = self._codes[value] = len(self.values)
+            self.values.append(value)
+        return code
+
+    def encode(self, values: Iterable[Any], convert: Optional[Callable[[Any], Any]] = None) -> array:
+        """Return the codes of many values at once, assigning new ones in first-seen order.
+
+        With ``convert``, each distinct value is converted once and the result is encoded.
+        """
+        values = list(values)
+        codes = {value: self.code(convert(value) if convert is not None else value) for value in dict.fromkeys(values)}
+        return array('q', list(map(codes.__getitem__, values)))
+
+    def __len__(self) -> int:
+        return len(self.values)
+
+
+class ColumnTable:
+    """One collection stored column by column in typed arrays.
+
+    Each record owns a row slot. Changing a record overwrites its slot and deleting one
+    clears its row in the ``alive`` column and frees the slot for the next insert, so the
+    table is kept current in O(1) per change and never rebuilt. The arrays are contiguous
+    machine values that numpy can view without copying.
+
+    A column is computed from the records by a function returning the column of a list of
+    records, and only when it is first read, so a report pays only for the fields it uses.
+    A column declared by an array typecode instead holds values passed in with the rows.
+    Rows added in bulk by ``extend`` get their key -> slot entries only when a row is next
+    looked up by key, since that map costs more to build than most columns.
+    """
+
+    def __init__(self, columns: Mapping[str, Union[str, Callable[[Sequence[Any]], array]]]):
+        """Create an empty table with the given column name -> function computing it, or typecode."""
+        self._compute = {name: compute for name, compute in columns.items() if callable(compute)}
+        # The columns read so far or given with the rows, by name
+        self.columns: Dict[str, array] = {name: array(typecode) for name, typecode in columns.items()
+                                          if isinstance(typecode, str)}
+        # The record in each slot; a freed slot keeps its last one until it is reused
+        self.records: List[Any] = []
+        self.alive = array('b')
+        self._slots: Dict[str, int] = {}
+        # (first slot, keys) of the rows appended by extend and not yet in _slots
+        self._unmapped: List[Tuple[int, Iterable[str]]] = []
+        self._unmapped_rows = 0
+        self._free: List[int] = []
+
+    @property
+    def slots(self) -> Dict[str, int]:
+        """Return the map from record key to row slot."""
+        for start, keys in self._unmapped:
+            self._slots.update(zip(keys, count(start)))
+        self._unmapped.clear()
+        self._unmapped_rows = 0
+        return self._slots
+
+    def column(self, name: str) -> array:
+        """Return a column, computing it from the records the first time it is read."""
+        column = self.columns.get(name)
+        if column is None:
+            column = self.columns[name] = self._compute[name](self.records)
+        return column
+
+    def extend(self, keys: Iterable[str], records: Sequence[Any], values: Mapping[str, Sequence[float]] = {}) -> None:
+        """Append the rows of many new records at once, with their keys and any given values in the same order.
+
+        ``keys`` is only iterated when the slots are next needed, so it may be a generator.
+        """
+        start = len(self.alive)
+        self.records.extend(records)
+        for name, column in self.columns.items():
+            column.extend(values[name] if name in values else self._compute[name](records))
+        self.alive.extend(array('b', [1]) * len(records))
+        self._unmapped.append((start, keys))
+        self._unmapped_rows += len(records)
+
+    def set(self, key: str, record: Any, values: Mapping[str, float] = {}) -> int:
+        """Store the row of a record with the values of any given columns and return its slot."""
+        slot = self.slots.get(key)
+        if slot is None:
+            if self._free:
+                slot = self._free.pop()
+            else:
+                slot = len(self.alive)
+                self.alive.append(0)
+                self.records.append(record)
+                for column in self.columns.values():
+                    column.append(0)
+            self.slots[key] = slot
+        self.records[slot] = record
+        for name, column in self.columns.items():
+            column[slot] = values[name] if name in values else self._compute[name]([record])[0]
+        self.alive[slot] = 1
+        return slot
+
+    def delete(self, key: str) -> None:
+        """Drop the row of a record."""
+        slot = self.slots.pop(key, None)
+        if slot is not None:
+            self.alive[slot] = 0
+            self._free.append(slot)
+
+    def __len__(self) -> int:
+        return len(self._slots) + self._unmapped_rows
+
+
+def group_totals(alive: array, codes: array, size: int, weights: Sequence[array] = ()) -> List[List[float]]:
+    """Count the live rows per code and sum each weight column per code.
+
+    Returns one list of ``size`` values for the counts and one per weight column. Uses
+    numpy's bincount over zero-copy views when numpy is installed and a single Python pass
+    otherwise.
+    """
+    numpy = _numpy()
+    if numpy is not None and len(alive):
+        mask = numpy.frombuffer(alive, dtype=numpy.int8).astype(bool)
+        keys = numpy.frombuffer(codes, dtype=numpy.int64)[mask]
+        totals = [numpy.bincount(keys, minlength=size)]
+        for weight in weights:
+            totals.append(numpy.bincount(keys, weights=numpy.frombuffer(weight, dtype=numpy.float64)[mask],
+                                         minlength=size))
+        return [total[:size].tolist() for total in totals]
+    totals = [[0] * size for _ in range(len(weights) + 1)]
+    counts = totals[0]
+    if not weights:
+        for live, code in zip(alive, codes):
+            if live:
+                counts[code] += 1
+    elif len(weights) == 1:
+        sums = totals[1]
+        for live, code, value in zip(alive, codes, weights[0]):
+            if live:
+                counts[code] += 1
+                sums[code] += value
+    else:
+        for row, (live, code) in enumerate(zip(alive, codes)):
+            if live:
+                counts[code] += 1
+                for total, weight in zip(totals[1:], weights):
+                    total[code] += weight[row]
+    return totals
+
+
+class Reports:
+    """Business reports over columnar views of the events, clients, employees and suppliers.
+
+    The views are typed-array tables kept current through the observer hooks, so a report
+    is a handful of vectorized group-bys rather than a loop over record objects. Results are
+    cached until a change touches one of the collections the report reads. Each column is
+    filled by the first report that reads it, with one C-level pass over the records that
+    converts every distinct value once; the event-supplier links are tabulated the same way
+    by the first supplier report.
+    """
+
+    def __init__(self, events: Mapping[str, Event], clients: Mapping[str, Client], employees: Mapping[str, Employee],
+                 suppliers: Mapping[str, Any]):
+        """Set up the columnar views over the current records."""
+        self.clients = clients
+        self.suppliers = suppliers
+        self._events = events
+        self.months = Codes()
+        self.venues = Codes()
+        self.client_codes = Codes()
+        self.supplier_codes = Codes()
+        self.departments = Codes()
+        self.events = ColumnTable({
+            'month': self._months, 'hours': self._hours,
+            'venue': lambda records: self.venues.encode(map(attrgetter('venueAddress'), records)),
+            'client': lambda records: self.client_codes.encode(map(attrgetter('client'), records)),
+            'invoiced': self._invoiced})
+        # One row per (event, supplier) link, keyed by event ID and position in its supplier list,
+        # whose record is the supplier ID.
+        self.bookings: Optional[ColumnTable] = None
+        self.employees = ColumnTable({
+            'department': lambda records: self.departments.encode(map(attrgetter('department'), records)),
+            'salary': lambda records: array('d', [float(employee.basicSalary or 0) for employee in records])})
+        self._cache: Dict[str, Tuple[Tuple[str, ...], List[tuple]]] = {}
+        self.events.extend(list(events), list(events.values()))
+        self.employees.extend(list(employees), list(employees.values()))
+
+    def _months(self, events: Sequence[Event]) -> array:
+        """Return the month codes of some events."""
+        return self.months.encode(map(attrgetter('date'), events), month_code)
+
+    @staticmethod
+    def _hours(events: Sequence[Event]) -> array:
+        """Return the booked hours of some events."""
+        durations = list(map(attrgetter('duration'), events))
+        hours_of = {duration: float(duration or 0) for duration in set(durations)}
+        return array('d', list(map(hours_of.__getitem__, durations)))
+
+    @staticmethod
+    def _invoiced(events: Sequence[Event]) -> array:
+        """Return the invoiced amounts of some events."""
+        invoices = list(map(attrgetter('invoice'), events))
+        amount_of = {invoice: invoice_amount(invoice) for invoice in set(invoices)}
+        return array('d', list(map(amount_of.__getitem__, invoices)))
+
+    def _booking_table(self) -> ColumnTable:
+        """Return the event-supplier links, tabulating them from the current events on first use."""
+        if self.bookings is None:
+            keys = list(self._events)
+            events = list(self._events.values())
+            suppliers = list(map(attrgetter('suppliers'), events))
+            links = list(map(len, suppliers))
+            self.bookings = ColumnTable({'supplier': self.supplier_codes.encode, 'hours': 'd'})
+            self.bookings.extend((f"{event_id}\0{position}" for event_id, event_links in zip(keys, links)
+                                  for position in range(event_links)), list(chain.from_iterable(suppliers)),
+                                 {'hours': array('d', chain.from_iterable(map(repeat, self._hours(events), links)))})
+        return self.bookings
+
+    def _add_event(self, event_id: str, event: Event) -> None:
+        """Write an event's row and its supplier links."""
+        self.events.set(event_id, event)
+        if self.bookings is not None:
+            hours = float(event.duration or 0)
+            for position, supplier_id in enumerate(event.suppliers):
+                self.bookings.set(f"{event_id}\0{position}", supplier_id, {'hours': hours})
+
+    def _remove_event(self, event_id: str) -> None:
+        """Drop an event's row and its supplier links."""
+        slot = self.events.slots.get(event_id)
+        if slot is None:
+            return
+        if self.bookings is not None:
+            for position in range(len(self.events.records[slot].suppliers)):
+                self.bookings.delete(f"{event_id}\0{position}")
+        self.events.delete(event_id)
+
+    def on_set(self, name: str, key: str, value: Any) -> None:
+        """Update the views after a record is added or replaced."""
+        if name == 'events':
+            self._remove_event(key)
+            self._add_event(key, value)
+        elif name == 'employees':
+            self.employees.set(key, value)
+        self._invalidate(name)
+
+    def on_delete(self, name: str, key: str, value: Any) -> None:
+        """Update the views after a record is removed."""
+        if name == 'events':
+            self._remove_event(key)
+        elif name == 'employees':
+            self.employees.delete(key)
+        self._invalidate(name)
+
+    def _invalidate(self, name: str) -> None:
+        """Forget the cached results of the reports that read a collection."""
+        for report in [report for report in self._cache if name in REPORTS[report][2]]:
+            del self._cache[report]
+
+    def run(self, report: str) -> Tuple[Tuple[str, ...], List[tuple]]:
+        """Return the column headings and rows of a report, computing it only if it changed."""
+        result = self._cache.get(report)
+        if result is None:
+            if report not in REPORTS:
+                raise KeyError(report)
+            compute: Callable[[], List[tuple]] = getattr(self, report)
+            result = self._cache[report] = (REPORTS[report][1], compute())
+        return result
+
+    def events_per_month(self) -> List[tuple]:
+        """Events and booked hours per calendar month, oldest first."""
+        table = self.events
+        counts, hours = group_totals(table.alive, table.column('month'), len(self.months), [table.column('hours')])
+        rows = [(month, count, total) for month, count, total in zip(self.months.values, counts, hours)
+                if count and month >= 0]
+        return [(month_label(month), int(count), round(total, 2)) for month, count, total in sorted(rows)]
+
+    def venue_hours(self) -> List[tuple]:
+        """Events and booked hours per venue address, busiest first."""
+        table = self.events
+        counts, hours = group_totals(table.alive, table.column('venue'), len(self.venues), [table.column('hours')])
+        rows = [(venue or "(none)", int(count), round(total, 2))
+                for venue, count, total in zip(self.venues.values, counts, hours) if count]
+        return sorted(rows, key=lambda row: (-row[2], row[0]))
+
+    def supplier_utilization(self) -> List[tuple]:
+        """Events, booked hours and share of all events per supplier, busiest first."""
+        table = self._booking_table()
+        counts, hours = group_totals(table.alive, table.column('supplier'), len(self.supplier_codes),
+                                     [table.column('hours')])
+        total_events = len(self.events) or 1
+        rows = []
+        for supplier_id, count, total in zip(self.supplier_codes.values, counts, hours):
+            if count:
+                supplier = self.suppliers.get(supplier_id)
+                rows.append((supplier_id, supplier.name if supplier is not None else "(missing)", int(count),
+                             round(total, 2), f"{count / total_events:.1%}"))
+        return sorted(rows, key=lambda row: (-row[3], row[0]))
+
+    def client_budgets(self) -> List[tuple]:
+        """Budget, invoiced total and remaining budget per client, most invoiced first."""
+        table = self.events
+        _, invoiced = group_totals(table.alive, table.column('client'), len(self.client_codes),
+                                   [table.column('invoiced')])
+        spent = dict(zip(self.client_codes.values, invoiced))
+        rows = []
+        for client_id, client in self.clients.items():
+            budget = float(client.budget or 0)
+            total = spent.get(client_id, 0.0)
+            rows.append((client_id, client.name, round(budget, 2), round(total, 2), round(budget - total, 2)))
+        return sorted(rows, key=lambda row: (-row[3], row[0]))
+
+    def payroll(self) -> List[tuple]:
+        """Headcount, total and average basic salary per department."""
+        table = self.employees
+        counts, salaries = group_totals(table.alive, table.column('department'), len(self.departments),
+                                        [table.column('salary')])
+        rows = [(department or "(none)", int(count), round(total, 2), round(total / count, 2))
+                for department, count, total in zip(self.departments.values, counts, salaries) if count]
+        return sorted(rows)
@@ -0,0 +1,443 @@
+from datetime import datetime, timedelta
+from typing import Any, Callable, Dict, Iterable, Iterator, List, Mapping, Optional, Set, Tuple
+
+from models import Caterer, Event, Venue
+
+# Formats accepted for an event's start time; a blank or unreadable time means midnight.
+TIME_FORMATS = ('%H:%M', '%H:%M:%S', '%I:%M %p', '%I%p', '%H')
+
+
+def event_window(event: Event) -> Optional[Tuple[datetime, datetime]]:
+    """Return the [start, end) time window an event books, or None if it has no date.
+
+    An event without a duration is taken to book the rest of its day.
+    """
+    if event.date is None:
+        return None
+    start = event.date
+    for fmt in TIME_FORMATS:
+        try:
+            parsed = datetime.strptime(str(event.time).strip().upper(), fmt)
+        except ValueError:
+            continue
+        start = start.replace(hour=parsed.hour, minute=parsed.minute, second=parsed.second)
+        break
+    if event.duration and event.duration > 0:
+        return start, start + timedelta(hours=event.duration)
+    return start, event.date + timedelta(days=1)
+
+
+class _Node:
+    """AVL tree node holding one interval and the latest end in its subtree."""
+
+    __slots__ = ('start', 'end', 'item', 'left', 'right', 'height', 'max_end')
+
+    def __init__(self, start: Any, end: Any, item: Any):
+        self.start = start
+        self.end = end
+        self.item = item
+        self.left: Optional['_Node'] = None
+        self.right: Optional['_Node'] = None
+        self.height = 1
+        self.max_end = end
+
+    @property
+    def key(self) -> tuple:
+        return self.start, self.end, self.item
+
+
+def _height(node: Optional[_Node]) -> int:
+    return node.height if node is not None else 0
+
+
+def _update(node: _Node) -> None:
+    """Recompute a node's height and subtree end after its children changed."""
+    node.height = 1 + max(_height(node.left), _height(node.right))
+    node.max_end = node.end
+    if node.left is not None and node.left.max_end > node.max_end:
+        node.max_end = node.left.max_end
+    if node.right is not None and node.right.max_end > node.max_end:
+        node.max_end = node.right.max_end
+
+
+def _rotate_right(node: _Node) -> _Node:
+    pivot = node.left
+    node.left = pivot.right
+    pivot.right = node
+    _update(node)
+    _update(pivot)
+    return pivot
+
+
+def _rotate_left(node: _Node) -> _Node:
+    pivot = node.right
+    node.right = pivot.left
+    pivot.left = node
+    _update(node)
+    _update(pivot)
+    return pivot
+
+
+def _build(nodes: List[_Node], low: int, high: int) -> Optional[_Node]:
+    """Link sorted nodes[low:high] into a balanced subtree and return its root."""
+    if low >= high:
+        return None
+    middle = (low + high) // 2
+    node = nodes[middle]
+    node.left = _build(nodes, low, middle)
+    node.right = _build(nodes, middle + 1, high)
+    _update(node)
+    return node
+
+
+def _balance(node: _Node) -> _Node:
+    """Restore the AVL height invariant at a node."""
+    _update(node)
+    skew = _height(node.left) - _height(node.right)
+    if skew > 1:
+        if _height(node.left.left) < _height(node.left.right):
+            node.left = _rotate_left(node.left)
+        return _rotate_right(node)
+    if skew < -1:
+        if _height(node.right.right) < _height(node.right.left):
+            node.right = _rotate_right(node.right)
+        return _rotate_left(node)
+    return node
+
+
+class IntervalTree:
+    """Balanced tree of half-open [start, end) intervals tagged with an item.
+
+    Nodes are ordered by start and carry the latest end in their subtree, so inserts and
+    removals take O(log n) and finding the intervals that overlap a window takes
+    O(log n + k) for k matches. Bounds can be any comparable values.
+    """
+
+    def __init__(self):
+        """Create an empty tree."""
+        self._root: Optional[_Node] = None
+        self._size = 0
+
+    @classmethod
+    def build(cls, intervals: Iterable[Tuple[Any, Any, Any]]) -> 'IntervalTree':
+        """Create a tree from many (start, end, item) intervals at once, in O(n log n)."""
+        tree = cls()
+        nodes = [_Node(start, end, item) for start, end, item in sorted(intervals)]
+        tree._root = _build(nodes, 0, len(nodes))
+        tree._size = len(nodes)
+        return tree
+
+    def __len__(self) -> int:
+        return self._size
+
+    def __iter__(self) -> Iterator[Tuple[Any, Any, Any]]:
+        """Yield (start, end, item) for every interval in start order."""
+        stack: List[_Node] = []
+        node = self._root
+        while stack or node is not None:
+            while node is not None:
+                stack.append(node)
+                node = node.left
+            node = stack.pop()
+            yield node.key
+            node = node.right
+
+    def add(self, start: Any, end: Any, item: Any) -> None:
+        """Insert an interval."""
+        self._root = self._insert(self._root, _Node(start, end, item))
+        self._size += 1
+
+    def _insert(self, node: Optional[_Node], new: _Node) -> _Node:
+        if node is None:
+            return new
+        if new.key < node.key:
+            node.left = self._insert(node.left, new)
+        else:
+            node.right = self._insert(node.right, new)
+        return _balance(node)
+
+    def remove(self, start: Any, end: Any, item: Any) -> bool:
+        """Remove an interval, returning False if it was not in the tree."""
+        size = self._size
+        self._root = self._delete(self._root, (start, end, item))
+        return self._size < size
+
+    def _delete(self, node: Optional[_Node], key: tuple) -> Optional[_Node]:
+        if node is None:
+            return None
+        if key < node.key:
+            node.left = self._delete(node.left, key)
+        elif key > node.key:
+            node.right = self._delete(node.right, key)
+        else:
+            if node.left is None or node.right is None:
+                self._size -= 1
+                return node.left if node.left is not None else node.right
+            successor = node.right
+            while successor.left is not None:
+                successor = successor.left
+            node.start, node.end, node.item = successor.start, successor.end, successor.item
+            node.right = self._delete(node.right, successor.key)
+        return _balance(node)
+
+    def overlapping(self, start: Any, end: Any) -> List[Tuple[Any, Any, Any]]:
+        """Return every interval overlapping [start, end), in start order."""
+        found: List[Tuple[Any, Any, Any]] = []
+        self._collect(self._root, start, end, found)
+        return found
+
+    def first_overlap(self, start: Any, end: Any) -> Optional[Tuple[Any, Any, Any]]:
+        """Return the earliest interval overlapping [start, end), or None, in O(log n)."""
+        node = self._root
+        while node is not None:
+            if node.left is not None and node.left.max_end > start:
+                node = node.left
+            elif node.start >= end:
+                return None
+            elif node.end > start:
+                return node.key
+            else:
+                node = node.right
+        return None
+
+    def starting_from(self, start: Any, end: Any) -> Iterator[Tuple[Any, Any, Any]]:
+        """Yield (start, end, item) for the intervals starting at or after ``start`` and ending at
+        or after ``end``, in start order.
+
+        Subtrees that end too early are skipped whole, so the first match is found in
+        O(log n) and each further one in O(log n) at most, however many intervals in between
+        end too early.
+        """
+        stack: List[_Node] = []
+        node = self._root
+        while True:
+            while node is not None and node.max_end >= end:
+                if node.start >= start:
+                    stack.append(node)
+                    node = node.left
+                else:
+                    # The node and its left subtree start too early
+                    node = node.right
+            if not stack:
+                return
+            node = stack.pop()
+            if node.end >= end:
+                yield node.key
+            node = node.right
+
+    def _collect(self, node: Optional[_Node], start: Any, end: Any, found: list) -> None:
+        if node is None or node.max_end <= start:
+            return
+        self._collect(node.left, start, end, found)
+        if node.start < end:
+            if node.end > start:
+                found.append(node.key)
+            self._collect(node.right, start, end, found)
+
+    def next_free(self, after: Any, length: Any) -> Any:
+        """Return the earliest start at or after ``after`` of a gap at least ``length`` long."""
+        start = after
+        while True:
+            overlaps = self.overlapping(start, start + length)
+            if not overlaps:
+                return start
+            start = max(end for _, end, _ in overlaps)
+
+
+class Schedule:
+    """Booked time windows per venue and per supplier, kept current as events change.
+
+    Each venue address and supplier ID has an interval tree of the events booked there, so
+    checking a new event for double bookings costs O(log n) per resource instead of a scan
+    over every event. Guest counts are checked against the capacity of the event's venue
+    and caterers.
+    """
+
+    def __init__(self, events: Mapping[str, Event], venues: Mapping[str, Venue], suppliers: Mapping[str, Any]):
+        """Build the schedule from the current events, venues and suppliers."""
+        self.venues = venues
+        self.suppliers = suppliers
+        self._venue_trees: Dict[str, IntervalTree] = {}
+        self._supplier_trees: Dict[str, IntervalTree] = {}
+        self._venue_ids: Dict[str, Set[str]] = {}
+        for event_id, event in events.items():
+            self._book(event_id, event)
+        for venue_id, venue in venues.items():
+            self._venue_ids.setdefault(venue.address, set()).add(venue_id)
+
+    def _trees(self, event: Event) -> Iterator[Tuple[Dict[str, IntervalTree], str]]:
+        """Yield the tree table and resource key of everything an event books."""
+        if event.venueAddress:
+            yield self._venue_trees, event.venueAddress
+        for supplier_id in event.suppliers:
+            yield self._supplier_trees, supplier_id
+
+    def _book(self, event_id: str, event: Event) -> None:
+        """Add an event's time window to its venue and supplier trees."""
+        window = event_window(event)
+        if window is not None:
+            for trees, resource in self._trees(event):
+                trees.setdefault(resource, IntervalTree()).add(window[0], window[1], event_id)
+
+    def _unbook(self, event_id: str, event: Event) -> None:
+        """Remove an event's time window from its venue and supplier trees."""
+        window = event_window(event)
+        if window is not None:
+            for trees, resource in self._trees(event):
+                tree = trees.get(resource)
+                if tree is not None:
+                    tree.remove(window[0], window[1], event_id)
+                    if not tree:
+                        del trees[resource]
+
+    def on_set(self, name: str, key: str, value: Any) -> None:
+        """Book an event, or index the address of a venue, that was added to the store."""
+        if name == 'events':
+            self._book(key, value)
+        elif name == 'venues':
+            self._venue_ids.setdefault(value.address, set()).add(key)
+
+    def on_delete(self, name: str, key: str, value: Any) -> None:
+        """Release an event, or forget a venue, that was removed from the store."""
+        if name == 'events':
+            self._unbook(key, value)
+        elif name == 'venues':
+            venue_ids = self._venue_ids.get(value.address)
+            if venue_ids is not None:
+                venue_ids.discard(key)
+                if not venue_ids:
+                    del self._venue_ids[value.address]
+
+    def conflicts(self, event: Event, ignore: Optional[str] = None) -> List[Tuple[str, str, str]]:
+        """Return (resource kind, resource, event ID) for each booking an event would clash with.
+
+        ``ignore`` skips the event's own booking when checking a change to an existing event.
+        """
+        window = event_window(event)
+        if window is None:
+            return []
+        clashes = []
+        for trees, resource in self._trees(event):
+            tree = trees.get(resource)
+            if tree is None:
+                continue
+            kind = 'venue' if trees is self._venue_trees else 'supplier'
+            for _, _, event_id in tree.overlapping(*window):
+                if event_id != ignore:
+                    clashes.append((kind, resource, event_id))
+        return clashes
+
+    def is_free(self, kind: str, resource: str, start: datetime, end: datetime) -> bool:
+        """Return whether a venue address or supplier ID has no booking overlapping [start, end)."""
+        tree = (self._venue_trees if kind == 'venue' else self._supplier_trees).get(resource)
+        return tree is None or tree.first_overlap(start, end) is None
+
+    def venue_for(self, address: str) -> Optional[Venue]:
+        """Return a venue at an address, if one is on record."""
+        for venue_id in sorted(self._venue_ids.get(address, ())):
+            venue = self.venues.get(venue_id)
+            if venue is not None:
+                return venue
+        return None
+
+    @staticmethod
+    def _capacity_problem(label: str, record: Any, guests: int) -> Optional[str]:
+        """Describe a guest count outside a record's capacity; a zero maximum means unlimited."""
+        if guests < record.minGuests:
+            return f"{label} needs at least {record.minGuests} guests ({guests} invited)."
+        if record.maxGuests and guests > record.maxGuests:
+            return f"{label} holds at most {record.maxGuests} guests ({guests} invited)."
+        return None
+
+    def check(self, event: Event, ignore: Optional[str] = None) -> List[str]:
+        """Return a description of every double booking and capacity problem of an event."""
+        problems = [f"{kind.capitalize()} {resource} is already booked for event {event_id}."
+                    for kind, resource, event_id in self.conflicts(event, ignore)]
+        guests = len(event.guests)
+        venue = self.venue_for(event.venueAddress)
+        if venue is not None:
+            problems.append(self._capacity_problem(f"Venue {venue.venueID}", venue, guests))
+        for supplier_id in event.suppliers:
+            supplier = self.suppliers.get(supplier_id)
+            if isinstance(supplier, Caterer):
+                problems.append(self._capacity_problem(f"Caterer {supplier_id}", supplier, guests))
+        return [problem for problem in problems if problem is not None]
+
+    def next_free_slot(self, venue_address: str, hours: float, after: datetime) -> datetime:
+        """Return the earliest time from ``after`` at which a venue is free for the given hours."""
+        tree = self._venue_trees.get(venue_address)
+        if tree is None:
+            return after
+        return tree.next_free(after, timedelta(hours=hours))
+
+
+class CapacityIndex:
+    """Guest-count ranges of venues and caterers, for finding those that fit an event.
+
+    Each collection's records are held in an interval tree as (maxGuests, -minGuests), with
+    a zero maximum meaning unlimited and sorted last. The tree is ordered by maximum and
+    knows the smallest minimum in every subtree, so the records that hold a guest count
+    come out tightest fit first without visiting the runs of records whose minimum is too
+    high; the walk stops as soon as enough have been found.
+    """
+
+    def __init__(self, venues: Mapping[str, Venue], suppliers: Mapping[str, Any]):
+        """Build the index from the current venues and caterers."""
+        self.venues = venues
+        self.suppliers = suppliers
+        self._trees: Dict[str, IntervalTree] = {
+            'venues': IntervalTree.build(self._entry(venue_id, venue) for venue_id, venue in venues.items()),
+            'suppliers': IntervalTree.build(self._entry(supplier_id, supplier)
+                                            for supplier_id, supplier in suppliers.items()
+                                            if isinstance(supplier, Caterer)),
+        }
+
+    @staticmethod
+    def _entry(key: str, record: Any) -> Tuple[float, int, str]:
+        """Return the (maximum, negated minimum, ID) interval a record is indexed by."""
+        return (record.maxGuests or float('inf')), -record.minGuests, key
+
+    @staticmethod
+    def _indexed(name: str, value: Any) -> bool:
+        return name == 'venues' or (name == 'suppliers' and isinstance(value, Caterer))
+
+    def on_set(self, name: str, key: str, value: Any) -> None:
+        """Index a venue or caterer that was added to the store."""
+        if self._indexed(name, value):
+            self._trees[name].add(*self._entry(key, value))
+
+    def on_delete(self, name: str, key: str, value: Any) -> None:
+        """Drop a venue or caterer that was removed from the store."""
+        if self._indexed(name, value):
+            self._trees[name].remove(*self._entry(key, value))
+
+    def _fitting(self, name: str, guests: int, limit: Optional[int],
+                 available: Optional[Callable[[str], bool]]) -> List[str]:
+        """Return up to limit records of a collection that fit a guest count, tightest fit first."""
+        found = []
+        # Maximum at least guests and negated minimum at least -guests
+        for _, _, key in self._trees[name].starting_from(guests, -guests):
+            if available is None or available(key):
+                found.append(key)
+                if limit is not None and len(found) >= limit:
+                    break
+        return found
+
+    def venues_for(self, guests: int, limit: Optional[int] = None, window: Optional[Tuple[datetime, datetime]] = None,
+                   schedule: Optional[Schedule] = None) -> List[str]:
+        """Return the venues that fit a guest count, tightest fit first.
+
+        With a time window and a schedule, venues already booked in that window are left out.
+        """
+        available = None
+        if window is not None and schedule is not None:
+            available = lambda venue_id: schedule.is_free('venue', self.venues[venue_id].address, *window)
+        return self._fitting('venues', guests, limit, available)
+
+    def caterers_for(self, guests: int, limit: Optional[int] = None, window: Optional[Tuple[datetime, datetime]] = None,
+                     schedule: Optional[Schedule] = None) -> List[str]:
+        """Return the caterers that fit a guest count, tightest fit first, optionally only free ones."""
+        available = None
+        if window is not None and schedule is not None:
+            available = lambda supplier_id: schedule.is_free('supplier', supplier_id, *window)
+        return self._fitting('suppliers', guests, limit, available)
@@ -0,0 +1,276 @@
+import argparse
+import json
+import socket
+import socketserver
+import threading
+from typing import Any, Dict, List, Optional, Tuple
+
+from core import DataService
+from models import Record, record_from_dict
+from storage import COLLECTIONS, ConflictError, open_store
+
+DEFAULT_PORT = 8765
+
+# Methods of the server-side indexes that clients may call through the 'call' request.
+REMOTE_METHODS = {
+    'event_index': ('between', 'for_client', 'at_venue', 'for_guest', 'for_supplier', 'referencing',
+                    'referenced_ids'),
+    'search_index': ('prefix', 'fuzzy', 'search', 'name_of'),
+    'rows': ('count', 'rows'),
+}
+
+
+def encode_record(record: Optional[Record]) -> Optional[Dict[str, Any]]:
+    """Turn a record into JSON-safe field values."""
+    return None if record is None else record.to_dict()
+
+
+def decode_record(name: str, values: Optional[Dict[str, Any]]) -> Optional[Record]:
+    """Rebuild a record of a collection from its field values."""
+    return None if values is None else record_from_dict(name, values)
+
+
+def send_message(sock: socket.socket, message: Dict[str, Any]) -> None:
+    """Send one message as a line of JSON."""
+    sock.sendall(json.dumps(message, separators=(',', ':')).encode('utf-8') + b'\n')
+
+
+def read_message(reader) -> Optional[Dict[str, Any]]:
+    """Read one line of JSON from a file-like socket reader, or None once the peer closed."""
+    line = reader.readline()
+    return json.loads(line) if line else None
+
+
+class _Handler(socketserver.StreamRequestHandler):
+    """Serves the requests of one client connection until it closes."""
+
+    def handle(self) -> None:
+        server: 'DataServer' = self.server.data_server
+        client_id = None
+        while True:
+            try:
+                message = read_message(self.rfile)
+            except (OSError, ValueError):
+                return
+            if message is None:
+                return
+            if message.get('op') == 'subscribe':
+                # From now on this connection only carries pushed change notifications.
+                server.subscribe(message.get('client'), self.request)
+                send_message(self.request, {'id': message.get('id'), 'ok': True})
+                self.rfile.read()
+                server.unsubscribe(self.request)
+                return
+            client_id = message.get('client', client_id)
+            reply = server.dispatch(message, client_id)
+            reply['id'] = message.get('id')
+            try:
+                send_message(self.request, reply)
+            except OSError:
+                return
+
+
+class _TCPServer(socketserver.ThreadingTCPServer):
+    allow_reuse_address = True
+    daemon_threads = True
+
+
+class DataServer:
+    """Owns the store and serves it to several app instances over a local socket.
+
+    Every client sends newline-delimited JSON requests over pooled, persistent connections
+    and may open one more connection to receive pushed change notifications. Requests are
+    applied one at a time under a lock, so there is a single copy of the data in memory, and
+    the changes of a request or batch are persisted together. Records carry a version number; a put or delete naming
+    the version the client last saw fails with a conflict if another client changed the
+    record in between, so updates are never silently lost.
+    """
+
+    def __init__(self, service: DataService, host: str = '127.0.0.1', port: int = DEFAULT_PORT):
+        """Serve a data service on host and port; port 0 picks a free port."""
+        self.service = service
+        self.lock = threading.RLock()
+        self.versions: Dict[Tuple[str, str], int] = {}
+        self._keys: Dict[str, List[str]] = {}
+        self._changed = False
+        self._subscribers: Dict[socket.socket, Tuple[Optional[str], threading.Lock]] = {}
+        self._tcp = _TCPServer((host, port), _Handler)
+        self._tcp.data_server = self
+        self.address = self._tcp.server_address
+        self._thread: Optional[threading.Thread] = None
+
+    def start(self) -> 'DataServer':
+        """Start serving on a background thread."""
+        self._thread = threading.Thread(target=self._tcp.serve_forever, name='data-server', daemon=True)
+        self._thread.start()
+        return self
+
+    def serve_forever(self) -> None:
+        """Serve on the calling thread until shutdown is called."""
+        self._tcp.serve_forever()
+
+    def shutdown(self) -> None:
+        """Stop a server started with ``start`` and close it."""
+        self._tcp.shutdown()
+        self.close()
+
+    def close(self) -> None:
+        """Close the listening socket, drop the subscribers and close the store."""
+        self._tcp.server_close()
+        with self.lock:
+            for sock in list(self._subscribers):
+                try:
+                    sock.shutdown(socket.SHUT_RDWR)
+                except OSError:
+                    pass
+            self._subscribers.clear()
+        self.service.close()
+
+    def subscribe(self, client_id: Optional[str], sock: socket.socket) -> None:
+        """Push every change not made by client_id to a connection."""
+        with self.lock:
+            self._subscribers[sock] = (client_id, threading.Lock())
+
+    def unsubscribe(self, sock: socket.socket) -> None:
+        """Stop pushing changes to a connection."""
+        with self.lock:
+            self._subscribers.pop(sock, None)
+
+    def _notify(self, origin: Optional[str], message: Dict[str, Any]) -> None:
+        """Push a change to every subscriber except the client that made it."""
+        for sock, (client_id, send_lock) in list(self._subscribers.items()):
+            if client_id is not None and client_id == origin:
+                continue
+            try:
+                with send_lock:
+                    send_message(sock, message)
+            except OSError:
+                self._subscribers.pop(sock, None)
+
+    def version(self, name: str, key: str) -> int:
+        """Return a record's version; records loaded from disk start at 1, missing ones are 0."""
+        version = self.versions.get((name, key))
+        if version is None:
+            version = 1 if key in getattr(self.service, name) else 0
+        return version
+
+    def dispatch(self, message: Dict[str, Any], client_id: Optional[str]) -> Dict[str, Any]:
+        """Apply one request, or a batch of them, and persist any changes once."""
+        with self.lock:
+            if message.get('op') == 'batch':
+                reply = {'ok': True, 'results': [self._apply(request, client_id) for request in message['requests']]}
+            else:
+                reply = self._apply(message, client_id)
+            if self._changed:
+                self._changed = False
+                self.service.save()
+        return reply
+
+    def _apply(self, message: Dict[str, Any], client_id: Optional[str]) -> Dict[str, Any]:
+        """Apply one request and return its reply."""
+        op = message.get('op')
+        name = message.get('name')
+        if name is not None and name not in COLLECTIONS:
+            return {'ok': False, 'error': f"Unknown collection: {name}"}
+        handler = getattr(self, f'_op_{op}', None)
+        if handler is None:
+            return {'ok': False, 'error': f"Unknown request: {op}"}
+        try:
+            return handler(message, client_id)
+        except ConflictError as exc:
+            return {'ok': False, 'conflict': True, 'error': str(exc)}
+        except (KeyError, TypeError, ValueError) as exc:
+            return {'ok': False, 'error': f"{type(exc).__name__}: {exc}"}
+
+    def _op_hello(self, message: Dict[str, Any], client_id: Optional[str]) -> Dict[str, Any]:
+        return {'ok': True}
+
+    def _op_get(self, message: Dict[str, Any], client_id: Optional[str]) -> Dict[str, Any]:
+        name, key = message['name'], message['key']
+        value = getattr(self.service, name).get(key)
+        return {'ok': True, 'value': encode_record(value), 'version': self.version(name, key)}
+
+    def _op_contains(self, message: Dict[str, Any], client_id: Optional[str]) -> Dict[str, Any]:
+        return {'ok': True, 'value': message['key'] in getattr(self.service, message['name'])}
+
+    def _op_count(self, message: Dict[str, Any], client_id: Optional[str]) -> Dict[str, Any]:
+        return {'ok': True, 'value': len(getattr(self.service, message['name']))}
+
+    def _op_page(self, message: Dict[str, Any], client_id: Optional[str]) -> Dict[str, Any]:
+        """Return records in key order starting at an offset."""
+        name = message['name']
+        keys = self._keys.get(name)
+        if keys is None:
+            keys = self._keys[name] = sorted(getattr(self.service, name))
+        offset, limit = message.get('offset', 0), message.get('limit', 1000)
+        collection = getattr(self.service, name)
+        page = [(key, collection.get(key)) for key in keys[offset:offset + limit]]
+        return {'ok': True, 'items': [[key, encode_record(value), self.version(name, key)]
+                                      for key, value in page if value is not None]}
+
+    def _check_version(self, name: str, key: str, expected: Optional[int]) -> int:
+        current = self.version(name, key)
+        if expected is not None and expected != current:
+            if expected == 0:
+                raise ConflictError(f"{key} was added to {name} by another user.")
+            raise ConflictError(f"{key} in {name} was changed by another user; reload it and try again.")
+        return current
+
+    def _op_put(self, message: Dict[str, Any], client_id: Optional[str]) -> Dict[str, Any]:
+        name, key = message['name'], message['key']
+        current = self._check_version(name, key, message.get('expected'))
+        record = decode_record(name, message['value'])
+        old = getattr(self.service, name).get(key)
+        self.service.put(name, key, record, flush=False)
+        self._changed = True
+        self.versions[(name, key)] = current + 1
+        if old is None:
+            self._keys.pop(name, None)
+        self._notify(client_id, {'event': 'set', 'name': name, 'key': key, 'value': message['value'],
+                                 'old': encode_record(old), 'version': current + 1})
+        return {'ok': True, 'version': current + 1}
+
+    def _op_delete(self, message: Dict[str, Any], client_id: Optional[str]) -> Dict[str, Any]:
+        name, key = message['name'], message['key']
+        current = self._check_version(name, key, message.get('expected'))
+        old = getattr(self.service, name)[key]
+        self.service.remove(name, key, flush=False)
+        self._changed = True
+        self.versions[(name, key)] = current + 1
+        self._keys.pop(name, None)
+        self._notify(client_id, {'event': 'delete', 'name': name, 'key': key, 'old': encode_record(old),
+                                 'version': current + 1})
+        return {'ok': True}
+
+    def _op_call(self, message: Dict[str, Any], client_id: Optional[str]) -> Dict[str, Any]:
+        """Call a whitelisted query method of a server-side index or row source."""
+        target, method = message['target'], message['method']
+        if method not in REMOTE_METHODS.get(target, ()):
+            raise ValueError(f"{target}.{method} cannot be called remotely")
+        if target == 'rows':
+            index = self.service.row_source(message['name'])
+        else:
+            index = getattr(self.service, target)
+        return {'ok': True, 'value': getattr(index, method)(*message.get('args', ()))}
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Serve the event management data to several app instances.")
+    parser.add_argument('--store', choices=['pickle', 'journal', 'sqlite'],
+                        help="store backend (default: the EMS_STORE environment variable, else pickle)")
+    parser.add_argument('--directory', default='.', help="directory holding the data files")
+    parser.add_argument('--host', default='127.0.0.1')
+    parser.add_argument('--port', type=int, default=DEFAULT_PORT)
+    args = parser.parse_args()
+    server = DataServer(DataService(open_store(args.store, args.directory)), args.host, args.port)
+    print(f"Serving {args.directory} on {server.address[0]}:{server.address[1]}")
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server.close()
+
+
+if __name__ == '__main__':
+    main()
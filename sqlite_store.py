@@ -0,0 +1,477 @@
+import sqlite3
+import threading
+from bisect import bisect_right, insort
+from typing import Any, Dict, Iterator, List, MutableMapping, Optional, Sequence, Tuple
+
+from indexes import BROWSE_COLUMNS
+from models import Record, record_from_dict
+from storage import Store
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS employees (
+    employeeID TEXT PRIMARY KEY,
+    name TEXT,
+    department TEXT,
+    jobTitle TEXT,
+    basicSalary REAL,
+    age INTEGER,
+    dateOfBirth TEXT,
+    passportDetails TEXT
+);
+CREATE INDEX IF NOT EXISTS employees_department ON employees (department, employeeID);
+CREATE INDEX IF NOT EXISTS employees_job_title ON employees (jobTitle, employeeID);
+CREATE INDEX IF NOT EXISTS employees_name ON employees (name, employeeID);
+
+CREATE TABLE IF NOT EXISTS clients (
+    clientID TEXT PRIMARY KEY,
+    name TEXT,
+    address TEXT,
+    contactDetails TEXT,
+    budget REAL
+);
+CREATE INDEX IF NOT EXISTS clients_name ON clients (name, clientID);
+CREATE INDEX IF NOT EXISTS clients_budget ON clients (budget, clientID);
+
+CREATE TABLE IF NOT EXISTS guests (
+    guestID TEXT PRIMARY KEY,
+    name TEXT,
+    address TEXT,
+    contactDetails TEXT
+);
+CREATE INDEX IF NOT EXISTS guests_name ON guests (name, guestID);
+CREATE INDEX IF NOT EXISTS guests_contact ON guests (contactDetails, guestID);
+
+CREATE TABLE IF NOT EXISTS suppliers (
+    supplierID TEXT PRIMARY KEY,
+    kind TEXT,
+    name TEXT,
+    address TEXT,
+    contactDetails TEXT,
+    menu TEXT,
+    minGuests INTEGER,
+    maxGuests INTEGER
+);
+CREATE INDEX IF NOT EXISTS suppliers_name ON suppliers (name, supplierID);
+CREATE INDEX IF NOT EXISTS suppliers_kind ON suppliers (kind, supplierID);
+
+CREATE TABLE IF NOT EXISTS venues (
+    venueID TEXT PRIMARY KEY,
+    name TEXT,
+    address TEXT,
+    contact TEXT,
+    minGuests INTEGER,
+    maxGuests INTEGER
+);
+CREATE INDEX IF NOT EXISTS venues_address ON venues (address, venueID);
+CREATE INDEX IF NOT EXISTS venues_max_guests ON venues (maxGuests, venueID);
+CREATE INDEX IF NOT EXISTS venues_name ON venues (name, venueID);
+
+CREATE TABLE IF NOT EXISTS events (
+    eventID TEXT PRIMARY KEY,
+    type TEXT,
+    theme TEXT,
+    date TEXT,
+    time TEXT,
+    duration REAL,
+    venueAddress TEXT,
+    client_id TEXT,
+    invoice TEXT
+);
+CREATE INDEX IF NOT EXISTS events_date ON events (date, eventID);
+CREATE INDEX IF NOT EXISTS events_client_id ON events (client_id, eventID);
+CREATE INDEX IF NOT EXISTS events_venue_address ON events (venueAddress, eventID);
+CREATE INDEX IF NOT EXISTS events_type ON events (type, eventID);
+
+CREATE TABLE IF NOT EXISTS event_guests (
+    eventID TEXT NOT NULL,
+    guestID TEXT NOT NULL,
+    position INTEGER NOT NULL,
+    PRIMARY KEY (eventID, guestID)
+);
+CREATE INDEX IF NOT EXISTS event_guests_guest ON event_guests (guestID);
+
+CREATE TABLE IF NOT EXISTS event_suppliers (
+    eventID TEXT NOT NULL,
+    supplierID TEXT NOT NULL,
+    position INTEGER NOT NULL,
+    PRIMARY KEY (eventID, supplierID)
+);
+CREATE INDEX IF NOT EXISTS event_suppliers_supplier ON event_suppliers (supplierID);
+"""
+
+# Primary key column of each collection's table.
+KEY_COLUMNS = {
+    'employees': 'employeeID',
+    'events': 'eventID',
+    'clients': 'clientID',
+    'guests': 'guestID',
+    'suppliers': 'supplierID',
+    'venues': 'venueID',
+}
+
+# Table columns backing each browse column.
+BROWSE_SQL_COLUMNS = {
+    'employees': ('employeeID', 'name', 'department', 'jobTitle'),
+    'events': ('eventID', 'type', 'date', 'client_id', 'venueAddress'),
+    'clients': ('clientID', 'name', 'budget'),
+    'guests': ('guestID', 'name', 'contactDetails'),
+    'suppliers': ('supplierID', 'name', 'kind'),
+    'venues': ('venueID', 'name', 'address', 'maxGuests'),
+}
+
+
+def encode_record(name: str, value: Record) -> Dict[str, Any]:
+    """Convert a record into the columns of its table; event links go to the join tables."""
+    columns = value.to_dict()
+    if name == 'events':
+        columns['client_id'] = columns.pop('client')
+        del columns['guests'], columns['suppliers']
+    return columns
+
+
+def decode_record(name: str, row: sqlite3.Row, guest_ids: List[str], supplier_ids: List[str]) -> Record:
+    """Convert a table row back into a record."""
+    values = dict(zip(row.keys(), row))
+    if name == 'events':
+        values['client'] = values.pop('client_id')
+        values['guests'] = guest_ids
+        values['suppliers'] = supplier_ids
+    return record_from_dict(name, values)
+
+
+class SQLiteCollection(MutableMapping):
+    """Dict-like view of one table; every read and write goes straight to the database."""
+
+    def __init__(self, store: 'SQLiteStore', name: str):
+        """Initialize a view over the table backing a collection."""
+        self.store = store
+        self.name = name
+        self.key_column = KEY_COLUMNS[name]
+
+    def _links(self, table: str, column: str, key: str) -> List[str]:
+        """Return the IDs linked to an event through a join table, in their original order."""
+        rows = self.store.execute(f"SELECT {column} FROM {table} WHERE eventID = ? ORDER BY position", (key,))
+        return [row[0] for row in rows]
+
+    def __getitem__(self, key: str) -> Any:
+        rows = self.store.execute(f"SELECT * FROM {self.name} WHERE {self.key_column} = ?", (key,))
+        if not rows:
+            raise KeyError(key)
+        if self.name == 'events':
+            return decode_record(self.name, rows[0], self._links('event_guests', 'guestID', key),
+                                 self._links('event_suppliers', 'supplierID', key))
+        return decode_record(self.name, rows[0], [], [])
+
+    def __setitem__(self, key: str, value: Any) -> None:
+        columns = encode_record(self.name, value)
+        columns[self.key_column] = key
+        names = ', '.join(columns)
+        placeholders = ', '.join('?' for _ in columns)
+        statements = [(f"INSERT OR REPLACE INTO {self.name} ({names}) VALUES ({placeholders})",
+                       tuple(columns.values()))]
+        if self.name == 'events':
+            statements += self._link_statements(key)
+            statements += [("INSERT INTO event_guests (eventID, guestID, position) VALUES (?, ?, ?)",
+                            (key, guest_id, position))
+                           for position, guest_id in enumerate(dict.fromkeys(value.guests))]
+            statements += [("INSERT INTO event_suppliers (eventID, supplierID, position) VALUES (?, ?, ?)",
+                            (key, supplier_id, position))
+                           for position, supplier_id in enumerate(dict.fromkeys(value.suppliers))]
+        self.store.execute_many(statements)
+
+    def _link_statements(self, key: str) -> List[Tuple[str, tuple]]:
+        """Return the statements removing an event's join table rows."""
+        return [("DELETE FROM event_guests WHERE eventID = ?", (key,)),
+                ("DELETE FROM event_suppliers WHERE eventID = ?", (key,))]
+
+    def __delitem__(self, key: str) -> None:
+        if key not in self:
+            raise KeyError(key)
+        statements = [(f"DELETE FROM {self.name} WHERE {self.key_column} = ?", (key,))]
+        if self.name == 'events':
+            statements += self._link_statements(key)
+        self.store.execute_many(statements)
+
+    def __contains__(self, key: object) -> bool:
+        rows = self.store.execute(f"SELECT 1 FROM {self.name} WHERE {self.key_column} = ?", (key,))
+        return bool(rows)
+
+    def __iter__(self) -> Iterator[str]:
+        for row in self.store.execute(f"SELECT {self.key_column} FROM {self.name} ORDER BY {self.key_column}"):
+            yield row[0]
+
+    def __len__(self) -> int:
+        return self.store.execute(f"SELECT COUNT(*) FROM {self.name}")[0][0]
+
+
+class SQLiteStore(Store):
+    """Keeps the collections in indexed SQLite tables instead of in memory.
+
+    Writes go through immediately inside an open transaction and ``save`` commits them, so
+    memory use does not grow with the size of the data and lookups use the table indexes.
+    """
+
+    def __init__(self, path: str = 'events.db'):
+        """Open or create the database at path."""
+        super().__init__()
+        self.path = path
+        self._lock = threading.RLock()
+        self.connection = sqlite3.connect(path, check_same_thread=False)
+        self.connection.row_factory = sqlite3.Row
+        self.connection.execute('PRAGMA journal_mode=WAL')
+        self.connection.executescript(SCHEMA)
+        self._pending_bytes = 0
+
+    def execute(self, sql: str, parameters: tuple = ()) -> List[sqlite3.Row]:
+        """Run a query and return all of its rows."""
+        with self._lock:
+            return self.connection.execute(sql, parameters).fetchall()
+
+    def execute_many(self, statements: List[Tuple[str, tuple]]) -> None:
+        """Run several modifying statements in the current transaction."""
+        with self._lock:
+            for sql, parameters in statements:
+                self.connection.execute(sql, parameters)
+                self._pending_bytes += sum(len(str(parameter)) for parameter in parameters)
+
+    def load(self, name: str) -> SQLiteCollection:
+        """Return the table-backed view of a collection."""
+        return SQLiteCollection(self, name)
+
+    def record_set(self, name: str, key: str, value: Any) -> None:
+        """Writes already reached the table through the collection view."""
+
+    def record_delete(self, name: str, key: str) -> None:
+        """Deletes already reached the table through the collection view."""
+
+    def save(self) -> int:
+        """Commit the open transaction and return the approximate payload size written."""
+        with self._lock:
+            self.connection.commit()
+            written, self._pending_bytes = self._pending_bytes, 0
+        self.last_save_bytes = written
+        self.total_bytes_written += written
+        return written
+
+    def iter_records(self, name: str, batch_size: int = 500) -> Iterator[Tuple[str, Any]]:
+        """Stream the records of a table in key order, a batch of rows at a time."""
+        key_column = KEY_COLUMNS[name]
+        last_key = None
+        while True:
+            if last_key is None:
+                rows = self.execute(f"SELECT * FROM {name} ORDER BY {key_column} LIMIT ?", (batch_size,))
+            else:
+                rows = self.execute(f"SELECT * FROM {name} WHERE {key_column} > ? ORDER BY {key_column} LIMIT ?",
+                                    (last_key, batch_size))
+            if not rows:
+                return
+            keys = [row[key_column] for row in rows]
+            guests = self._links_for('event_guests', 'guestID', keys) if name == 'events' else {}
+            suppliers = self._links_for('event_suppliers', 'supplierID', keys) if name == 'events' else {}
+            for key, row in zip(keys, rows):
+                yield key, decode_record(name, row, guests.get(key, []), suppliers.get(key, []))
+            last_key = keys[-1]
+
+    def _links_for(self, table: str, column: str, event_ids: Sequence[str]) -> Dict[str, List[str]]:
+        """Return the IDs linked to each of several events through a join table."""
+        placeholders = ', '.join('?' for _ in event_ids)
+        rows = self.execute(f"SELECT eventID, {column} FROM {table} WHERE eventID IN ({placeholders}) "
+                            f"ORDER BY eventID, position", tuple(event_ids))
+        links: Dict[str, List[str]] = {}
+        for event_id, linked_id in rows:
+            links.setdefault(event_id, []).append(linked_id)
+        return links
+
+    def event_index(self) -> 'SQLEventIndex':
+        """Answer event queries from the table indexes instead of building them in memory."""
+        return SQLEventIndex(self)
+
+    def row_source(self, name: str) -> 'SQLRows':
+        """Page through a table in index order instead of sorting in memory."""
+        return SQLRows(self, name)
+
+    def events_between(self, start: str, end: str) -> List[str]:
+        """Return the IDs of events dated from start to end inclusive, in date order."""
+        rows = self.execute("SELECT eventID FROM events WHERE date BETWEEN ? AND ? ORDER BY date, eventID",
+                            (start, end))
+        return [row[0] for row in rows]
+
+    def events_where(self, column: str, value: str) -> List[str]:
+        """Return the IDs of events whose indexed column equals value."""
+        if column not in ('client_id', 'venueAddress'):
+            raise ValueError(f"Events are not indexed by {column}")
+        rows = self.execute(f"SELECT eventID FROM events WHERE {column} = ? ORDER BY eventID", (value,))
+        return [row[0] for row in rows]
+
+    def events_with(self, table: str, column: str, value: str) -> List[str]:
+        """Return the IDs of events linked to a guest or supplier through a join table."""
+        if (table, column) not in (('event_guests', 'guestID'), ('event_suppliers', 'supplierID')):
+            raise ValueError(f"Unknown link table: {table}")
+        rows = self.execute(f"SELECT eventID FROM {table} WHERE {column} = ? ORDER BY eventID", (value,))
+        return [row[0] for row in rows]
+
+    def linked_ids(self, table: str, column: str) -> List[str]:
+        """Return the distinct non-empty IDs events refer to through an indexed column or link table."""
+        if (table, column) not in (('events', 'client_id'), ('event_guests', 'guestID'),
+                                   ('event_suppliers', 'supplierID')):
+            raise ValueError(f"Unknown reference column: {table}.{column}")
+        rows = self.execute(f"SELECT DISTINCT {column} FROM {table} "
+                            f"WHERE {column} IS NOT NULL AND {column} != '' ORDER BY {column}")
+        return [row[0] for row in rows]
+
+    def close(self) -> None:
+        """Commit outstanding writes and close the database."""
+        with self._lock:
+            self.connection.commit()
+            self.connection.close()
+
+
+class SQLEventIndex:
+    """EventIndex counterpart that delegates every query to the indexed SQLite tables."""
+
+    def __init__(self, store: SQLiteStore):
+        """Initialize the index over a SQLite store."""
+        self.store = store
+
+    def on_set(self, name: str, key: str, value: Any) -> None:
+        """The table indexes are maintained by SQLite."""
+
+    def on_delete(self, name: str, key: str, value: Any) -> None:
+        """The table indexes are maintained by SQLite."""
+
+    def between(self, start: str, end: str) -> List[str]:
+        """Return the events dated from start to end inclusive, in date order."""
+        return self.store.events_between(start, end)
+
+    def for_client(self, client_id: str) -> List[str]:
+        """Return the events booked by a client."""
+        return self.store.events_where('client_id', client_id)
+
+    def at_venue(self, venue_address: str) -> List[str]:
+        """Return the events held at a venue address."""
+        return self.store.events_where('venueAddress', venue_address)
+
+    def for_guest(self, guest_id: str) -> List[str]:
+        """Return the events a guest is invited to."""
+        return self.store.events_with('event_guests', 'guestID', guest_id)
+
+    def for_supplier(self, supplier_id: str) -> List[str]:
+        """Return the events a supplier is booked for."""
+        return self.store.events_with('event_suppliers', 'supplierID', supplier_id)
+
+    def referencing(self, name: str, key: str) -> List[str]:
+        """Return the events that refer to a client, guest or supplier."""
+        if name == 'clients':
+            return self.for_client(key)
+        if name == 'guests':
+            return self.for_guest(key)
+        if name == 'suppliers':
+            return self.for_supplier(key)
+        raise KeyError(name)
+
+    def referenced_ids(self, name: str) -> List[str]:
+        """Return the client, guest or supplier IDs that at least one event refers to."""
+        columns = {'clients': ('events', 'client_id'), 'guests': ('event_guests', 'guestID'),
+                   'suppliers': ('event_suppliers', 'supplierID')}
+        if name not in columns:
+            raise KeyError(name)
+        return self.store.linked_ids(*columns[name])
+
+
+class SQLRows:
+    """CollectionRows counterpart that pages through a table in index order.
+
+    Pages are read by seeking past the sort key of the row before them instead of with
+    OFFSET, whose cost grows with the scroll position. The key before each page read is
+    cached, and a jump far from any of them first caches the key before every
+    ``anchor_every``-th row on the way, each found by seeking from the one before, so a page
+    never skips more rows than that. The cached keys are dropped whenever the table changes.
+    """
+
+    anchor_every = 1000
+
+    def __init__(self, store: SQLiteStore, name: str):
+        """Initialize a row source over a table."""
+        self.store = store
+        self.name = name
+        self.columns = BROWSE_COLUMNS[name]
+        self.sql_columns = BROWSE_SQL_COLUMNS[name]
+        # (column, descending) -> {position: sort key of the row before it}, with its sorted positions
+        self._anchors: Dict[Tuple[int, bool], Dict[int, tuple]] = {}
+        self._positions: Dict[Tuple[int, bool], List[int]] = {}
+
+    def count(self) -> int:
+        """Return the number of rows."""
+        return self.store.execute(f"SELECT COUNT(*) FROM {self.name}")[0][0]
+
+    def _order_by(self, column: int, descending: bool) -> Tuple[List[str], str]:
+        """Return the columns a browse order sorts by and its ORDER BY clause."""
+        direction = 'DESC' if descending else 'ASC'
+        order = [self.sql_columns[column]] if column == 0 else [self.sql_columns[column], self.sql_columns[0]]
+        return order, ', '.join(f"{sql_column} {direction}" for sql_column in order)
+
+    def _remember(self, order: Tuple[int, bool], position: int, anchor: tuple) -> None:
+        """Cache the sort key of the row before a position."""
+        anchors = self._anchors.setdefault(order, {})
+        if position not in anchors:
+            anchors[position] = anchor
+            insort(self._positions.setdefault(order, []), position)
+
+    def _nearest(self, column: int, descending: bool, offset: int) -> Tuple[int, Optional[tuple]]:
+        """Return the closest cached position at or before offset and its anchor, or (0, None)."""
+        positions = self._positions.get((column, descending), [])
+        index = bisect_right(positions, offset)
+        if index:
+            position = positions[index - 1]
+            return position, self._anchors[(column, descending)][position]
+        return 0, None
+
+    def _seek(self, selected: List[str], column: int, descending: bool, anchor: Optional[tuple],
+              limit: int, skip: int) -> List[tuple]:
+        """Return limit rows of the selected columns, skipping some after the row with the anchor's sort key."""
+        columns, order_by = self._order_by(column, descending)
+        select = f"SELECT {', '.join(selected)} FROM {self.name} "
+        where, parameters = '', ()
+        if anchor is not None:
+            where = f"WHERE ({', '.join(columns)}) {'<' if descending else '>'} ({', '.join('?' * len(anchor))}) "
+            parameters = anchor
+            if len(columns) > 1 and descending:
+                # NULLs sort last when descending but never compare; a separate arm keeps the index usable
+                where += f"UNION ALL {select}WHERE {columns[0]} IS NULL "
+        rows = self.store.execute(f"{select}{where}ORDER BY {order_by} LIMIT ? OFFSET ?",
+                                  (*parameters, limit, skip))
+        return [tuple(row) for row in rows]
+
+    def rows(self, offset: int, limit: int, column: int = 0, descending: bool = False) -> List[tuple]:
+        """Return up to limit rows starting at offset in the requested order."""
+        order = (column, descending)
+        columns, _ = self._order_by(column, descending)
+        position, anchor = self._nearest(column, descending, offset)
+        while offset - position > self.anchor_every and (anchor is None or None not in anchor):
+            found = self._seek(columns, column, descending, anchor, 1, self.anchor_every - 1)
+            if not found:
+                break
+            position, anchor = position + self.anchor_every, found[0]
+            self._remember(order, position, anchor)
+        if anchor is not None and None in anchor:
+            # NULL compares as neither greater nor less; skip from the start instead
+            position, anchor = 0, None
+        rows = self._seek(list(self.sql_columns), column, descending, anchor, limit, offset - position)
+        if rows:
+            self._remember(order, offset + len(rows), tuple(rows[-1][self.sql_columns.index(sql_column)]
+                                                            for sql_column in columns))
+        return rows
+
+    def _changed(self, name: str) -> None:
+        """Forget the cached positions of a table whose rows changed."""
+        if name == self.name:
+            self._anchors.clear()
+            self._positions.clear()
+
+    def on_set(self, name: str, key: str, value: Any) -> None:
+        """The table indexes are maintained by SQLite; only the cached positions go stale."""
+        self._changed(name)
+
+    def on_delete(self, name: str, key: str, value: Any) -> None:
+        """The table indexes are maintained by SQLite; only the cached positions go stale."""
+        self._changed(name)
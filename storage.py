@@ -0,0 +1,617 @@
+import abc
+import hashlib
+import io
+import mmap
+import os
+import pickle
+import queue
+import struct
+import threading
+from typing import TYPE_CHECKING, Any, Dict, Iterable, Iterator, List, Mapping, MutableMapping, Optional, Set, Tuple
+
+from metrics import METRICS
+from models import Record, upgrade_record
+
+if TYPE_CHECKING:
+    from indexes import CollectionRows, EventIndex, SearchIndex
+
+# Names of the collections persisted by the application, one file per collection.
+COLLECTIONS = ('employees', 'events', 'clients', 'guests', 'suppliers', 'venues')
+
+
+class ConflictError(Exception):
+    """Raised when a record was changed by another user since it was last read."""
+
+
+def atomic_write(path: str, payload: bytes) -> int:
+    """Write payload to path through a temporary file and rename, returning the bytes written."""
+    # Imported here because tempfile is slow to import and only needed once something is saved
+    import tempfile
+    directory = os.path.dirname(os.path.abspath(path))
+    fd, tmp_path = tempfile.mkstemp(prefix='.' + os.path.basename(path) + '.', suffix='.tmp', dir=directory)
+    try:
+        with os.fdopen(fd, 'wb') as f:
+            f.write(payload)
+            f.flush()
+            os.fsync(f.fileno())
+        os.replace(tmp_path, path)
+    except BaseException:
+        try:
+            os.unlink(tmp_path)
+        except FileNotFoundError:
+            pass
+        raise
+    return len(payload)
+
+
+# Record files start with RECORD_MAGIC and a header giving the record count and the offset of
+# an index of (key hash, offset, length) entries sorted by hash. Each record is a pickled
+# (key, value) pair, so a single record can be read by binary search without unpickling the file.
+RECORD_MAGIC = b'EMSREC1\n'
+_RECORD_HEADER = struct.Struct('<QQ')
+_INDEX_ENTRY = struct.Struct('<QQI')
+
+
+def _key_hash(key: str) -> int:
+    """Return a stable 64-bit hash of a record key."""
+    return int.from_bytes(hashlib.blake2b(str(key).encode('utf-8'), digest_size=8).digest(), 'little')
+
+
+def encode_records(collection: Mapping) -> bytes:
+    """Serialize a collection into the header-indexed record format."""
+    body = io.BytesIO()
+    entries = []
+    start = len(RECORD_MAGIC) + _RECORD_HEADER.size
+    for key, value in collection.items():
+        offset = start + body.tell()
+        record = pickle.dumps((key, value), protocol=pickle.HIGHEST_PROTOCOL)
+        body.write(record)
+        entries.append((_key_hash(key), offset, len(record)))
+    entries.sort()
+    index = b''.join(_INDEX_ENTRY.pack(*entry) for entry in entries)
+    header = _RECORD_HEADER.pack(len(entries), start + body.tell())
+    return RECORD_MAGIC + header + body.getvalue() + index
+
+
+def decode_records(data: bytes) -> dict:
+    """Deserialize a record file, falling back to the plain pickled dict used by older versions."""
+    if not data.startswith(RECORD_MAGIC):
+        return pickle.loads(data)
+    count, _ = _RECORD_HEADER.unpack_from(data, len(RECORD_MAGIC))
+    stream = io.BytesIO(data)
+    stream.seek(len(RECORD_MAGIC) + _RECORD_HEADER.size)
+    collection = {}
+    for _ in range(count):
+        # Each record was pickled on its own, so each needs a fresh unpickler memo.
+        key, value = pickle.load(stream)
+        collection[key] = value
+    return collection
+
+
+def find_record(path: str, key: str) -> Tuple[bool, Any]:
+    """Look up one record in a record file through its index, returning (found, value)."""
+    try:
+        f = open(path, 'rb')
+    except FileNotFoundError:
+        return False, None
+    with f:
+        if os.fstat(f.fileno()).st_size == 0:
+            return False, None
+        with mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as data:
+            if data[:len(RECORD_MAGIC)] != RECORD_MAGIC:
+                return _find_legacy(data, key)
+            count, index_offset = _RECORD_HEADER.unpack_from(data, len(RECORD_MAGIC))
+            target = _key_hash(key)
+            low, high = 0, count
+            while low < high:
+                middle = (low + high) // 2
+                if _INDEX_ENTRY.unpack_from(data, index_offset + middle * _INDEX_ENTRY.size)[0] < target:
+                    low = middle + 1
+                else:
+                    high = middle
+            # Hash collisions are resolved by checking the key stored with each candidate record.
+            while low < count:
+                key_hash, offset, length = _INDEX_ENTRY.unpack_from(data, index_offset + low * _INDEX_ENTRY.size)
+                if key_hash != target:
+                    break
+                stored_key, value = pickle.loads(data[offset:offset + length])
+                METRICS.add('bytes_read', length)
+                if stored_key == key:
+                    return True, value
+                low += 1
+    return False, None
+
+
+def _find_legacy(data: mmap.mmap, key: str) -> Tuple[bool, Any]:
+    """Look up a record in an old plain-pickle file, which has to be read in full."""
+    collection = pickle.loads(data[:])
+    return (key in collection), collection.get(key)
+
+
+class Store(abc.ABC):
+    """Base class for the persistence backends used by the application.
+
+    A store hands out one mapping per collection and is told about every mutation through
+    ``record_set`` and ``record_delete``; ``save`` then persists whatever changed.
+    """
+
+    def __init__(self):
+        """Initialize the bookkeeping shared by all stores."""
+        self.dirty: Set[str] = set()
+        self.last_save_bytes = 0
+        self.total_bytes_written = 0
+        self._collections: Dict[str, MutableMapping] = {}
+        self._load_locks = {name: threading.Lock() for name in COLLECTIONS}
+        # Held by a batch of changes and by every save, so a save never sees only part of a batch.
+        self.batch_lock = threading.RLock()
+
+    @abc.abstractmethod
+    def load(self, name: str) -> MutableMapping:
+        """Read a collection from the backend."""
+
+    def collection(self, name: str) -> MutableMapping:
+        """Return a collection, loading it on first use and sharing it afterwards."""
+        collection = self._collections.get(name)
+        if collection is None:
+            with self._load_locks.setdefault(name, threading.Lock()):
+                collection = self._collections.get(name)
+                if collection is None:
+                    start = METRICS.start()
+                    collection = self.load(name)
+                    if isinstance(collection, dict):
+                        self._upgrade(name, collection)
+                    self._collections[name] = collection
+                    METRICS.stop(f'load:{name}', start)
+        return collection
+
+    @staticmethod
+    def _upgrade(name: str, collection: dict) -> None:
+        """Turn values saved by older versions into records, in place."""
+        for key, value in collection.items():
+            if not isinstance(value, Record):
+                collection[key] = upgrade_record(name, key, value)
+
+    def is_loaded(self, name: str) -> bool:
+        """Return whether a collection is already in memory."""
+        return name in self._collections
+
+    def load_all(self, names: Iterable[str] = COLLECTIONS) -> Dict[str, MutableMapping]:
+        """Load every named collection."""
+        return {name: self.collection(name) for name in names}
+
+    def preload(self, names: Iterable[str] = COLLECTIONS) -> threading.Thread:
+        """Load collections on a background thread so later accesses find them ready."""
+        thread = threading.Thread(target=self.load_all, args=(tuple(names),), name='store-preload', daemon=True)
+        thread.start()
+        return thread
+
+    def get_record(self, name: str, key: str) -> Any:
+        """Return one record, or None, without loading the whole collection if possible."""
+        start = METRICS.start()
+        collection = self._collections.get(name)
+        if collection is not None:
+            value = collection.get(key)
+        else:
+            value = self.read_record(name, key)
+            value = None if value is None else upgrade_record(name, key, value)
+        METRICS.stop(f'get:{name}', start)
+        return value
+
+    def read_record(self, name: str, key: str) -> Any:
+        """Read one record straight from the backend."""
+        return self.collection(name).get(key)
+
+    def mark_dirty(self, name: str) -> None:
+        """Flag a collection as changed since the last save."""
+        self.dirty.add(name)
+
+    def record_set(self, name: str, key: str, value: Any) -> None:
+        """Note that a record was added or replaced in a collection."""
+        self.mark_dirty(name)
+
+    def record_delete(self, name: str, key: str) -> None:
+        """Note that a record was removed from a collection."""
+        self.mark_dirty(name)
+
+    def begin_batch(self) -> None:
+        """Start a group of changes that must be persisted together; call ``end_batch`` after it."""
+        self.batch_lock.acquire()
+
+    def end_batch(self) -> None:
+        """Finish a group of changes started with ``begin_batch``."""
+        self.batch_lock.release()
+
+    @abc.abstractmethod
+    def save(self) -> int:
+        """Persist pending changes and return the number of bytes written."""
+
+    def iter_records(self, name: str) -> Iterator[Tuple[str, Any]]:
+        """Yield the (key, value) pairs of a collection."""
+        # dict() takes an atomic copy of the references, so callers may mutate while iterating.
+        yield from dict(self.collection(name)).items()
+
+    def event_index(self) -> 'EventIndex':
+        """Build the secondary indexes used to query events."""
+        from indexes import EventIndex
+        return EventIndex(self.collection('events'))
+
+    def search_index(self) -> 'SearchIndex':
+        """Build the name search over the searchable collections."""
+        from indexes import SEARCHABLE, SearchIndex
+        return SearchIndex({name: self.collection(name) for name in SEARCHABLE})
+
+    def row_source(self, name: str) -> 'CollectionRows':
+        """Return a source of sorted pages of a collection for browsing."""
+        from indexes import CollectionRows
+        return CollectionRows(name, self.collection(name))
+
+    def close(self) -> None:
+        """Release any resources held by the store."""
+
+
+class PickleStore(Store):
+    """Stores each collection in its own record file and rewrites only the collections marked dirty."""
+
+    def __init__(self, directory: str = '.'):
+        """Initialize a store rooted at the given directory."""
+        super().__init__()
+        self.directory = directory
+
+    def path(self, name: str) -> str:
+        """Return the file path used for a collection."""
+        return os.path.join(self.directory, f'{name}.pkl')
+
+    def load(self, name: str) -> dict:
+        """Load a single collection, returning an empty one if it has never been saved."""
+        try:
+            with open(self.path(name), 'rb') as f:
+                data = f.read()
+        except FileNotFoundError:
+            return {}
+        METRICS.add('bytes_read', len(data))
+        return decode_records(data) if data else {}
+
+    def read_record(self, name: str, key: str) -> Any:
+        """Read one record through the file index."""
+        return find_record(self.path(name), key)[1]
+
+    def save(self) -> int:
+        """Write the dirty collections atomically and return the number of bytes written."""
+        written = 0
+        for name in sorted(self.dirty):
+            # Clear the flag before copying so a change made during the write marks it dirty again.
+            self.dirty.discard(name)
+            try:
+                written += atomic_write(self.path(name), encode_records(dict(self._collections[name])))
+            except BaseException:
+                self.dirty.add(name)
+                raise
+        self.last_save_bytes = written
+        self.total_bytes_written += written
+        return written
+
+
+# Marker stored in the journal overlay for deleted records.
+_DELETED = object()
+
+_FRAME_HEADER = struct.Struct('<I')
+
+
+class JournalStore(PickleStore):
+    """Appends each mutation to a write-ahead journal and folds it into the snapshots in the background.
+
+    Snapshots use the same per-collection pickle files as PickleStore. A mutation costs one
+    small append to ``journal.log``; once the journal passes ``max_entries`` records or
+    ``max_bytes`` bytes it is rotated to ``journal.log.old`` and a compaction thread rewrites
+    the touched snapshots before removing the old journal. Loading replays both journals on
+    top of the snapshots, so a crash loses at most a partially written final record. The
+    changes of a batch are written as a single record, so replay applies all of them or none.
+    """
+
+    def __init__(self, directory: str = '.', max_entries: int = 10000, max_bytes: int = 4 * 1024 * 1024,
+                 durable: bool = False):
+        """Initialize a journaled store and replay any journal left by a previous run."""
+        super().__init__(directory)
+        self.max_entries = max_entries
+        self.max_bytes = max_bytes
+        self.durable = durable
+        self.journal_path = os.path.join(directory, 'journal.log')
+        self.old_journal_path = self.journal_path + '.old'
+        self._lock = threading.RLock()
+        self._compactor: Optional[threading.Thread] = None
+        self.compaction_error: Optional[BaseException] = None
+        # Latest journaled value per key, split into the live journal and the one being compacted.
+        self._overlay: Dict[str, Dict[str, Any]] = {}
+        self._compacting: Dict[str, Dict[str, Any]] = {}
+        # Records of the open batch, appended as one frame when the outermost batch ends.
+        self._batch: List[Tuple[str, str, str, Any]] = []
+        self._batch_depth = 0
+        self._recover()
+        self._entries = sum(len(records) for records in self._overlay.values())
+        self._log = open(self.journal_path, 'ab')
+        self._size = self._log.tell()
+        self._unsaved_bytes = 0
+
+    def _read_frames(self, path: str) -> Iterator[Tuple[str, str, str, Any]]:
+        """Yield the complete records of a journal file, stopping at a torn tail."""
+        try:
+            with open(path, 'rb') as f:
+                data = f.read()
+        except FileNotFoundError:
+            return
+        offset = 0
+        while offset + _FRAME_HEADER.size <= len(data):
+            (length,) = _FRAME_HEADER.unpack_from(data, offset)
+            start = offset + _FRAME_HEADER.size
+            if start + length > len(data):
+                break
+            try:
+                record = pickle.loads(data[start:start + length])
+            except Exception:
+                break
+            yield record
+            offset = start + length
+
+    def _recover(self) -> None:
+        """Merge an interrupted compaction's journal back into the live journal and build the overlay."""
+        records = list(self._read_frames(self.old_journal_path)) + list(self._read_frames(self.journal_path))
+        valid = b''.join(self._frame(record) for record in records)
+        size = os.path.getsize(self.journal_path) if os.path.exists(self.journal_path) else 0
+        if os.path.exists(self.old_journal_path) or size != len(valid):
+            # Also drops a torn final record so new appends stay readable.
+            atomic_write(self.journal_path, valid)
+            if os.path.exists(self.old_journal_path):
+                os.unlink(self.old_journal_path)
+        for record in records:
+            self._apply(self._overlay, record)
+
+    @staticmethod
+    def _frame(record: Tuple[str, str, str, Any]) -> bytes:
+        """Encode a journal record as a length-prefixed pickle."""
+        payload = pickle.dumps(record, protocol=pickle.HIGHEST_PROTOCOL)
+        return _FRAME_HEADER.pack(len(payload)) + payload
+
+    @classmethod
+    def _apply(cls, overlay: Dict[str, Dict[str, Any]], record: Tuple[str, str, str, Any]) -> None:
+        """Apply one journal record, or every record of a batch, to an overlay."""
+        name, op, key, value = record
+        if op == 'batch':
+            for change in value:
+                cls._apply(overlay, change)
+        else:
+            overlay.setdefault(name, {})[key] = value if op == 'set' else _DELETED
+
+    def _append(self, record: Tuple[str, str, str, Any]) -> None:
+        """Append a record to the live journal, or hold it back until the open batch ends."""
+        with self._lock:
+            if self._batch_depth:
+                self._batch.append(record)
+                self._apply(self._overlay, record)
+                return
+            self._write(self._frame(record), 1)
+            self._apply(self._overlay, record)
+
+    def _write(self, frame: bytes, entries: int) -> None:
+        """Write a frame holding ``entries`` records to the live journal."""
+        with self._lock:
+            self._log.write(frame)
+            self._log.flush()
+            if self.durable:
+                os.fsync(self._log.fileno())
+            self._entries += entries
+            self._size += len(frame)
+            self._unsaved_bytes += len(frame)
+
+    def begin_batch(self) -> None:
+        """Hold back the journal records of the following changes until ``end_batch``."""
+        super().begin_batch()
+        with self._lock:
+            self._batch_depth += 1
+
+    def end_batch(self) -> None:
+        """Append the records held back since the outermost ``begin_batch`` as one frame."""
+        try:
+            with self._lock:
+                self._batch_depth -= 1
+                if self._batch_depth == 0 and self._batch:
+                    records, self._batch = self._batch, []
+                    record = records[0] if len(records) == 1 else ('', 'batch', '', records)
+                    self._write(self._frame(record), len(records))
+        finally:
+            super().end_batch()
+
+    def record_set(self, name: str, key: str, value: Any) -> None:
+        """Journal the addition or replacement of a record."""
+        self._append((name, 'set', key, value))
+
+    def record_delete(self, name: str, key: str) -> None:
+        """Journal the removal of a record."""
+        self._append((name, 'delete', key, None))
+
+    def load(self, name: str) -> dict:
+        """Load a collection snapshot and replay the journaled changes on top of it."""
+        collection = super().load(name)
+        with self._lock:
+            layers = [self._compacting.get(name, {}), self._overlay.get(name, {})]
+        for layer in layers:
+            for key, value in layer.items():
+                if value is _DELETED:
+                    collection.pop(key, None)
+                else:
+                    collection[key] = value
+        return collection
+
+    def read_record(self, name: str, key: str) -> Any:
+        """Read one record from the journal if it changed there, otherwise from the snapshot."""
+        with self._lock:
+            layers = [self._overlay.get(name, {}), self._compacting.get(name, {})]
+        for layer in layers:
+            if key in layer:
+                value = layer[key]
+                return None if value is _DELETED else value
+        return super().read_record(name, key)
+
+    def save(self) -> int:
+        """Report the journal bytes appended since the last save and compact once a threshold is passed."""
+        with self._lock:
+            written, self._unsaved_bytes = self._unsaved_bytes, 0
+            due = self._entries >= self.max_entries or self._size >= self.max_bytes
+        self.dirty.clear()
+        self.last_save_bytes = written
+        self.total_bytes_written += written
+        if due:
+            self.compact()
+        return written
+
+    def compact(self, wait: bool = False) -> bool:
+        """Rotate the journal and rewrite the touched snapshots on a background thread.
+
+        Returns False without doing anything when a compaction is already running.
+        """
+        with self._lock:
+            names = list(self._overlay)
+        # Collections journaled by an earlier run may not have been loaded yet.
+        for name in names:
+            self.collection(name)
+        # The batch lock keeps the snapshot from catching a batch whose records are still held back.
+        with self.batch_lock, self._lock:
+            if any(name not in self._collections for name in self._overlay):
+                return False
+            if self._compactor is not None and self._compactor.is_alive():
+                return False
+            if os.path.exists(self.old_journal_path):
+                # A failed compaction left its journal behind; keep it until the next start.
+                return False
+            self._log.close()
+            os.replace(self.journal_path, self.old_journal_path)
+            self._log = open(self.journal_path, 'ab')
+            self._compacting, self._overlay = self._overlay, {}
+            self._entries = 0
+            self._size = 0
+            # dict() copies are atomic under the GIL, so the snapshot is consistent with the rotation.
+            snapshot = {name: dict(self._collections[name]) for name in self._compacting}
+            self._compactor = threading.Thread(target=self._write_snapshots, args=(snapshot,),
+                                               name='journal-compactor')
+            self._compactor.start()
+        if wait:
+            self._compactor.join()
+        return True
+
+    def _write_snapshots(self, snapshot: Dict[str, dict]) -> None:
+        """Write compacted snapshots and discard the journal they replace."""
+        try:
+            written = 0
+            for name, collection in snapshot.items():
+                written += atomic_write(self.path(name), encode_records(collection))
+            os.unlink(self.old_journal_path)
+            with self._lock:
+                self._compacting = {}
+                self.total_bytes_written += written
+        except BaseException as exc:
+            # The old journal stays on disk and is merged back on the next start.
+            self.compaction_error = exc
+
+    def close(self) -> None:
+        """Wait for a running compaction and close the journal."""
+        if self._compactor is not None:
+            self._compactor.join()
+        with self._lock:
+            self._log.close()
+
+
+# Sentinel asking the writer thread to flush once more and exit.
+_STOP = object()
+
+
+class BackgroundWriter:
+    """Runs store saves on a dedicated thread so callers never wait for disk I/O.
+
+    Flush requests arriving within ``coalesce_delay`` seconds of each other are merged into a
+    single save. The outcome of every save is queued as ``(bytes_written, error)`` for the
+    owner to collect with ``poll``.
+    """
+
+    def __init__(self, store: Store, coalesce_delay: float = 0.05):
+        """Start a writer thread for the given store."""
+        self.store = store
+        self.coalesce_delay = coalesce_delay
+        self.results: 'queue.Queue[Tuple[int, Optional[BaseException]]]' = queue.Queue()
+        self._requests: queue.Queue = queue.Queue()
+        self._thread = threading.Thread(target=self._run, name='store-writer', daemon=True)
+        self._thread.start()
+
+    def request_flush(self) -> None:
+        """Ask for pending changes to be saved soon."""
+        self._requests.put(None)
+
+    def _run(self) -> None:
+        """Wait for flush requests, merge bursts of them and save."""
+        stop = False
+        while not stop:
+            stop = self._requests.get() is _STOP
+            while not stop:
+                try:
+                    stop = self._requests.get(timeout=self.coalesce_delay) is _STOP
+                except queue.Empty:
+                    break
+            try:
+                self.results.put((timed_save(self.store), None))
+            except Exception as exc:
+                self.results.put((0, exc))
+
+    def poll(self) -> List[Tuple[int, Optional[BaseException]]]:
+        """Return the results of the saves finished since the last poll."""
+        results = []
+        while True:
+            try:
+                results.append(self.results.get_nowait())
+            except queue.Empty:
+                return results
+
+    def close(self) -> List[Tuple[int, Optional[BaseException]]]:
+        """Flush outstanding changes, stop the thread and return the remaining results."""
+        if self._thread.is_alive():
+            self._requests.put(_STOP)
+            self._thread.join()
+        return self.poll()
+
+
+def timed_save(store: Store) -> int:
+    """Save a store once any open batch ends, recording the save's latency and bytes written while profiling."""
+    start = METRICS.start()
+    with store.batch_lock:
+        written = store.save()
+    METRICS.stop('save', start)
+    METRICS.add('bytes_written', written)
+    return written
+
+
+def open_store(kind: Optional[str] = None, directory: str = '.') -> Store:
+    """Create the store selected by ``kind`` or the ``EMS_STORE`` environment variable."""
+    kind = kind or os.environ.get('EMS_STORE', 'pickle')
+    if kind == 'pickle':
+        return PickleStore(directory)
+    if kind == 'journal':
+        return JournalStore(directory)
+    if kind == 'sqlite':
+        from sqlite_store import SQLiteStore
+        return SQLiteStore(os.path.join(directory, 'events.db'))
+    if kind == 'remote':
+        # The data server owns the files; EMS_SERVER gives its host:port
+        from remote_store import RemoteStore
+        host, _, port = os.environ.get('EMS_SERVER', '127.0.0.1:8765').rpartition(':')
+        return RemoteStore(host or '127.0.0.1', int(port))
+    raise ValueError(f"Unknown store kind: {kind}")
+
+
+def copy_store(source: Store, target: Store, names: Iterable[str] = COLLECTIONS) -> int:
+    """Copy every record from one store into another, returning the number of records copied."""
+    count = 0
+    for name in names:
+        collection = target.collection(name)
+        for key, value in source.collection(name).items():
+            collection[key] = value
+            target.record_set(name, key, value)
+            count += 1
+    target.save()
+    return count
@@ -0,0 +1,80 @@
+import os
+import zlib
+
+import pytest
+
+from backup import list_snapshots, object_path, read_snapshot, restore_store
+from core import DataService
+from models import Guest
+from storage import PickleStore
+
+
+def guest(guest_id, name="Guest"):
+    return Guest(guest_id, name, "1 Road", "555")
+
+
+def open_service(directory):
+    return DataService(PickleStore(str(directory)), background_saves=False)
+
+
+def test_restore_brings_back_a_snapshot(tmp_path):
+    service = open_service(tmp_path)
+    service.put('guests', 'G1', guest('G1'))
+    service.put('guests', 'G2', guest('G2'))
+    manifest = service.backups.backup()
+    service.put('guests', 'G1', guest('G1', "Renamed"))
+    service.remove('guests', 'G2')
+    service.put('guests', 'G3', guest('G3'))
+    # Only the three records that differ from the snapshot are changed
+    assert service.backups.restore(manifest['id']) == 3
+    assert sorted(service.guests) == ['G1', 'G2']
+    assert service.guests['G1'].name == "Guest"
+    assert sorted(open_service(tmp_path).guests) == ['G1', 'G2']
+
+
+def test_a_backup_writes_only_what_changed(tmp_path):
+    service = open_service(tmp_path)
+    for number in range(200):
+        service.put('guests', f'G{number}', guest(f'G{number}'), flush=False)
+    first = service.backups.backup()
+    assert first['bytes_written'] > 0
+    second = service.backups.backup()
+    assert second['chunks_encoded'] == 0 and second['bytes_written'] == 0
+    service.put('guests', 'G7', guest('G7', "Renamed"))
+    third = service.backups.backup()
+    assert third['chunks_encoded'] == 1
+    assert [manifest['id'] for manifest in list_snapshots(service.backups.repository)] == [
+        first['id'], second['id'], third['id']]
+    assert read_snapshot(service.backups.repository, second['id'])['guests']['G7'].name == "Guest"
+
+
+def test_changes_during_a_backup_are_left_out_of_it(tmp_path):
+    service = open_service(tmp_path)
+    service.put('guests', 'G1', guest('G1'))
+    snapshot = service.backups.start()
+    service.remove('guests', 'G1')
+    service.put('guests', 'G2', guest('G2'))
+    manifest = service.backups.write(snapshot)
+    assert sorted(read_snapshot(service.backups.repository, manifest['id'])['guests']) == ['G1']
+
+
+def test_restore_store_fills_an_empty_store(tmp_path):
+    os.makedirs(tmp_path / 'data')
+    service = open_service(tmp_path / 'data')
+    service.put('guests', 'G1', guest('G1'))
+    manifest = service.backups.backup()
+    store = PickleStore(str(tmp_path / 'restored'))
+    os.makedirs(store.directory)
+    assert restore_store(service.backups.repository, manifest['id'], store) == 1
+    assert sorted(PickleStore(store.directory).load('guests')) == ['G1']
+
+
+def test_a_damaged_chunk_is_refused(tmp_path):
+    service = open_service(tmp_path)
+    service.put('guests', 'G1', guest('G1'))
+    manifest = service.backups.backup()
+    digest = next(digest for digest in manifest['collections']['guests']['chunks'] if digest)
+    with open(object_path(service.backups.repository, digest), 'wb') as f:
+        f.write(zlib.compress(b'[]'))
+    with pytest.raises(ValueError, match="damaged"):
+        read_snapshot(service.backups.repository, manifest['id'])
@@ -0,0 +1,28 @@
+from core import DataService
+from models import Guest
+from storage import PickleStore
+
+
+def test_import_saves_once_per_batch(tmp_path):
+    (tmp_path / 'source').mkdir()
+    (tmp_path / 'target').mkdir()
+    source = DataService(PickleStore(str(tmp_path / 'source')), background_saves=False)
+    for number in range(2500):
+        source.put('guests', f"G{number}", Guest(f"G{number}", f"Guest {number}", "1 Road", "555"), flush=False)
+    source.save()
+    path = str(tmp_path / 'guests.csv')
+    assert source.export_file(path, 'guests') == 2500
+    source.close()
+
+    target = DataService(PickleStore(str(tmp_path / 'target')), background_saves=False)
+    target.put('guests', 'G7', Guest('G7', "Already here", "", ""))
+    saves = []
+    save = target.store.save
+    target.store.save = lambda: saves.append(1) or save()
+    job = target.import_file(path, 'guests', batch_size=1000)
+    assert job.imported == 2499
+    assert job.errors == ["Row 8: duplicate ID G7"]
+    assert len(saves) == 3
+    assert len(target.guests) == 2500
+    assert target.guests['G2499'].name == "Guest 2499"
+    target.close()
@@ -0,0 +1,59 @@
+import json
+import os
+
+import pytest
+
+from core import DataService
+from invoicing import MANIFEST, InvoiceRun
+from models import Client, Event
+from storage import PickleStore
+
+
+@pytest.fixture
+def service(tmp_path):
+    (tmp_path / 'data').mkdir()
+    service = DataService(PickleStore(str(tmp_path / 'data')), background_saves=False)
+    service.put('clients', 'C1', Client('C1', "Ada", "1 Road", "555", 1000.0))
+    for number in range(12):
+        service.put('events', f'E{number:02}', Event(f'E{number:02}', "Wedding", "Garden", f"2026-05-{number + 1:02}",
+                                                     "12:00", 2.0, "Hall", 'C1', [], [], "paid by card" if number == 0 else ''))
+    yield service
+    service.close()
+
+
+def test_a_second_run_skips_the_invoices_already_written(service, tmp_path):
+    directory = str(tmp_path / 'invoices')
+    first = service.generate_invoices('2026-05-01', '2026-05-31', directory, workers=2, chunk_size=5)
+    assert (first.written, first.skipped, first.errors) == (12, 0, [])
+    assert first.invoiced == 12 * 150.0
+    os.remove(os.path.join(directory, 'INV-E03.txt'))
+    second = service.generate_invoices('2026-05-01', '2026-05-31', directory, workers=2, chunk_size=5)
+    assert (second.written, second.skipped) == (1, 11)
+    with open(os.path.join(directory, MANIFEST), encoding='utf-8') as f:
+        entries = [json.loads(line) for line in f]
+    assert len(entries) == 13
+    assert entries[-1] == {'event': 'E03', 'invoice': 'INV-E03', 'total': 150.0}
+
+
+def test_totals_are_only_appended_to_the_notes_when_asked(service, tmp_path):
+    service.generate_invoices('2026-05-01', '2026-05-31', str(tmp_path / 'plain'), workers=1)
+    assert service.events['E00'].invoice == "paid by card"
+    assert service.events['E01'].invoice == ''
+    service.generate_invoices('2026-05-01', '2026-05-31', str(tmp_path / 'noted'), workers=1, record_totals=True)
+    assert service.events['E00'].invoice == "paid by card; INV-E00: 150.00"
+    assert service.events['E01'].invoice == "INV-E01: 150.00"
+
+
+def test_a_cancelled_run_drains_and_can_be_finished(service, tmp_path):
+    directory = str(tmp_path / 'invoices')
+    job = InvoiceRun(sorted(service.events), directory, service.store.get_record, workers=1, chunk_size=1)
+    job.cancel()
+    while not job.done:
+        job.step()
+    assert job.cancelled and job.errors == []
+    assert job.written < job.total
+    rest = InvoiceRun(sorted(service.events), directory, service.store.get_record, workers=1, chunk_size=1)
+    while not rest.done:
+        rest.step()
+    assert rest.skipped == job.written
+    assert rest.skipped + rest.written == 12
@@ -0,0 +1,13 @@
+from core import DataService
+from models import Event
+from storage import PickleStore
+
+
+def test_open_ended_date_ranges(tmp_path):
+    service = DataService(PickleStore(str(tmp_path)), background_saves=False)
+    for event_id, date in (('E1', "0001-01-01"), ('E2', "2026-05-01"), ('E3', "9999-12-31")):
+        service.put('events', event_id, Event(event_id, "Party", "Retro", date, "18:00", 3.0, "Hall",
+                                              '', [], [], ''))
+    assert service.find_events(to_date="2026-05-01") == ['E1', 'E2']
+    assert service.find_events(from_date="2026-05-01") == ['E2', 'E3']
+    service.close()
@@ -0,0 +1,106 @@
+import pytest
+
+from core import DataService, TransactionError
+from models import Client, Event, Guest, Supplier
+from storage import JournalStore, PickleStore
+
+BACKENDS = ('pickle', 'journal', 'sqlite', 'remote')
+
+
+def open_service(kind, directory):
+    """Return a data service on a new store of the given kind and a function that closes it."""
+    if kind == 'pickle':
+        service = DataService(PickleStore(str(directory)), background_saves=False)
+        return service, service.close
+    if kind == 'journal':
+        service = DataService(JournalStore(str(directory)), background_saves=False)
+        return service, service.close
+    if kind == 'sqlite':
+        from sqlite_store import SQLiteStore
+        service = DataService(SQLiteStore(str(directory / 'events.db')), background_saves=False)
+        return service, service.close
+    from remote_store import RemoteStore
+    from server import DataServer
+    server = DataServer(DataService(PickleStore(str(directory)), background_saves=False), port=0).start()
+    service = DataService(RemoteStore(*server.address), background_saves=False)
+
+    def close():
+        service.close()
+        server.shutdown()
+    return service, close
+
+
+@pytest.fixture(params=BACKENDS)
+def service(request, tmp_path):
+    service, close = open_service(request.param, tmp_path)
+    service.put('clients', 'C1', Client('C1', "Ada", "1 Road", "555", 1000.0))
+    for guest_id in ('G1', 'G2'):
+        service.put('guests', guest_id, Guest(guest_id, f"Guest {guest_id}", "2 Road", "556"))
+    service.put('suppliers', 'S1', Supplier('S1', "Flowers", "3 Road", "557"))
+    service.put('events', 'E1', Event('E1', "Wedding", "Garden", "2026-05-01", "12:00", 4.0, "Hall",
+                                      'C1', ['G1', 'G2'], ['S1'], ''))
+    service.put('events', 'E2', Event('E2', "Party", "Retro", "2026-06-01", "18:00", 3.0, "Hall",
+                                      'C1', ['G1'], [], ''))
+    yield service
+    close()
+
+
+def test_referencing_events(service):
+    assert service.referencing_events('clients', 'C1') == ['E1', 'E2']
+    assert service.referencing_events('guests', 'G1') == ['E1', 'E2']
+    assert service.referencing_events('guests', 'G2') == ['E1']
+    assert service.referencing_events('suppliers', 'S1') == ['E1']
+    assert service.referencing_events('suppliers', 'S2') == []
+
+
+def test_nullify_removes_the_reference(service):
+    assert service.delete('guests', 'G1') == ['E1', 'E2']
+    assert 'G1' not in service.guests
+    assert service.events['E1'].guests == ['G2']
+    assert service.events['E2'].guests == []
+    assert service.referencing_events('guests', 'G1') == []
+
+
+def test_cascade_deletes_the_events(service):
+    assert service.delete('suppliers', 'S1', rule='cascade') == ['E1']
+    assert 'E1' not in service.events
+    assert 'E2' in service.events
+
+
+def test_restrict_refuses_a_used_record(service):
+    with pytest.raises(TransactionError):
+        service.delete('clients', 'C1')
+    assert 'C1' in service.clients
+
+
+def test_check_integrity_finds_missing_records(service):
+    assert service.check_integrity() == []
+    # Remove records directly, bypassing the delete rules
+    service.remove('suppliers', 'S1')
+    service.remove('guests', 'G2')
+    assert service.check_integrity() == ["guests G2 is missing but used by 1 event(s): E1",
+                                         "suppliers S1 is missing but used by 1 event(s): E1"]
+
+
+def test_replacing_an_event_moves_only_its_changed_references(service):
+    service.event_index
+    calls = []
+
+    class Recorder:
+        def on_set(self, name, key, value):
+            calls.append(('set', key))
+
+        def on_delete(self, name, key, value):
+            calls.append(('delete', key))
+
+    service.observers.append(Recorder())
+    event = service.events['E2']
+    service.put('events', 'E2', Event('E2', event.type, event.theme, "2026-07-01", event.time, event.duration,
+                                      "Barn", 'C1', ['G2'], ['S1'], ''))
+    assert service.referencing_events('guests', 'G1') == ['E1']
+    assert service.referencing_events('guests', 'G2') == ['E1', 'E2']
+    assert service.referencing_events('suppliers', 'S1') == ['E1', 'E2']
+    assert service.referencing_events('clients', 'C1') == ['E1', 'E2']
+    assert service.event_index.between("2026-06-01", "2026-07-31") == ['E2']
+    # Observers without on_replace still see a replacement as a delete and a set
+    assert calls == [('delete', 'E2'), ('set', 'E2')]
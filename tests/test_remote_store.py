@@ -0,0 +1,58 @@
+import pytest
+
+from core import DataService
+from models import Guest
+from remote_store import RemoteStore
+from server import DataServer
+from storage import ConflictError, PickleStore
+
+
+@pytest.fixture
+def clients(tmp_path):
+    """Start a data server on a free port and connect two users to it."""
+    server = DataServer(DataService(PickleStore(str(tmp_path)), background_saves=False), port=0).start()
+    first = DataService(RemoteStore(*server.address), background_saves=False)
+    second = DataService(RemoteStore(*server.address), background_saves=False)
+    first.put('guests', 'G1', Guest('G1', "Ada", "1 Road", "555"))
+    second.store.changes.get(timeout=5)
+    yield first, second
+    first.close()
+    second.close()
+    server.shutdown()
+
+
+def rename(service, name):
+    """Put guest G1 back under a new name, as an edit made after reading it."""
+    guest = service.store.get_record('guests', 'G1')
+    guest.name = name
+    return guest
+
+
+def test_stale_put_conflicts(clients):
+    first, second = clients
+    edited = rename(first, "Ada Lovelace")
+    second.put('guests', 'G1', rename(second, "Ada King"))
+    # Wait for the first user to hear of the change
+    assert first.store.changes.get(timeout=5)[2] == 'G1'
+    with pytest.raises(ConflictError):
+        first.put('guests', 'G1', edited)
+    assert second.store.get_record('guests', 'G1').name == "Ada King"
+
+
+def test_stale_delete_conflicts(clients):
+    first, second = clients
+    first.store.get_record('guests', 'G1')
+    second.put('guests', 'G1', rename(second, "Ada King"))
+    assert first.store.changes.get(timeout=5)[2] == 'G1'
+    with pytest.raises(ConflictError):
+        first.remove('guests', 'G1')
+    assert second.store.get_record('guests', 'G1') is not None
+
+
+def test_put_after_reload_succeeds(clients):
+    first, second = clients
+    rename(first, "Ada Lovelace")
+    second.put('guests', 'G1', rename(second, "Ada King"))
+    assert first.store.changes.get(timeout=5)[2] == 'G1'
+    first.put('guests', 'G1', rename(first, "Ada Lovelace"))
+    assert second.store.get_record('guests', 'G1').name == "Ada Lovelace"
@@ -0,0 +1,56 @@
+import pytest
+
+from core import DataService
+from models import Client, Decorator, Employee, Event
+from reports import REPORTS, Reports
+from storage import PickleStore
+
+
+@pytest.fixture
+def service(tmp_path):
+    service = DataService(PickleStore(str(tmp_path)), background_saves=False)
+    service.put('clients', 'C1', Client('C1', "Ada", "1 Road", "555", 1000.0))
+    service.put('clients', 'C2', Client('C2', "Bo", "2 Road", "556", 500.0))
+    service.put('suppliers', 'S1', Decorator('S1', "Flowers", "3 Road", "557"))
+    service.put('suppliers', 'S2', Decorator('S2', "Lights", "4 Road", "558"))
+    service.put('employees', 'P1', Employee("Cy", 'P1', "Sales", "Rep", 3000.0, 30, "1996-01-01", "X1"))
+    service.put('employees', 'P2', Employee("Di", 'P2', "Sales", "Lead", 5000.0, 40, "1986-01-01", "X2"))
+    service.put('events', 'E1', Event('E1', "Wedding", "Garden", "2026-05-01", "12:00", 4.0, "Hall",
+                                      'C1', [], ['S1', 'S2'], "1,250.00"))
+    service.put('events', 'E2', Event('E2', "Party", "Retro", "2026-05-20", "18:00", 3.0, "Barn",
+                                      'C2', [], ['S1'], "$300"))
+    service.put('events', 'E3', Event('E3', "Party", "Retro", "2026-06-01", "18:00", 2.5, "Hall",
+                                      'C1', [], [], "paid by card"))
+    yield service
+    service.close()
+
+
+def fresh(service):
+    return Reports(service.events, service.clients, service.employees, service.suppliers)
+
+
+def test_reports(service):
+    reports = service.reports
+    assert reports.run('events_per_month')[1] == [("2026-05", 2, 7.0), ("2026-06", 1, 2.5)]
+    assert reports.run('venue_hours')[1] == [("Hall", 2, 6.5), ("Barn", 1, 3.0)]
+    assert reports.run('supplier_utilization')[1] == [("S1", "Flowers", 2, 7.0, "66.7%"),
+                                                      ("S2", "Lights", 1, 4.0, "33.3%")]
+    assert reports.run('client_budgets')[1] == [("C1", "Ada", 1000.0, 1250.0, -250.0), ("C2", "Bo", 500.0, 300.0, 200.0)]
+    assert reports.run('payroll')[1] == [("Sales", 2, 8000.0, 4000.0)]
+
+
+@pytest.mark.parametrize('links_tabulated', [False, True])
+def test_reports_follow_changes(service, links_tabulated):
+    reports = service.reports
+    for report in REPORTS:
+        if links_tabulated or report != 'supplier_utilization':
+            reports.run(report)
+    service.put('events', 'E1', Event('E1', "Wedding", "Garden", "2026-07-01", "12:00", 5.0, "Barn",
+                                      'C2', [], ['S2'], "100"))
+    service.remove('events', 'E2')
+    service.put('events', 'E4', Event('E4', "Gala", "Gold", "2026-07-04", "20:00", 6.0, "Hall",
+                                      'C1', [], ['S1', 'S2', 'S1'], ""))
+    service.put('employees', 'P3', Employee("Ed", 'P3', "Ops", "Driver", 2000.0, 50, "1976-01-01", "X3"))
+    expected = fresh(service)
+    for report in REPORTS:
+        assert reports.run(report) == expected.run(report)
@@ -0,0 +1,71 @@
+import random
+from datetime import datetime
+
+from models import Caterer, Venue
+from scheduling import CapacityIndex, IntervalTree
+
+
+def fitting(records, guests):
+    """Return the IDs of the records that hold a guest count, tightest fit first, by brute force."""
+    fits = [((record.maxGuests or float('inf')), -record.minGuests, key) for key, record in records.items()
+            if record.minGuests <= guests and (not record.maxGuests or guests <= record.maxGuests)]
+    return [key for _, _, key in sorted(fits)]
+
+
+def random_venues(count, seed=1):
+    rng = random.Random(seed)
+    venues = {}
+    for number in range(count):
+        minimum = rng.randint(0, 200)
+        maximum = rng.choice([0, minimum + rng.randint(0, 200)])
+        venues[f"V{number}"] = Venue(f"V{number}", "Hall", f"{number} Road", "555", minimum, maximum)
+    return venues
+
+
+def test_venues_for_matches_a_scan():
+    venues = random_venues(2000)
+    index = CapacityIndex(venues, {})
+    for guests in (0, 1, 50, 199, 200, 350, 1000):
+        assert index.venues_for(guests) == fitting(venues, guests)
+        assert index.venues_for(guests, limit=5) == fitting(venues, guests)[:5]
+
+
+def test_index_follows_changes():
+    venues = random_venues(500)
+    index = CapacityIndex(venues, {})
+    for key in list(venues)[:100]:
+        index.on_delete('venues', key, venues.pop(key))
+    for number in range(500, 600):
+        venue = Venue(f"V{number}", "Hall", "Road", "555", 10, 20)
+        venues[venue.venueID] = venue
+        index.on_set('venues', venue.venueID, venue)
+    for guests in (5, 15, 150):
+        assert index.venues_for(guests) == fitting(venues, guests)
+
+
+class BusySchedule:
+    """Stands in for a Schedule in which some suppliers are booked."""
+
+    def __init__(self, busy):
+        self.busy = busy
+
+    def is_free(self, kind, resource, start, end):
+        return resource not in self.busy
+
+
+def test_caterers_for_skips_other_suppliers_and_busy_ones():
+    caterers = {f"S{number}": Caterer(f"S{number}", "Food", "Road", "555", "Menu", number, number + 10)
+                for number in range(20)}
+    index = CapacityIndex({}, caterers)
+    assert index.caterers_for(12) == ['S2', 'S3', 'S4', 'S5', 'S6', 'S7', 'S8', 'S9', 'S10', 'S11', 'S12']
+    window = (datetime(2026, 5, 1, 12), datetime(2026, 5, 1, 16))
+    assert index.caterers_for(12, 3, window, BusySchedule({'S2', 'S5'})) == ['S3', 'S4', 'S6']
+
+
+def test_starting_from_matches_a_scan():
+    rng = random.Random(2)
+    intervals = [(rng.randint(0, 50), rng.randint(-50, 0), number) for number in range(300)]
+    tree = IntervalTree.build(intervals)
+    for start, end in ((0, -50), (10, -20), (25, -5), (51, 0)):
+        expected = sorted(interval for interval in intervals if interval[0] >= start and interval[1] >= end)
+        assert list(tree.starting_from(start, end)) == expected
@@ -0,0 +1,49 @@
+import pytest
+
+from indexes import SearchIndex
+from models import Guest, Supplier
+
+
+@pytest.fixture(scope='module')
+def index():
+    """An index over guests named like the benchmark's generated data."""
+    return SearchIndex({'guests': {f"G{n}": f"Guest {n}" for n in range(100000)}})
+
+
+def guests(*numbers):
+    return [('guests', f"G{number}") for number in numbers]
+
+
+def test_prefix_matches_every_query_word(index):
+    assert index.search("Guest 4821") == guests(4821, *range(48210, 48220))
+    assert index.search("guest 4821", limit=3) == guests(4821, 48210, 48211)
+    assert index.search("Guest 99999") == guests(99999)
+
+
+def test_fuzzy_only_when_no_prefix_match(index):
+    assert index.search("Gust 12345")[0] == ('guests', 'G12345')
+    assert index.search("Gest 4821")[0] == ('guests', 'G4821')
+    assert index.search("Guest 12345") == guests(12345)
+    assert index.search("Zebra") == []
+
+
+def test_fuzzy_ranks_closest_names_first():
+    index = SearchIndex({'guests': {'G1': Guest('G1', "Maria Lopez", "", ""),
+                                    'G2': Guest('G2', "Mario Lopez", "", ""),
+                                    'G3': Guest('G3', "Maria Perez", "", "")},
+                         'suppliers': {'S1': Supplier('S1', "Lopez Catering", "", "")}})
+    assert index.fuzzy("Maria Lopes") == [('guests', 'G1'), ('guests', 'G2')]
+    assert index.fuzzy("Lopes") == [('suppliers', 'S1'), ('guests', 'G1'), ('guests', 'G2')]
+
+
+def test_index_follows_changes():
+    index = SearchIndex()
+    index.on_set('guests', 'G1', Guest('G1', "Ada Lovelace", "", ""))
+    index.on_set('guests', 'G2', Guest('G2', "Alan Turing", "", ""))
+    assert index.search("ada") == [('guests', 'G1')]
+    assert index.search("Lovelase") == [('guests', 'G1')]
+    index.on_delete('guests', 'G1', Guest('G1', "Ada Lovelace", "", ""))
+    assert index.search("ada") == []
+    assert index.search("Lovelase") == []
+    assert index.search("Turin") == [('guests', 'G2')]
+    assert len(index) == 1
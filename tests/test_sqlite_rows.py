@@ -0,0 +1,43 @@
+import pytest
+
+from core import DataService
+from models import Client
+
+
+@pytest.fixture
+def service(tmp_path):
+    from sqlite_store import SQLiteStore
+    service = DataService(SQLiteStore(str(tmp_path / 'events.db')), background_saves=False)
+    for number in range(60):
+        budget = None if number % 11 == 0 else float(number % 7)
+        service.put('clients', f'C{number:02}', Client(f'C{number:02}', f"Client {number % 5}", "1 Road", "555", budget))
+    yield service
+    service.close()
+
+
+def expected(service, column, descending):
+    rows = service.row_source('clients')
+    _, order_by = rows._order_by(column, descending)
+    return [tuple(row) for row in service.store.execute(
+        f"SELECT {', '.join(rows.sql_columns)} FROM clients ORDER BY {order_by}")]
+
+
+@pytest.mark.parametrize('column', [0, 1, 2])
+@pytest.mark.parametrize('descending', [False, True])
+def test_pages_match_a_full_scan(service, column, descending):
+    rows = service.row_source('clients')
+    rows.anchor_every = 4
+    everything = expected(service, column, descending)
+    for offset in (0, 5, 45, 50, 40, 3, 57, 10):
+        assert rows.rows(offset, 5, column, descending) == everything[offset:offset + 5]
+
+
+def test_pages_follow_changes(service):
+    rows = service.row_source('clients')
+    rows.anchor_every = 4
+    rows.rows(30, 5, 1)
+    service.delete('clients', 'C00')
+    service.put('clients', 'C99', Client('C99', "Client 0", "1 Road", "555", 3.0))
+    everything = expected(service, 1, False)
+    assert rows.rows(30, 5, 1) == everything[30:35]
+    assert rows.rows(55, 5, 1) == everything[55:]
@@ -0,0 +1,93 @@
+import os
+
+import pytest
+
+from core import DataService
+from models import Guest
+from storage import JournalStore, PickleStore, Store
+
+
+def test_store_requires_load_and_save():
+    with pytest.raises(TypeError):
+        Store()
+
+    class LoadOnly(Store):
+        def load(self, name):
+            return {}
+
+    with pytest.raises(TypeError):
+        LoadOnly()
+
+
+def guest(guest_id, name="Guest"):
+    return Guest(guest_id, name, "1 Road", "555")
+
+
+def open_journal(directory, **options):
+    return DataService(JournalStore(str(directory), **options), background_saves=False)
+
+
+def test_journal_compacts_into_the_snapshots(tmp_path):
+    service = open_journal(tmp_path, max_entries=5)
+    for number in range(4):
+        service.put('guests', f'G{number}', guest(f'G{number}'))
+    # The fifth change passes max_entries and the save after it starts a compaction
+    service.remove('guests', 'G0')
+    service.put('guests', 'G1', guest('G1', "Renamed"))
+    service.store.close()
+    assert not os.path.exists(service.store.old_journal_path)
+    assert [record[:3] for record in service.store._read_frames(service.store.journal_path)] == [
+        ('guests', 'set', 'G1')]
+    snapshot = PickleStore(str(tmp_path)).load('guests')
+    assert sorted(snapshot) == ['G1', 'G2', 'G3']
+    assert snapshot['G1'].name == "Guest"
+    reopened = open_journal(tmp_path)
+    assert sorted(reopened.guests) == ['G1', 'G2', 'G3']
+    assert reopened.guests['G1'].name == "Renamed"
+    reopened.close()
+
+
+def test_changes_during_a_compaction_stay_in_the_journal(tmp_path):
+    service = open_journal(tmp_path)
+    service.put('guests', 'G1', guest('G1'))
+    assert service.store.compact()
+    service.put('guests', 'G2', guest('G2'))
+    service.remove('guests', 'G1')
+    service.close()
+    reopened = open_journal(tmp_path)
+    assert sorted(reopened.guests) == ['G2']
+    reopened.close()
+
+
+def test_an_interrupted_compaction_is_merged_back_on_start(tmp_path):
+    service = open_journal(tmp_path)
+    service.put('guests', 'G1', guest('G1'))
+    service.put('guests', 'G2', guest('G2'))
+    service.close()
+    # A compaction that rotated the journal but never wrote the snapshots
+    os.replace(tmp_path / 'journal.log', tmp_path / 'journal.log.old')
+    service = open_journal(tmp_path)
+    service.remove('guests', 'G1')
+    service.close()
+    reopened = open_journal(tmp_path)
+    assert sorted(reopened.guests) == ['G2']
+    assert not os.path.exists(tmp_path / 'journal.log.old')
+    reopened.close()
+
+
+def test_a_torn_journal_tail_is_dropped(tmp_path):
+    service = open_journal(tmp_path)
+    service.put('guests', 'G1', guest('G1'))
+    size = os.path.getsize(service.store.journal_path)
+    service.put('guests', 'G2', guest('G2'))
+    service.close()
+    with open(tmp_path / 'journal.log', 'r+b') as f:
+        f.truncate(size + 3)
+    service = open_journal(tmp_path)
+    assert sorted(service.guests) == ['G1']
+    # New records land after the last complete one and replay normally
+    service.put('guests', 'G3', guest('G3'))
+    service.close()
+    reopened = open_journal(tmp_path)
+    assert sorted(reopened.guests) == ['G1', 'G3']
+    reopened.close()
@@ -0,0 +1,89 @@
+import os
+import threading
+
+import pytest
+
+from core import DataService
+from models import Guest
+from storage import JournalStore, PickleStore, timed_save
+
+
+def guest(guest_id, name="Guest"):
+    return Guest(guest_id, name, "1 Road", "555")
+
+
+def commit_guests(service, *guest_ids):
+    with service.transaction() as transaction:
+        for guest_id in guest_ids:
+            transaction.put('guests', guest_id, guest(guest_id))
+
+
+def test_journal_writes_a_transaction_as_one_frame(tmp_path):
+    service = DataService(JournalStore(str(tmp_path)), background_saves=False)
+    service.put('guests', 'G0', guest('G0'))
+    size = os.path.getsize(service.store.journal_path)
+    commit_guests(service, 'G1', 'G2', 'G3')
+    frames = list(service.store._read_frames(service.store.journal_path))
+    assert len(frames) == 2
+    service.close()
+    # Cut the transaction's frame short, as a crash in the middle of the write would
+    with open(tmp_path / 'journal.log', 'r+b') as f:
+        f.truncate(size + (os.path.getsize(f.name) - size) // 2)
+    reopened = DataService(JournalStore(str(tmp_path)), background_saves=False)
+    assert sorted(reopened.guests) == ['G0']
+    reopened.close()
+
+
+def test_journal_replays_a_whole_transaction(tmp_path):
+    service = DataService(JournalStore(str(tmp_path)), background_saves=False)
+    commit_guests(service, 'G1', 'G2', 'G3')
+    with service.transaction() as transaction:
+        transaction.remove('guests', 'G2')
+        transaction.put('guests', 'G4', guest('G4'))
+    service.close()
+    reopened = DataService(JournalStore(str(tmp_path)), background_saves=False)
+    assert sorted(reopened.guests) == ['G1', 'G3', 'G4']
+    reopened.close()
+
+
+class SaveMidway:
+    """Observer that starts a save and a locked read on other threads during the first change."""
+
+    def __init__(self, service):
+        self.service = service
+        self.threads = []
+        self.blocked = []
+
+    def on_set(self, name, key, value):
+        if self.threads:
+            return
+        self.threads = [threading.Thread(target=timed_save, args=(self.service.store,)),
+                        threading.Thread(target=self.read)]
+        for thread in self.threads:
+            thread.start()
+        for thread in self.threads:
+            thread.join(0.2)
+            self.blocked.append(thread.is_alive())
+
+    def read(self):
+        with self.service.lock:
+            pass
+
+    def on_delete(self, name, key, value):
+        pass
+
+
+@pytest.mark.parametrize('store_class', [PickleStore, JournalStore])
+def test_no_save_or_reader_sees_half_a_transaction(tmp_path, store_class):
+    service = DataService(store_class(str(tmp_path)), background_saves=False)
+    service.guests
+    observer = SaveMidway(service)
+    service.observers.append(observer)
+    commit_guests(service, 'G1', 'G2', 'G3')
+    for thread in observer.threads:
+        thread.join()
+    assert observer.blocked == [True, True]
+    service.close()
+    reopened = DataService(store_class(str(tmp_path)), background_saves=False)
+    assert sorted(reopened.guests) == ['G1', 'G2', 'G3']
+    reopened.close()
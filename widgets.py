@@ -0,0 +1,123 @@
+import tkinter as tk
+from tkinter import ttk
+from typing import Any, Callable, Optional
+
+
+class VirtualTable(tk.Frame):
+    """Table that only renders the rows currently in view.
+
+    Rows come from a source exposing ``columns``, ``count()`` and
+    ``rows(offset, limit, column, descending)``; the Treeview only ever holds one screen of
+    rows, so scrolling costs the same whether the collection has a hundred rows or a million.
+    Clicking a column heading asks the source for that column's order.
+    """
+
+    def __init__(self, master: tk.Misc, source: Any, name: str, visible_rows: int = 20,
+                 on_open: Optional[Callable[[str], None]] = None):
+        """Create a table over a row source for the named collection."""
+        super().__init__(master)
+        self.source = source
+        self.name = name
+        self.visible_rows = visible_rows
+        self.on_open = on_open
+        self.offset = 0
+        self.sort_column = 0
+        self.descending = False
+        self.total = 0
+        self._refresh_pending = False
+
+        columns = [f"c{index}" for index in range(len(source.columns))]
+        self.tree = ttk.Treeview(self, columns=columns, show="headings", height=visible_rows, selectmode="browse")
+        for index, title in enumerate(source.columns):
+            self.tree.heading(columns[index], text=title, command=lambda column=index: self.sort_by(column))
+            self.tree.column(columns[index], width=140, stretch=True)
+        self.scrollbar = ttk.Scrollbar(self, orient="vertical", command=self._on_scrollbar)
+        self.tree.grid(row=0, column=0, sticky="nsew")
+        self.scrollbar.grid(row=0, column=1, sticky="ns")
+        self.count_label = tk.Label(self, anchor="w")
+        self.count_label.grid(row=1, column=0, columnspan=2, sticky="we")
+        self.grid_rowconfigure(0, weight=1)
+        self.grid_columnconfigure(0, weight=1)
+
+        self.tree.bind("<MouseWheel>", self._on_wheel)
+        self.tree.bind("<Button-4>", lambda event: self.scroll_to(self.offset - 3))
+        self.tree.bind("<Button-5>", lambda event: self.scroll_to(self.offset + 3))
+        self.tree.bind("<Prior>", lambda event: self.scroll_to(self.offset - self.visible_rows))
+        self.tree.bind("<Next>", lambda event: self.scroll_to(self.offset + self.visible_rows))
+        self.tree.bind("<Double-1>", self._on_double_click)
+        self.refresh()
+
+    def refresh(self) -> None:
+        """Fetch and draw the rows at the current offset."""
+        self._refresh_pending = False
+        self.total = self.source.count()
+        self.offset = max(0, min(self.offset, self.total - self.visible_rows))
+        rows = self.source.rows(self.offset, self.visible_rows, self.sort_column, self.descending)
+        self.tree.delete(*self.tree.get_children())
+        for row in rows:
+            self.tree.insert("", "end", iid=str(row[0]), values=[("" if value is None else value) for value in row])
+        self._update_scrollbar()
+        shown = f"{self.offset + 1}-{self.offset + len(rows)}" if rows else "0"
+        self.count_label.config(text=f"Rows {shown} of {self.total}")
+
+    def schedule_refresh(self) -> None:
+        """Redraw once the event loop is idle, merging bursts of changes into one redraw."""
+        if not self._refresh_pending:
+            self._refresh_pending = True
+            self.after_idle(self.refresh)
+
+    def scroll_to(self, offset: int) -> None:
+        """Show the rows starting at offset."""
+        offset = max(0, min(int(offset), self.total - self.visible_rows))
+        if offset != self.offset:
+            self.offset = offset
+            self.refresh()
+
+    def sort_by(self, column: int) -> None:
+        """Order the rows by a column, toggling the direction on repeated clicks."""
+        if column == self.sort_column:
+            self.descending = not self.descending
+        else:
+            self.sort_column = column
+            self.descending = False
+        for index, title in enumerate(self.source.columns):
+            arrow = (" ▼" if self.descending else " ▲") if index == column else ""
+            self.tree.heading(f"c{index}", text=title + arrow)
+        self.offset = 0
+        self.refresh()
+
+    def on_set(self, name: str, key: str, value: Any) -> None:
+        """Redraw after a record of this collection was added."""
+        if name == self.name:
+            self.schedule_refresh()
+
+    def on_delete(self, name: str, key: str, value: Any) -> None:
+        """Redraw after a record of this collection was removed."""
+        if name == self.name:
+            self.schedule_refresh()
+
+    def _update_scrollbar(self) -> None:
+        """Size the scrollbar thumb to the visible fraction of all rows."""
+        if self.total <= self.visible_rows:
+            self.scrollbar.set(0.0, 1.0)
+        else:
+            first = self.offset / self.total
+            self.scrollbar.set(first, min(1.0, first + self.visible_rows / self.total))
+
+    def _on_scrollbar(self, action: str, amount: str, unit: str = "") -> None:
+        """Translate scrollbar commands into row offsets."""
+        if action == "moveto":
+            self.scroll_to(float(amount) * self.total)
+        elif action == "scroll":
+            step = self.visible_rows if unit == "pages" else 1
+            self.scroll_to(self.offset + int(amount) * step)
+
+    def _on_wheel(self, event: tk.Event) -> None:
+        """Scroll a few rows per mouse wheel notch."""
+        self.scroll_to(self.offset - 3 * (1 if event.delta > 0 else -1))
+
+    def _on_double_click(self, event: tk.Event) -> None:
+        """Open the record under the pointer."""
+        item = self.tree.identify_row(event.y)
+        if item and self.on_open is not None:
+            self.on_open(item)